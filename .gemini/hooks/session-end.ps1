@@ -69,7 +69,7 @@ try {
     $sandboxStateFile = Join-Path $cwd "sandbox" ".sandbox-state.json"
     if (Test-Path $sandboxStateFile) {
         $sbxState = Get-Content $sandboxStateFile -Raw | ConvertFrom-Json
-        if ($sbxState.PSObject.Properties['sandbox_id']) {
+        if ($sbxState.PSObject.Properties['sandbox_id'] -and $sbxState.sandbox_id) {
             Add-Content -Path $logFile -Value "$now | INFO  | Sandbox $($sbxState.sandbox_id) was active during session"
         }
     }
@@ -1,20 +1,52 @@
 """E2B template builder for custom pre-configured sandbox environments.
 
 Usage:
-    python build_template.py --name my-template --dockerfile ./Dockerfile
+    python build_template.py build --name my-template --dockerfile ./Dockerfile
+    python build_template.py build --name browser
 
 This script uses the E2B CLI to build and register custom sandbox templates
-with pre-installed tools (Node.js, Python, etc.).
+with pre-installed tools (Node.js, Python, etc.). Without --dockerfile, a
+name matching one of docker-templates/ (base, node, python, browser) builds
+that template, so E2B and Docker sandboxes get the same environment.
 """
 
 import argparse
 import subprocess
 import sys
+from pathlib import Path
 
+TEMPLATES_DIR = Path(__file__).resolve().parent / "docker-templates"
 
-def build_template(name: str, dockerfile: str = "Dockerfile") -> None:
+# Resources for templates that need more than the E2B defaults
+TEMPLATE_RESOURCES = {
+    "browser": {"cpu_count": 2, "memory_mb": 2048},
+}
+
+
+def resolve_dockerfile(name: str, dockerfile: str | None) -> str:
+    """The given Dockerfile, or the matching docker-templates/<name>/Dockerfile."""
+    if dockerfile:
+        return dockerfile
+    bundled = TEMPLATES_DIR / name / "Dockerfile"
+    return str(bundled) if bundled.exists() else "Dockerfile"
+
+
+def build_template(
+    name: str,
+    dockerfile: str | None = None,
+    cpu_count: int | None = None,
+    memory_mb: int | None = None,
+) -> None:
     """Build an E2B sandbox template from a Dockerfile."""
+    dockerfile = resolve_dockerfile(name, dockerfile)
+    resources = TEMPLATE_RESOURCES.get(name, {})
+    cpu_count = cpu_count or resources.get("cpu_count")
+    memory_mb = memory_mb or resources.get("memory_mb")
     cmd = ["e2b", "template", "build", "--name", name, "--dockerfile", dockerfile]
+    if cpu_count:
+        cmd += ["--cpu-count", str(cpu_count)]
+    if memory_mb:
+        cmd += ["--memory-mb", str(memory_mb)]
     print(f"Building template: {name}")
     print(f"Command: {' '.join(cmd)}")
     result = subprocess.run(cmd, capture_output=False)
@@ -35,14 +67,20 @@ def main() -> None:
 
     build = sub.add_parser("build", help="Build a template from Dockerfile")
     build.add_argument("--name", required=True, help="Template name")
-    build.add_argument("--dockerfile", default="Dockerfile", help="Path to Dockerfile")
+    build.add_argument(
+        "--dockerfile",
+        default=None,
+        help="Path to Dockerfile (default: docker-templates/<name>/Dockerfile if it exists)",
+    )
+    build.add_argument("--cpu-count", type=int, default=None, help="vCPUs for the template")
+    build.add_argument("--memory-mb", type=int, default=None, help="Memory for the template in MB")
 
     sub.add_parser("list", help="List available templates")
 
     args = parser.parse_args()
 
     if args.command == "build":
-        build_template(args.name, args.dockerfile)
+        build_template(args.name, args.dockerfile, args.cpu_count, args.memory_mb)
     elif args.command == "list":
         list_templates()
     else:
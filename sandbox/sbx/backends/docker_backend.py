@@ -8,11 +8,16 @@ from __future__ import annotations
 
 import json
 import os
+import shlex
+import stat
 import subprocess
+import threading
 import time
 import uuid
-from pathlib import Path
+from pathlib import Path, PurePosixPath
+from typing import Iterator
 
+from sbx import compression, output
 from sbx.provider import (
     BackgroundProcess,
     CommandResult,
@@ -25,9 +30,44 @@ _LABEL = "dev.sbx.managed=true"
 # Default ports to eagerly map at creation time
 _DEFAULT_PORTS = [3000, 3001, 5173, 8080]
 
+# Payloads smaller than this are transferred uncompressed
+_MIN_COMPRESS_BYTES = 4096
+
+# find -printf record: type, size, mtime, permissions, owner, link target, relative path
+_FIND_FORMAT = "%y\\t%s\\t%T@\\t%m\\t%u\\t%l\\t%P\\0"
+_FIND_TYPE_BITS = {
+    "f": stat.S_IFREG, "d": stat.S_IFDIR, "l": stat.S_IFLNK,
+    "p": stat.S_IFIFO, "s": stat.S_IFSOCK, "c": stat.S_IFCHR, "b": stat.S_IFBLK,
+}
+
+# Runs "$1" in its own process group and kills that group once the host
+# closes stdin, since killing `docker exec` alone leaves it running. Stdin
+# is kept on fd 3 because sh points async lists' stdin at /dev/null.
+_STREAM_WRAPPER = (
+    'exec 3<&0; '
+    'if command -v setsid >/dev/null 2>&1; then setsid sh -c "$1" 3<&- & else sh -c "$1" 3<&- & fi; '
+    'child=$!; '
+    '{ cat <&3 >/dev/null; kill -TERM -"$child" 2>/dev/null || kill -TERM "$child"; } >/dev/null 2>&1 & '
+    'exec 3<&-; wait "$child"'
+)
+
 # Docker template directory
 _TEMPLATES_DIR = Path(__file__).resolve().parents[2] / "docker-templates"
 
+# Commands run as "user" by default. Images without that account (the
+# fallback images, node:*, whose uid 1000 is "node") get it at create time,
+# renaming an existing uid 1000 account so /workspace ownership still matches
+_ENSURE_USER = (
+    "if ! id user >/dev/null 2>&1; then "
+    "existing=$(getent passwd 1000 | cut -d: -f1); "
+    "if [ -n \"$existing\" ]; then "
+    "[ \"$(id -gn \"$existing\")\" = \"$existing\" ] && groupmod -n user \"$existing\"; "
+    "usermod -l user -d /home/user -m \"$existing\"; "
+    "else useradd -m -s /bin/bash -u 1000 user 2>/dev/null || adduser -D -u 1000 user; fi; "
+    "fi; "
+    "mkdir -p /workspace && (id user >/dev/null 2>&1 && chown user:user /workspace || true)"
+)
+
 
 def _run_docker(
     args: list[str],
@@ -47,6 +87,40 @@ def _run_docker(
     )
 
 
+def _run_capped(args: list[str], timeout: int | None, limit: int) -> tuple[int, bytes, bytes, int, int]:
+    """Run a docker CLI command keeping at most `limit` bytes of each stream.
+
+    Returns (returncode, stdout, stderr, stdout_size, stderr_size). Raises
+    subprocess.TimeoutExpired like subprocess.run.
+    """
+    proc = subprocess.Popen(
+        ["docker"] + args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    buffers = (output.CappedBuffer(limit), output.CappedBuffer(limit))
+
+    def drain(stream, buffer: output.CappedBuffer) -> None:
+        for chunk in iter(lambda: stream.read(65536), b""):
+            buffer.write(chunk)
+
+    readers = [
+        threading.Thread(target=drain, args=(stream, buffer), daemon=True)
+        for stream, buffer in zip((proc.stdout, proc.stderr), buffers)
+    ]
+    for reader in readers:
+        reader.start()
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        for reader in readers:
+            reader.join()
+    out, err = buffers
+    return proc.returncode, out.value(), err.value(), out.size, err.size
+
+
 def _find_free_port(start: int = 32768) -> int:
     """Find an available host port starting from `start`."""
     import socket
@@ -75,6 +149,8 @@ class DockerCommandsAPI:
         user: str = "user",
         timeout: int = 60,
         background: bool = False,
+        max_output: int | None = None,
+        spill: bool = True,
     ) -> CommandResult | BackgroundProcess:
         args = ["exec"]
         if background:
@@ -84,9 +160,29 @@ class DockerCommandsAPI:
         for key, value in (envs or {}).items():
             args.extend(["-e", f"{key}={value}"])
 
+        token = None
+        if max_output and spill and not background:
+            command, token = output.spill_command(command, max_output)
         args.extend([self._container_id, "sh", "-c", command])
 
         try:
+            if max_output and not background:
+                # The spill wrapper prints at most max_output per stream plus
+                # its trailer; the host buffers cap it if it ran unwrapped
+                limit = max_output + output.TRAILER_BYTES if token else max_output
+                code, out, err, out_size, err_size = _run_capped(args, timeout, limit)
+                if token:
+                    spilled = output.parse_spilled(out, err, code, token, max_output)
+                    if spilled is not None:
+                        return spilled
+                return CommandResult(
+                    stdout=out,
+                    stderr=err,
+                    exit_code=code,
+                    truncated=max(out_size, err_size) > limit,
+                    stdout_size=out_size,
+                    stderr_size=err_size,
+                )
             result = _run_docker(args, timeout=timeout if not background else None, check=False)
         except subprocess.TimeoutExpired:
             return CommandResult(stdout="", stderr="Command timed out", exit_code=124)
@@ -105,11 +201,32 @@ class DockerCommandsAPI:
                 pass
             return BackgroundProcess(pid=pid)
 
-        return CommandResult(
-            stdout=result.stdout.decode(errors="replace"),
-            stderr=result.stderr.decode(errors="replace"),
-            exit_code=result.returncode,
+        return CommandResult(stdout=result.stdout, stderr=result.stderr, exit_code=result.returncode)
+
+    def stream(
+        self,
+        command: str,
+        cwd: str = "/workspace",
+        envs: dict | None = None,
+        user: str = "user",
+    ) -> Iterator[str]:
+        args = ["docker", "exec", "-i", "-w", cwd, "-u", user]
+        for key, value in (envs or {}).items():
+            args.extend(["-e", f"{key}={value}"])
+        args.extend([self._container_id, "sh", "-c", _STREAM_WRAPPER, "sbx-stream", command])
+        proc = subprocess.Popen(
+            args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
         )
+        try:
+            for line in proc.stdout:
+                yield line.decode(errors="replace").rstrip("\n")
+        finally:
+            # Closing stdin tells the wrapper to stop the command in the container
+            proc.stdin.close()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
 
 
 class DockerFilesystemAPI:
@@ -117,69 +234,144 @@ class DockerFilesystemAPI:
 
     def __init__(self, container_id: str) -> None:
         self._container_id = container_id
+        self._methods: set[str] | None = None
+        self.stats = compression.TransferStats()
+        # `docker exec` without -u: the image's default user, root in our templates
+        self.user = "root"
 
-    def list(self, path: str) -> list[FileEntry]:
+    def _find(self, path: str, args: list[str]) -> list[FileEntry]:
+        """Run one `find` and parse its -printf records into FileEntry objects."""
         result = _run_docker(
-            ["exec", self._container_id, "ls", "-1F", path],
+            ["exec", self._container_id, "find", "-H", path, "-mindepth", "1"]
+            + args + ["-printf", _FIND_FORMAT],
             check=False,
         )
-        if result.returncode != 0:
+        if result.returncode != 0 and not result.stdout:
             return []
+        base = path.rstrip("/")
         entries = []
-        for line in result.stdout.decode(errors="replace").strip().splitlines():
-            line = line.strip()
-            if not line:
+        for record in result.stdout.decode(errors="replace").split("\0"):
+            if not record:
                 continue
-            is_dir = line.endswith("/")
-            name = line.rstrip("*/=>@|")
-            entries.append(FileEntry(name=name, is_dir=is_dir))
+            kind, size, mtime, perm, owner, target, rel = record.split("\t", 6)
+            entries.append(FileEntry(
+                name=rel.rsplit("/", 1)[-1],
+                is_dir=kind == "d",
+                path=f"{base}/{rel}",
+                size=int(size),
+                mtime=float(mtime),
+                mode=_FIND_TYPE_BITS.get(kind, 0) | int(perm, 8),
+                owner=owner,
+                symlink_target=target or None,
+            ))
+        entries.sort(key=lambda e: e.path)
         return entries
 
+    def list(self, path: str) -> list[FileEntry]:
+        return self._find(path, ["-maxdepth", "1"])
+
+    def walk(
+        self,
+        path: str,
+        max_depth: int | None = None,
+        pattern: str | None = None,
+        prune: list[str] | None = None,
+    ) -> list[FileEntry]:
+        """List a whole tree with one `find` exec."""
+        args: list[str] = []
+        if max_depth is not None:
+            args += ["-maxdepth", str(max_depth)]
+        if prune:
+            names: list[str] = []
+            for name in prune:
+                names += ["-o", "-name", name] if names else ["-name", name]
+            args += ["-type", "d", "("] + names + [")", "-prune", "-o"]
+        if pattern:
+            args += ["-name", pattern]
+        return self._find(path, args)
+
+    def _remote_methods(self) -> set[str]:
+        """Compression methods available in the container (probed once)."""
+        if self._methods is None:
+            result = _run_docker(
+                ["exec", self._container_id, "sh", "-c", compression.PROBE_COMMAND],
+                timeout=10,
+                check=False,
+            )
+            self._methods = compression.parse_probe(result.stdout.decode(errors="replace"))
+        return self._methods
+
     def read(self, path: str) -> str:
+        return self.read_bytes(path).decode(errors="replace")
+
+    def write(self, path: str, content: str) -> None:
+        self.write_bytes(path, content.encode())
+
+    def _fetch(self, path: str, script: str) -> bytes:
+        """Run a tagged-payload script (see sbx.compression) and decode its output."""
+        started = time.monotonic()
         result = _run_docker(
-            ["exec", self._container_id, "cat", path],
+            ["exec", self._container_id, "sh", "-c", script],
             check=False,
         )
         if result.returncode != 0:
             raise FileNotFoundError(
                 f"Cannot read {path}: {result.stderr.decode(errors='replace')}"
             )
-        return result.stdout.decode(errors="replace")
+        method, body = compression.split_tagged(result.stdout)
+        data = compression.decompress(body, method)
+        self.stats.record(len(data), len(body), started, method)
+        return data
 
-    def write(self, path: str, content: str) -> None:
-        # Ensure parent directory exists
-        parent = str(Path(path).parent)
-        _run_docker(
-            ["exec", self._container_id, "mkdir", "-p", parent],
-            check=False,
-        )
-        # Pipe content through stdin
-        _run_docker(
-            ["exec", "-i", self._container_id, "sh", "-c", f"cat > {path}"],
-            input_data=content.encode(),
-        )
+    def _slice(self, path: str, command: str, compress: bool = True) -> bytes:
+        method = compression.choose_method(self._remote_methods()) if compress else None
+        q_path = shlex.quote(path)
+        return self._fetch(path, compression.file_guard(q_path) + compression.command_script(command, method))
 
     def read_bytes(self, path: str) -> bytes:
-        result = _run_docker(
-            ["exec", self._container_id, "cat", path],
-            check=False,
+        return self._fetch(path, compression.read_script(shlex.quote(path), _MIN_COMPRESS_BYTES))
+
+    def read_range(self, path: str, offset: int, length: int) -> bytes:
+        """Read `length` bytes starting at `offset` (tail -c seeks; nothing else is read)."""
+        q_path = shlex.quote(path)
+        return self._slice(
+            path,
+            f"tail -c +{int(offset) + 1} -- {q_path} | head -c {int(length)}",
+            compress=length >= _MIN_COMPRESS_BYTES,
         )
-        if result.returncode != 0:
-            raise FileNotFoundError(
-                f"Cannot read {path}: {result.stderr.decode(errors='replace')}"
+
+    def read_lines(self, path: str, start: int, end: int | None = None) -> str:
+        """Lines start..end (1-based, inclusive; end=None reads to EOF)."""
+        q_path = shlex.quote(path)
+        window = f"{int(start)},{int(end)}p;{int(end)}q" if end else f"{int(start)},$p"
+        return self._slice(path, f"sed -n '{window}' -- {q_path}").decode(errors="replace")
+
+    def tail(self, path: str, lines: int = 10, follow: bool = False) -> Iterator[str]:
+        """Last `lines` lines; with follow, keep yielding lines as they are appended."""
+        q_path = shlex.quote(path)
+        if follow:
+            return DockerCommandsAPI(self._container_id).stream(
+                f"exec tail -n {int(lines)} -F -- {q_path} 2>/dev/null"
             )
-        return result.stdout
+        text = self._slice(path, f"tail -n {int(lines)} -- {q_path}").decode(errors="replace")
+        return iter(text.splitlines())
 
     def write_bytes(self, path: str, data: bytes) -> None:
-        parent = str(Path(path).parent)
+        started = time.monotonic()
+        method = None
+        if len(data) >= _MIN_COMPRESS_BYTES:
+            method = compression.choose_method(self._remote_methods())
+        payload = compression.compress(data, method)
+        sink = f"{compression.remote_decompress_cmd(method)} > " if method else "cat > "
+        q_path = shlex.quote(path)
+        q_parent = shlex.quote(str(PurePosixPath(path).parent))
+        # Ensure parent directory exists and pipe content through stdin in one exec
         _run_docker(
-            ["exec", self._container_id, "mkdir", "-p", parent],
-            check=False,
-        )
-        _run_docker(
-            ["exec", "-i", self._container_id, "sh", "-c", f"cat > {path}"],
-            input_data=data,
+            ["exec", "-i", self._container_id, "sh", "-c",
+             f"mkdir -p {q_parent} && {sink}{q_path}"],
+            input_data=payload,
         )
+        self.stats.record(len(data), len(payload), started, method)
 
     def make_dir(self, path: str) -> None:
         _run_docker(
@@ -191,6 +383,52 @@ class DockerFilesystemAPI:
             ["exec", self._container_id, "rm", "-rf", path],
         )
 
+    def exists(self, path: str) -> bool:
+        result = _run_docker(
+            ["exec", self._container_id, "test", "-e", path],
+            check=False,
+        )
+        return result.returncode == 0
+
+    def stat(self, path: str) -> FileEntry:
+        result = _run_docker(
+            ["exec", self._container_id, "stat", "-c", "%s %Y %f %U", "--", path],
+            check=False,
+        )
+        if result.returncode != 0:
+            raise FileNotFoundError(
+                f"Cannot stat {path}: {result.stderr.decode(errors='replace').strip()}"
+            )
+        size, mtime, mode_hex, owner = result.stdout.decode(errors="replace").split()[:4]
+        mode = int(mode_hex, 16)
+        return FileEntry(
+            name=PurePosixPath(path).name,
+            is_dir=stat.S_ISDIR(mode),
+            path=path,
+            size=int(size),
+            mtime=float(mtime),
+            mode=mode,
+            owner=owner,
+        )
+
+    def _transfer(self, tool: list[str], src: str, dst: str) -> None:
+        parent = str(PurePosixPath(dst).parent)
+        result = _run_docker(
+            ["exec", self._container_id, "sh", "-c",
+             'mkdir -p "$1" && shift && exec "$@"', "sh", parent] + tool + ["--", src, dst],
+            check=False,
+        )
+        if result.returncode != 0:
+            raise FileNotFoundError(
+                f"{tool[0]} {src} -> {dst} failed: {result.stderr.decode(errors='replace').strip()}"
+            )
+
+    def move(self, src: str, dst: str) -> None:
+        self._transfer(["mv"], src, dst)
+
+    def copy(self, src: str, dst: str) -> None:
+        self._transfer(["cp", "-a"], src, dst)
+
 
 class DockerSandboxInstance:
     """A sandbox running as a Docker container."""
@@ -205,6 +443,11 @@ class DockerSandboxInstance:
     def sandbox_id(self) -> str:
         return self._container_id
 
+    @property
+    def port_map(self) -> dict[int, int]:
+        """Container port → host port mappings."""
+        return dict(self._port_map)
+
     @property
     def commands(self) -> DockerCommandsAPI:
         return self._commands
@@ -272,9 +515,10 @@ class DockerBackend:
         # Try to build from docker-templates/
         template_dir = _TEMPLATES_DIR / template
         if template_dir.exists() and (template_dir / "Dockerfile").exists():
+            # The browser template downloads Chromium and its libraries
             _run_docker(
                 ["build", "-t", image_name, str(template_dir)],
-                timeout=300,
+                timeout=900,
             )
             return image_name
 
@@ -284,6 +528,7 @@ class DockerBackend:
             "base": "ubuntu:22.04",
             "node": "node:20-bookworm",
             "python": "python:3.12-bookworm",
+            "browser": "mcr.microsoft.com/playwright:v1.48.2-jammy",
         }
         return fallback_images.get(template, template)
 
@@ -323,11 +568,9 @@ class DockerBackend:
         result = _run_docker(args)
         container_id = result.stdout.decode().strip()[:12]
 
-        # Ensure /workspace exists and has correct ownership
+        # Ensure the "user" account exists and owns /workspace
         _run_docker(
-            ["exec", container_name, "sh", "-c",
-             "mkdir -p /workspace && "
-             "(id user >/dev/null 2>&1 && chown user:user /workspace || true)"],
+            ["exec", container_name, "sh", "-c", _ENSURE_USER],
             check=False,
         )
 
@@ -2,16 +2,51 @@
 
 from __future__ import annotations
 
+import base64
+import fnmatch
 import os
+import shlex
+import time
+import uuid
+from pathlib import PurePosixPath
+from typing import Iterator
 
-from e2b import Sandbox
+from e2b import CommandExitException, Sandbox
 
+from sbx import compression, output
 from sbx.provider import (
     BackgroundProcess,
     CommandResult,
     FileEntry,
 )
 
+# Compressing costs an extra round-trip on E2B, so only do it for payloads
+# large enough to win that back over the WAN
+_MIN_COMPRESS_BYTES = 64 * 1024
+
+# Already-compressed formats: an exec plus base64 would only add 33%
+_INCOMPRESSIBLE_SUFFIXES = frozenset({
+    ".gz", ".tgz", ".zst", ".xz", ".bz2", ".zip", ".jar", ".whl", ".7z",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".woff", ".woff2",
+    ".mp3", ".mp4", ".webm", ".pdf",
+})
+
+# E2B list() needs an explicit depth; walks without max_depth use this
+_MAX_WALK_DEPTH = 64
+
+
+def _run_sdk(sbx: Sandbox, command: str, **kwargs):
+    """`commands.run` that returns a failed command's result instead of raising.
+
+    The SDK raises CommandExitException on any non-zero exit; it carries
+    the same stdout, stderr and exit_code as a normal result, which is what
+    callers checking the exit code (and Docker's backend) expect.
+    """
+    try:
+        return sbx.commands.run(command, **kwargs)
+    except CommandExitException as exc:
+        return exc
+
 
 class E2BCommandsAdapter:
     """Adapts E2B's commands API to the CommandsAPI protocol."""
@@ -27,8 +62,16 @@ class E2BCommandsAdapter:
         user: str = "user",
         timeout: int = 60,
         background: bool = False,
+        max_output: int | None = None,
+        spill: bool = True,
     ) -> CommandResult | BackgroundProcess:
-        result = self._sbx.commands.run(
+        token = None
+        if max_output and not background:
+            # The SDK buffers whole streams, so the cap is applied in the
+            # sandbox; without spill the files are dropped there afterwards
+            command, token = output.spill_command(command, max_output, keep=spill, shell="bash")
+        result = _run_sdk(
+            self._sbx,
             command,
             cwd=cwd,
             envs=envs or {},
@@ -38,40 +81,209 @@ class E2BCommandsAdapter:
         )
         if background:
             return BackgroundProcess(pid=getattr(result, "pid", 0))
+        if token:
+            spilled = output.parse_spilled(
+                getattr(result, "stdout", "").encode(),
+                getattr(result, "stderr", "").encode(),
+                getattr(result, "exit_code", 0),
+                token,
+                max_output,
+            )
+            if spilled is not None:
+                return spilled
         return CommandResult(
             stdout=getattr(result, "stdout", ""),
             stderr=getattr(result, "stderr", ""),
             exit_code=getattr(result, "exit_code", 0),
         )
 
+    def stream(
+        self,
+        command: str,
+        cwd: str = "/workspace",
+        envs: dict | None = None,
+        user: str = "user",
+    ) -> Iterator[str]:
+        # timeout=0 keeps the connection open for as long as the command runs
+        handle = self._sbx.commands.run(
+            command, cwd=cwd, envs=envs or {}, user=user, timeout=0, background=True
+        )
+        pending = ""
+        try:
+            for stdout, _stderr, _pty in handle:
+                if not stdout:
+                    continue
+                pending += stdout
+                *lines, pending = pending.split("\n")
+                yield from lines
+            if pending:
+                yield pending
+        finally:
+            try:
+                handle.kill()
+            except Exception:
+                pass
+
 
 class E2BFilesystemAdapter:
     """Adapts E2B's filesystem API to the FilesystemAPI protocol."""
 
     def __init__(self, sbx: Sandbox) -> None:
         self._sbx = sbx
+        self._methods: set[str] | None = None
+        self.stats = compression.TransferStats()
+        # E2B's filesystem API reads and writes as its default user
+        self.user = "user"
+
+    @staticmethod
+    def _entry(info, path: str = "") -> FileEntry:
+        """Convert an E2B EntryInfo to a FileEntry."""
+        modified = getattr(info, "modified_time", None)
+        return FileEntry(
+            name=getattr(info, "name", PurePosixPath(path).name),
+            is_dir=str(getattr(info, "type", "")).lower().endswith("dir"),
+            path=getattr(info, "path", path),
+            size=int(getattr(info, "size", 0) or 0),
+            mtime=modified.timestamp() if hasattr(modified, "timestamp") else 0.0,
+            mode=int(getattr(info, "mode", 0) or 0),
+            owner=getattr(info, "owner", "") or "",
+            symlink_target=getattr(info, "symlink_target", None) or None,
+        )
 
     def list(self, path: str) -> list[FileEntry]:
-        entries = self._sbx.filesystem.list(path)
-        return [
-            FileEntry(
-                name=getattr(e, "name", str(e)),
-                is_dir=getattr(e, "is_dir", False),
-            )
-            for e in entries
-        ]
+        return sorted((self._entry(e) for e in self._sbx.filesystem.list(path)), key=lambda e: e.path)
+
+    def walk(
+        self,
+        path: str,
+        max_depth: int | None = None,
+        pattern: str | None = None,
+        prune: list[str] | None = None,
+    ) -> list[FileEntry]:
+        """List a whole tree with one recursive list call."""
+        entries = sorted(
+            (self._entry(e) for e in self._sbx.filesystem.list(path, depth=max_depth or _MAX_WALK_DEPTH)),
+            key=lambda e: e.path,
+        )
+        if prune:
+            # E2B has no server-side pruning; drop pruned dirs and everything below them
+            pruned = tuple(f"{e.path}/" for e in entries if e.is_dir and e.name in prune)
+            entries = [
+                e for e in entries
+                if not (e.is_dir and e.name in prune) and not e.path.startswith(pruned)
+            ]
+        if pattern:
+            entries = [e for e in entries if fnmatch.fnmatchcase(e.name, pattern)]
+        return entries
+
+    def _remote_methods(self) -> set[str]:
+        """Compression methods available in the sandbox (probed once)."""
+        if self._methods is None:
+            result = _run_sdk(self._sbx, compression.PROBE_COMMAND, timeout=10)
+            self._methods = compression.parse_probe(getattr(result, "stdout", ""))
+        return self._methods
 
     def read(self, path: str) -> str:
-        return self._sbx.filesystem.read(path)
+        return self.read_bytes(path).decode(errors="replace")
 
     def write(self, path: str, content: str) -> None:
-        self._sbx.filesystem.write(path, content)
+        self.write_bytes(path, content.encode())
+
+    def _fetch(self, path: str, script: str) -> bytes:
+        """Run a tagged-payload script (see sbx.compression) and decode its base64 output."""
+        started = time.monotonic()
+        try:
+            result = _run_sdk(self._sbx, script, timeout=600)
+        except Exception as exc:
+            raise FileNotFoundError(f"Cannot read {path}: {exc}") from exc
+        if getattr(result, "exit_code", 0) != 0:
+            raise FileNotFoundError(f"Cannot read {path}: {getattr(result, 'stderr', '')}")
+        stdout = getattr(result, "stdout", "")
+        method = compression.split_tagged(stdout[:1].encode())[0]
+        body = base64.b64decode(stdout[1:])
+        data = compression.decompress(body, method)
+        self.stats.record(len(data), len(body), started, method)
+        return data
+
+    def _slice(self, path: str, command: str, compress: bool = True) -> bytes:
+        method = compression.choose_method(self._remote_methods()) if compress else None
+        q_path = shlex.quote(path)
+        return self._fetch(
+            path,
+            compression.file_guard(q_path) + compression.command_script(command, method, "| base64 -w0"),
+        )
+
+    def _native_read(self, path: str) -> bytes:
+        started = time.monotonic()
+        try:
+            data = self._sbx.filesystem.read_bytes(path)
+        except Exception as exc:
+            raise FileNotFoundError(f"Cannot read {path}: {exc}") from exc
+        self.stats.record(len(data), len(data), started, None)
+        return data
 
     def read_bytes(self, path: str) -> bytes:
-        return self._sbx.filesystem.read_bytes(path)
+        if not compression.host_methods() or PurePosixPath(path).suffix.lower() in _INCOMPRESSIBLE_SUFFIXES:
+            return self._native_read(path)
+        # The compressed path is an exec whose output is base64 text; below
+        # the threshold that costs more than it saves, so read natively
+        try:
+            size = int(getattr(self._sbx.filesystem.get_info(path), "size", 0) or 0)
+        except Exception:
+            return self._native_read(path)
+        if size < _MIN_COMPRESS_BYTES:
+            return self._native_read(path)
+        script = compression.read_script(shlex.quote(path), _MIN_COMPRESS_BYTES, "| base64 -w0")
+        return self._fetch(path, script)
+
+    def read_range(self, path: str, offset: int, length: int) -> bytes:
+        """Read `length` bytes starting at `offset` (tail -c seeks; nothing else is read)."""
+        q_path = shlex.quote(path)
+        return self._slice(
+            path,
+            f"tail -c +{int(offset) + 1} -- {q_path} | head -c {int(length)}",
+            compress=length >= _MIN_COMPRESS_BYTES,
+        )
+
+    def read_lines(self, path: str, start: int, end: int | None = None) -> str:
+        """Lines start..end (1-based, inclusive; end=None reads to EOF)."""
+        q_path = shlex.quote(path)
+        window = f"{int(start)},{int(end)}p;{int(end)}q" if end else f"{int(start)},$p"
+        return self._slice(path, f"sed -n '{window}' -- {q_path}").decode(errors="replace")
+
+    def tail(self, path: str, lines: int = 10, follow: bool = False) -> Iterator[str]:
+        """Last `lines` lines; with follow, keep yielding lines as they are appended."""
+        q_path = shlex.quote(path)
+        if follow:
+            return E2BCommandsAdapter(self._sbx).stream(
+                f"exec tail -n {int(lines)} -F -- {q_path} 2>/dev/null"
+            )
+        text = self._slice(path, f"tail -n {int(lines)} -- {q_path}").decode(errors="replace")
+        return iter(text.splitlines())
 
     def write_bytes(self, path: str, data: bytes) -> None:
-        self._sbx.filesystem.write_bytes(path, data)
+        started = time.monotonic()
+        method = None
+        if len(data) >= _MIN_COMPRESS_BYTES:
+            method = compression.choose_method(self._remote_methods())
+        if method is None:
+            self._sbx.filesystem.write_bytes(path, data)
+            self.stats.record(len(data), len(data), started, None)
+            return
+        payload = compression.compress(data, method)
+        staged = f"/tmp/.sbx-upload-{uuid.uuid4().hex}"
+        self._sbx.filesystem.write_bytes(staged, payload)
+        q_path, q_staged = shlex.quote(path), shlex.quote(staged)
+        q_parent = shlex.quote(str(PurePosixPath(path).parent))
+        result = _run_sdk(
+            self._sbx,
+            f"mkdir -p {q_parent} && {compression.remote_decompress_cmd(method)} "
+            f"< {q_staged} > {q_path}; rc=$?; rm -f {q_staged}; exit $rc",
+            timeout=600,
+        )
+        if getattr(result, "exit_code", 0) != 0:
+            raise RuntimeError(f"Cannot write {path}: {getattr(result, 'stderr', '')}")
+        self.stats.record(len(data), len(payload), started, method)
 
     def make_dir(self, path: str) -> None:
         self._sbx.filesystem.make_dir(path)
@@ -79,6 +291,29 @@ class E2BFilesystemAdapter:
     def remove(self, path: str) -> None:
         self._sbx.filesystem.remove(path)
 
+    def exists(self, path: str) -> bool:
+        return bool(self._sbx.filesystem.exists(path))
+
+    def stat(self, path: str) -> FileEntry:
+        try:
+            info = self._sbx.filesystem.get_info(path)
+        except Exception as exc:
+            raise FileNotFoundError(f"Cannot stat {path}: {exc}") from exc
+        return self._entry(info, path)
+
+    def move(self, src: str, dst: str) -> None:
+        # Like copy (and Docker's mv), create the destination's parent first;
+        # make_dir creates intermediate directories and is a no-op if it exists
+        self._sbx.filesystem.make_dir(str(PurePosixPath(dst).parent))
+        self._sbx.filesystem.rename(src, dst)
+
+    def copy(self, src: str, dst: str) -> None:
+        q_src, q_dst = shlex.quote(src), shlex.quote(dst)
+        q_parent = shlex.quote(str(PurePosixPath(dst).parent))
+        result = _run_sdk(self._sbx, f"mkdir -p {q_parent} && cp -a -- {q_src} {q_dst}")
+        if getattr(result, "exit_code", 0) != 0:
+            raise FileNotFoundError(f"cp {src} -> {dst} failed: {getattr(result, 'stderr', '')}")
+
 
 class E2BSandboxInstance:
     """Wraps an E2B Sandbox into the SandboxInstance protocol."""
@@ -8,6 +8,7 @@ from sbx.commands.sandbox_cmd import sandbox
 from sbx.commands.exec_cmd import exec_group
 from sbx.commands.files_cmd import files
 from sbx.commands.browser_cmd import browser
+from sbx.commands.batch_cmd import batch
 from sbx.commands.setup_cmd import doctor, setup
 
 console = Console()
@@ -36,12 +37,13 @@ main.add_command(sandbox)
 main.add_command(exec_group, name="exec")
 main.add_command(files)
 main.add_command(browser)
+main.add_command(batch)
 main.add_command(doctor)
 main.add_command(setup)
 
 
 @main.command()
-@click.option("--template", "-t", default=None, help="Template name (base, node, python)")
+@click.option("--template", "-t", default=None, help="Template name (base, node, python, browser)")
 @click.option("--timeout", default=600, help="Sandbox timeout in seconds")
 @click.pass_context
 def init(ctx: click.Context, template: str | None, timeout: int) -> None:
@@ -0,0 +1,51 @@
+"""JSONL batch mode — run many sandbox operations in one process."""
+
+import json
+import sys
+
+import click
+
+from sbx.errors import friendly_errors
+from sbx.modules.batch import OPS, BatchRunner
+
+
+def _get_provider(ctx: click.Context) -> str | None:
+    return ctx.obj.get("provider") if ctx.obj else None
+
+
+@click.command()
+@click.option("--sandbox", "-s", "sandbox_id", default=None, help="Default sandbox ID for ops that omit one")
+@click.option("--jobs", "-j", default=8, show_default=True, help="Max operations executed concurrently")
+@click.option("--stop-on-error", is_flag=True, help="Skip remaining operations after the first failure")
+@click.option("--list-ops", is_flag=True, help="Print the supported operation names and exit")
+@click.pass_context
+@friendly_errors
+def batch(
+    ctx: click.Context,
+    sandbox_id: str | None,
+    jobs: int,
+    stop_on_error: bool,
+    list_ops: bool,
+) -> None:
+    """Run JSONL operations from stdin, streaming JSONL results to stdout.
+
+    Each line is {"id": ..., "op": "files.write", "sandbox_id": ..., "args": {...}}.
+    Ops mirror the files/exec/sandbox subcommands; results come back in input order.
+    """
+    if list_ops:
+        for name in sorted(OPS):
+            click.echo(name)
+        return
+
+    runner = BatchRunner(
+        provider=_get_provider(ctx),
+        jobs=jobs,
+        default_sandbox=sandbox_id,
+        stop_on_error=stop_on_error,
+    )
+    failed = False
+    for result in runner.run(sys.stdin):
+        failed = failed or not result["ok"]
+        click.echo(json.dumps(result, default=str))
+    if failed:
+        raise SystemExit(1)
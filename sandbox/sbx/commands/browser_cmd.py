@@ -1,7 +1,11 @@
 """Browser interaction commands for sandbox-hosted applications."""
 
+import json
+import os
+
 import click
 from rich.console import Console
+from rich.table import Table
 
 from sbx.errors import friendly_errors
 from sbx.modules.sandbox import get_sandbox
@@ -9,14 +13,30 @@ from sbx.modules.browser import (
     init_browser,
     start_browser,
     close_browser,
+    close_page,
     navigate,
     click_element,
     type_text,
     evaluate_js,
     take_screenshot,
+    diff_screenshot,
     get_accessibility_tree,
     get_dom,
+    snapshot_page,
+    set_routes,
+    save_har as save_har_file,
+    use_profile,
+    list_profiles,
+    reset_profile,
     browser_status,
+    run_steps,
+    capture_matrix,
+    measure_performance,
+    check_budgets,
+    DEFAULT_PAGE,
+    PERF_METRICS,
+    IMAGE_FORMATS,
+    SNAPSHOT_KINDS,
 )
 
 
@@ -38,31 +58,141 @@ def init(ctx: click.Context, sandbox_id: str) -> None:
     """Initialize browser environment in the sandbox."""
     console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
-    init_browser(sbx)
-    console.print("[green]Browser environment initialized[/green]")
+    if init_browser(sbx):
+        console.print("[green]Browser environment already installed[/green]")
+    else:
+        console.print("[green]Browser environment initialized[/green]")
+
+
+def _load_rules(rules_file) -> list[dict]:
+    if rules_file is None:
+        return []
+    try:
+        rules = json.load(rules_file)
+    except json.JSONDecodeError as e:
+        raise click.BadParameter(f"invalid JSON: {e}", param_hint="--rules")
+    if isinstance(rules, dict):
+        rules = rules.get("routes", [])
+    if not isinstance(rules, list) or not all(isinstance(r, dict) and r.get("url") for r in rules):
+        raise click.BadParameter('expected a list of rules, each with a "url"', param_hint="--rules")
+    return rules
 
 
 @browser.command()
 @click.argument("sandbox_id")
 @click.option("--headless/--no-headless", default=True, help="Run in headless mode")
+@click.option("--routes", "rules_file", type=click.File("r"), default=None, help="JSON route rules applied to every page (see `browser route`)")
+@click.option("--block-external", is_flag=True, help="Abort requests to hosts other than localhost in every page")
+@click.option("--profile", default=None, help="Open pages in this persistent profile (cache, cookies, storage)")
 @click.pass_context
 @friendly_errors
-def start(ctx: click.Context, sandbox_id: str, headless: bool) -> None:
+def start(ctx: click.Context, sandbox_id: str, headless: bool, rules_file, block_external: bool, profile: str | None) -> None:
     """Start a browser instance in the sandbox."""
     console = Console()
+    rules = _load_rules(rules_file)
+    sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    state = start_browser(sbx, headless=headless)
+    console.print(f"[green]Browser running[/green] (pid {state.get('pid')}, port {state.get('port')})")
+    console.print(f"[cyan]ws_endpoint:[/cyan] {state.get('ws_endpoint')}")
+    if rules or block_external:
+        result = set_routes(sbx, rules=rules, block_external=block_external, all_pages=True)
+        console.print(f"[green]{len(result['routes'])} route(s) applied to all pages[/green]")
+    if profile:
+        try:
+            info = use_profile(sbx, profile, default=True)
+        except ValueError as e:
+            console.print(f"[red]Error: {e}[/red]")
+            raise SystemExit(1)
+        console.print(f"[green]Pages open in profile {profile}[/green] ({info['dir']})")
+
+
+@browser.command()
+@click.argument("sandbox_id")
+@click.option("--page", "-p", "page", default=DEFAULT_PAGE, show_default=True, help="Named page (each has its own context)")
+@click.option("--all", "all_pages", is_flag=True, help="Apply to every page, and to pages, captures and perf runs started later")
+@click.option("--rules", "rules_file", type=click.File("r"), default=None, help="JSON list of rules ({url, status, json|body|file, abort, ...}); - for stdin")
+@click.option("--block-external", is_flag=True, help="Abort requests to hosts other than localhost")
+@click.option("--allow-host", "allow_hosts", multiple=True, help="Host still reachable with --block-external")
+@click.option("--har-replay", type=click.Path(exists=True, dir_okay=False), default=None, help="Answer requests from this local HAR file")
+@click.option("--har-fallback", is_flag=True, help="With --har-replay, send requests missing from the HAR to the network")
+@click.option("--har-record", is_flag=True, help="Record this page's traffic; fetch it with --save-har")
+@click.option("--har-url", default=None, help="Limit HAR replay/recording to URLs matching this glob")
+@click.option("--save-har", default=None, help="Close the recording page and download its HAR here")
+@click.option("--clear", is_flag=True, help="Remove existing routes first")
+@click.option("--json", "as_json", is_flag=True, help="Output the route table as JSON")
+@click.pass_context
+@friendly_errors
+def route(
+    ctx: click.Context,
+    sandbox_id: str,
+    page: str,
+    all_pages: bool,
+    rules_file,
+    block_external: bool,
+    allow_hosts: tuple[str, ...],
+    har_replay: str | None,
+    har_fallback: bool,
+    har_record: bool,
+    har_url: str | None,
+    save_har: str | None,
+    clear: bool,
+    as_json: bool,
+) -> None:
+    """Stub, block or record a page's network requests.
+
+    Rules are tried newest first; each matches a URL glob (or "re:" +
+    regex) and fulfills, aborts or continues the request. With no options
+    the current route table of the page is shown.
+    """
+    console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
-    start_browser(sbx, headless=headless)
-    console.print("[green]Browser started[/green]")
+    if save_har:
+        path = save_har_file(sbx, save_har, page=page)
+        console.print(f"[green]HAR saved to {path}[/green] (page {page} closed)")
+        return
+    try:
+        result = set_routes(
+            sbx,
+            page=page,
+            rules=_load_rules(rules_file),
+            block_external=block_external,
+            allow_hosts=list(allow_hosts),
+            har_replay=har_replay,
+            har_record=har_record,
+            har_url=har_url,
+            har_not_found="fallback" if har_fallback else "abort",
+            all_pages=all_pages,
+            clear=clear,
+        )
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise SystemExit(1)
+    if as_json:
+        click.echo(json.dumps(result, indent=2))
+        return
+    title = f"Routes for all pages ({result['pages']} open)" if all_pages else f"Routes for page {page}"
+    table = Table(title=title)
+    table.add_column("URL", style="cyan", overflow="fold")
+    table.add_column("Response")
+    table.add_column("Hits", justify="right")
+    for entry in reversed(result["routes"]):
+        table.add_row(entry["url"], entry["kind"], "" if entry["hits"] is None else str(entry["hits"]))
+    console.print(table)
 
 
 @browser.command()
 @click.argument("sandbox_id")
+@click.option("--page", "-p", "page", default=None, help="Close only this named page")
 @click.pass_context
 @friendly_errors
-def close(ctx: click.Context, sandbox_id: str) -> None:
-    """Close the browser instance."""
+def close(ctx: click.Context, sandbox_id: str, page: str | None) -> None:
+    """Close the browser instance (or one of its pages)."""
     console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    if page:
+        close_page(sbx, page)
+        console.print(f"[yellow]Page {page} closed[/yellow]")
+        return
     close_browser(sbx)
     console.print("[yellow]Browser closed[/yellow]")
 
@@ -70,26 +200,28 @@ def close(ctx: click.Context, sandbox_id: str) -> None:
 @browser.command()
 @click.argument("sandbox_id")
 @click.argument("url")
+@click.option("--page", "-p", "page", default=DEFAULT_PAGE, show_default=True, help="Named page (each has its own context)")
 @click.pass_context
 @friendly_errors
-def nav(ctx: click.Context, sandbox_id: str, url: str) -> None:
+def nav(ctx: click.Context, sandbox_id: str, url: str, page: str) -> None:
     """Navigate to a URL in the browser."""
     console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
-    navigate(sbx, url)
-    console.print(f"[green]Navigated to {url}[/green]")
+    result = navigate(sbx, url, page=page)
+    console.print(f"[green]Navigated to {result['url']}[/green] ({result.get('status')}) {result.get('title', '')}")
 
 
 @browser.command("click")
 @click.argument("sandbox_id")
 @click.argument("selector")
+@click.option("--page", "-p", "page", default=DEFAULT_PAGE, show_default=True, help="Named page (each has its own context)")
 @click.pass_context
 @friendly_errors
-def click_cmd(ctx: click.Context, sandbox_id: str, selector: str) -> None:
+def click_cmd(ctx: click.Context, sandbox_id: str, selector: str, page: str) -> None:
     """Click an element by CSS selector."""
     console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
-    click_element(sbx, selector)
+    click_element(sbx, selector, page=page)
     console.print(f"[green]Clicked {selector}[/green]")
 
 
@@ -97,67 +229,215 @@ def click_cmd(ctx: click.Context, sandbox_id: str, selector: str) -> None:
 @click.argument("sandbox_id")
 @click.argument("selector")
 @click.argument("text")
+@click.option("--page", "-p", "page", default=DEFAULT_PAGE, show_default=True, help="Named page (each has its own context)")
 @click.pass_context
 @friendly_errors
-def type_cmd(ctx: click.Context, sandbox_id: str, selector: str, text: str) -> None:
+def type_cmd(ctx: click.Context, sandbox_id: str, selector: str, text: str, page: str) -> None:
     """Type text into an element."""
     console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
-    type_text(sbx, selector, text)
+    type_text(sbx, selector, text, page=page)
     console.print(f"[green]Typed into {selector}[/green]")
 
 
 @browser.command()
 @click.argument("sandbox_id")
 @click.argument("script")
+@click.option("--page", "-p", "page", default=DEFAULT_PAGE, show_default=True, help="Named page (each has its own context)")
 @click.pass_context
 @friendly_errors
-def eval(ctx: click.Context, sandbox_id: str, script: str) -> None:
+def eval(ctx: click.Context, sandbox_id: str, script: str, page: str) -> None:
     """Evaluate JavaScript in the browser."""
     console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
-    result = evaluate_js(sbx, script)
+    result = evaluate_js(sbx, script, page=page)
     console.print(result)
 
 
+def _parse_numbers(value: str, sep: str, count: int, option: str) -> list[int]:
+    parts = value.lower().replace(" ", "").split(sep)
+    try:
+        numbers = [int(float(part)) for part in parts]
+    except ValueError:
+        numbers = []
+    if len(numbers) != count:
+        raise click.BadParameter(f"cannot parse {value!r}", param_hint=option)
+    return numbers
+
+
+def _parse_viewport(value: str | None) -> dict | None:
+    if not value:
+        return None
+    width, height = _parse_numbers(value, "x", 2, "--viewport")
+    return {"width": width, "height": height}
+
+
+def _parse_clip(value: str | None) -> dict | None:
+    if not value:
+        return None
+    x, y, width, height = _parse_numbers(value, ",", 4, "--clip")
+    return {"x": x, "y": y, "width": width, "height": height}
+
+
 @browser.command()
 @click.argument("sandbox_id")
-@click.option("--output", "-o", default="screenshot.png", help="Output file path")
+@click.option("--output", "-o", default=None, help="Output file path [default: screenshot.png, or diff.png with --diff-against]")
+@click.option("--page", "-p", "page", default=DEFAULT_PAGE, show_default=True, help="Named page (each has its own context)")
+@click.option("--format", "image_format", type=click.Choice(IMAGE_FORMATS), default=None, help="Image format [default: from --output extension, else png]")
+@click.option("--quality", type=click.IntRange(0, 100), default=None, help="JPEG/WebP quality")
+@click.option("--clip", default=None, help="Capture only the region X,Y,WIDTH,HEIGHT")
+@click.option("--viewport", default=None, help="Capture at this viewport size, e.g. 390x844")
+@click.option("--selector", "-s", default=None, help="Capture only this element")
+@click.option("--full-page/--no-full-page", default=True, help="Capture the whole scrollable page")
+@click.option("--save-baseline", default=None, help="Also keep this capture in the sandbox as baseline NAME")
+@click.option("--diff-against", default=None, help="Compare with baseline NAME in the sandbox; download only the diff")
+@click.option("--threshold", type=click.FloatRange(0, 1), default=0.1, show_default=True, help="Per-channel difference (0-1) that counts as changed")
+@click.option("--update-baseline", is_flag=True, help="With --diff-against, replace the baseline with this capture")
+@click.option("--json", "as_json", is_flag=True, help="Output the result as JSON")
 @click.pass_context
 @friendly_errors
-def screenshot(ctx: click.Context, sandbox_id: str, output: str) -> None:
-    """Take a screenshot of the browser."""
+def screenshot(
+    ctx: click.Context,
+    sandbox_id: str,
+    output: str | None,
+    page: str,
+    image_format: str | None,
+    quality: int | None,
+    clip: str | None,
+    viewport: str | None,
+    selector: str | None,
+    full_page: bool,
+    save_baseline: str | None,
+    diff_against: str | None,
+    threshold: float,
+    update_baseline: bool,
+    as_json: bool,
+) -> None:
+    """Take a screenshot of the browser and save it locally."""
     console = Console()
+    clip_region = _parse_clip(clip)
+    viewport_size = _parse_viewport(viewport)
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
-    take_screenshot(sbx, output)
-    console.print(f"[green]Screenshot saved to {output}[/green]")
+    try:
+        if diff_against:
+            result = diff_screenshot(
+                sbx,
+                diff_against,
+                output=output or "diff.png",
+                page=page,
+                threshold=threshold,
+                update_baseline=update_baseline,
+                clip=clip_region,
+                viewport=viewport_size,
+                full_page=full_page,
+                selector=selector,
+            )
+        else:
+            output = output or "screenshot.png"
+            if image_format is None:
+                ext = os.path.splitext(output)[1].lstrip(".").lower()
+                image_format = {"jpg": "jpeg"}.get(ext, ext) if ext in ("jpg", *IMAGE_FORMATS) else "png"
+            result = take_screenshot(
+                sbx,
+                output,
+                page=page,
+                image_format=image_format,
+                quality=quality,
+                clip=clip_region,
+                viewport=viewport_size,
+                full_page=full_page,
+                selector=selector,
+                save_baseline=save_baseline,
+            )
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise SystemExit(1)
+    if as_json:
+        click.echo(json.dumps(result, indent=2))
+    elif diff_against:
+        score = f"{result['similarity'] * 100:.2f}%"
+        if result["identical"]:
+            console.print(f"[green]No visual changes[/green] against {diff_against} ({score} similar)")
+        else:
+            console.print(
+                f"[yellow]{result['diff_pixels']} of {result['total_pixels']} pixels changed[/yellow] "
+                f"({score} similar); diff saved to {result['output']}"
+            )
+    else:
+        console.print(f"[green]Screenshot saved to {result['path']}[/green] ({result['size']} bytes, {result['format']})")
 
 
 @browser.command("a11y")
 @click.argument("sandbox_id")
+@click.option("--page", "-p", "page", default=DEFAULT_PAGE, show_default=True, help="Named page (each has its own context)")
 @click.pass_context
 @friendly_errors
-def a11y_cmd(ctx: click.Context, sandbox_id: str) -> None:
+def a11y_cmd(ctx: click.Context, sandbox_id: str, page: str) -> None:
     """Get the accessibility tree of the current page."""
     console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
-    tree = get_accessibility_tree(sbx)
+    tree = get_accessibility_tree(sbx, page=page)
     console.print(tree)
 
 
 @browser.command()
 @click.argument("sandbox_id")
 @click.option("--selector", "-s", default=None, help="CSS selector to scope DOM output")
+@click.option("--page", "-p", "page", default=DEFAULT_PAGE, show_default=True, help="Named page (each has its own context)")
 @click.pass_context
 @friendly_errors
-def dom(ctx: click.Context, sandbox_id: str, selector: str | None) -> None:
+def dom(ctx: click.Context, sandbox_id: str, selector: str | None, page: str) -> None:
     """Get the DOM structure of the current page."""
     console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
-    html = get_dom(sbx, selector=selector)
+    html = get_dom(sbx, selector=selector, page=page)
     console.print(html)
 
 
+@browser.command()
+@click.argument("sandbox_id")
+@click.option("--kind", "-k", type=click.Choice(SNAPSHOT_KINDS), default="dom", show_default=True, help="DOM outline or accessibility tree")
+@click.option("--selector", "-s", default=None, help="Snapshot only this subtree")
+@click.option("--depth", "-d", type=click.IntRange(0), default=None, help="Collapse nodes deeper than this")
+@click.option("--attrs", default=None, help="Comma-separated DOM attributes to keep (default: id,class,href,src,name,type,role,aria-label,placeholder,alt,for)")
+@click.option("--diff", is_flag=True, help="Only show what changed since the previous snapshot of this page")
+@click.option("--max-bytes", type=click.IntRange(0), default=20_000, show_default=True, help="Cut the output at this size (0 = no limit)")
+@click.option("--page", "-p", "page", default=DEFAULT_PAGE, show_default=True, help="Named page (each has its own context)")
+@click.option("--json", "as_json", is_flag=True, help="Output the result as JSON")
+@click.pass_context
+@friendly_errors
+def snapshot(
+    ctx: click.Context,
+    sandbox_id: str,
+    kind: str,
+    selector: str | None,
+    depth: int | None,
+    attrs: str | None,
+    diff: bool,
+    max_bytes: int,
+    page: str,
+    as_json: bool,
+) -> None:
+    """Compact, size-bounded outline of the DOM or accessibility tree."""
+    sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    result = snapshot_page(
+        sbx,
+        kind=kind,
+        page=page,
+        selector=selector,
+        depth=depth,
+        attributes=_split_values((attrs,)) if attrs is not None else None,
+        diff=diff,
+        max_bytes=max_bytes or None,
+    )
+    if as_json:
+        click.echo(json.dumps(result, indent=2))
+    elif result["diff"] and not result["changed"]:
+        click.echo("No changes since the previous snapshot")
+    else:
+        click.echo(result["text"])
+
+
 @browser.command()
 @click.argument("sandbox_id")
 @click.pass_context
@@ -167,5 +447,361 @@ def status(ctx: click.Context, sandbox_id: str) -> None:
     console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
     info = browser_status(sbx)
+    pages = info.pop("pages", [])
     for key, value in info.items():
         console.print(f"[cyan]{key}:[/cyan] {value}")
+    for entry in pages:
+        profile_note = f"  [dim](profile {entry['profile']})[/dim]" if entry.get("profile") else ""
+        console.print(f"  [bold]{entry['name']}[/bold]  {entry['url']}{profile_note}")
+
+
+def _step_summary(entry: dict) -> str:
+    if not entry.get("ok"):
+        return entry.get("error", "")
+    result = entry.get("result")
+    if isinstance(result, dict):
+        return result.get("url") or result.get("path") or json.dumps(result)
+    if result is None:
+        return ""
+    text = result if isinstance(result, str) else json.dumps(result)
+    return text if len(text) <= 80 else text[:77] + "..."
+
+
+@browser.command("run")
+@click.argument("sandbox_id")
+@click.argument("steps_file", type=click.File("r"))
+@click.option("--page", "-p", "page", default=DEFAULT_PAGE, show_default=True, help="Named page to run the steps on")
+@click.option("--out-dir", "-o", default=".", show_default=True, help="Where screenshot steps are saved")
+@click.option("--step-timeout", type=int, default=30, show_default=True, help="Seconds allowed per step")
+@click.option("--continue-on-error", is_flag=True, help="Run the remaining steps after a failure")
+@click.option("--json", "as_json", is_flag=True, help="Output the full report as JSON")
+@click.pass_context
+@friendly_errors
+def run_cmd(
+    ctx: click.Context,
+    sandbox_id: str,
+    steps_file,
+    page: str,
+    out_dir: str,
+    step_timeout: int,
+    continue_on_error: bool,
+    as_json: bool,
+) -> None:
+    """Run a JSON list of browser steps in one page, in one round-trip.
+
+    STEPS_FILE holds a list like [{"action": "navigate", "url": "..."},
+    {"action": "click", "selector": "#go"}] (or {"steps": [...]}); use -
+    for stdin.
+    """
+    console = Console()
+    try:
+        steps = json.load(steps_file)
+    except json.JSONDecodeError as e:
+        console.print(f"[red]Error: invalid steps file: {e}[/red]")
+        raise SystemExit(1)
+    if isinstance(steps, dict):
+        steps = steps.get("steps", [])
+    if not isinstance(steps, list):
+        console.print("[red]Error: steps file must hold a list of steps[/red]")
+        raise SystemExit(1)
+    sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    try:
+        report = run_steps(
+            sbx,
+            steps,
+            page=page,
+            step_timeout=step_timeout,
+            continue_on_error=continue_on_error,
+            artifacts_dir=out_dir,
+        )
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise SystemExit(1)
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+    else:
+        table = Table(title=f"Browser run ({report['ms']} ms)")
+        table.add_column("#", justify="right")
+        table.add_column("Action", style="cyan")
+        table.add_column("Status")
+        table.add_column("ms", justify="right")
+        table.add_column("Result")
+        for entry in report["steps"]:
+            status = "[green]ok[/green]" if entry.get("ok") else "[red]failed[/red]"
+            table.add_row(str(entry["index"]), entry["action"], status, str(entry["ms"]), _step_summary(entry))
+        console.print(table)
+        skipped = len(steps) - len(report["steps"])
+        if skipped:
+            console.print(f"[yellow]{skipped} step(s) not run[/yellow]")
+        final = report.get("final", {})
+        console.print(f"[cyan]final:[/cyan] {final.get('url')} {final.get('title', '')}")
+        for artifact in report["artifacts"]:
+            console.print(f"[green]saved[/green] {artifact['local_path']}")
+    if not report["ok"]:
+        raise SystemExit(1)
+
+
+def _split_values(values: tuple[str, ...]) -> list[str]:
+    return [part.strip() for value in values for part in value.split(",") if part.strip()]
+
+
+@browser.command("capture")
+@click.argument("sandbox_id")
+@click.option("--urls", "-u", multiple=True, required=True, help="URLs or paths to load (comma-separated or repeated)")
+@click.option("--viewports", "-v", multiple=True, help="WIDTHxHEIGHT or mobile/tablet/laptop/desktop/wide [default: desktop]")
+@click.option("--base-url", default=None, help="Prefix for relative --urls, e.g. http://localhost:3000")
+@click.option("--concurrency", "-c", type=click.IntRange(1, 32), default=4, show_default=True, help="Pages loading at once")
+@click.option("--out-dir", "-o", default="captures", show_default=True, help="Where screenshots are saved")
+@click.option("--format", "image_format", type=click.Choice(IMAGE_FORMATS), default="png", show_default=True)
+@click.option("--quality", type=click.IntRange(0, 100), default=None, help="JPEG/WebP quality")
+@click.option("--full-page/--no-full-page", default=True, help="Capture the whole scrollable page")
+@click.option("--no-screenshots", is_flag=True, help="Only collect titles, status and console errors")
+@click.option("--wait-until", type=click.Choice(["load", "domcontentloaded", "networkidle", "commit"]), default="load", show_default=True)
+@click.option("--timeout", type=int, default=30, show_default=True, help="Seconds allowed per page")
+@click.option("--json", "as_json", is_flag=True, help="Output the full report as JSON")
+@click.pass_context
+@friendly_errors
+def capture_cmd(
+    ctx: click.Context,
+    sandbox_id: str,
+    urls: tuple[str, ...],
+    viewports: tuple[str, ...],
+    base_url: str | None,
+    concurrency: int,
+    out_dir: str,
+    image_format: str,
+    quality: int | None,
+    full_page: bool,
+    no_screenshots: bool,
+    wait_until: str,
+    timeout: int,
+    as_json: bool,
+) -> None:
+    """Capture every URL at every viewport in parallel, in one browser."""
+    console = Console()
+    targets = _split_values(urls)
+    if base_url:
+        targets = [t if "://" in t else base_url.rstrip("/") + "/" + t.lstrip("/") for t in targets]
+    sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    try:
+        report = capture_matrix(
+            sbx,
+            targets,
+            _split_values(viewports) or ["desktop"],
+            concurrency=concurrency,
+            out_dir=None if no_screenshots else out_dir,
+            image_format=image_format,
+            quality=quality,
+            full_page=full_page,
+            wait_until=wait_until,
+            timeout=timeout,
+        )
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise SystemExit(1)
+    results = report["results"]
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+    else:
+        table = Table(title=f"Captured {len(results)} page(s) in {report['ms']} ms")
+        table.add_column("URL", style="cyan", overflow="fold")
+        table.add_column("Viewport")
+        table.add_column("Status")
+        table.add_column("Title")
+        table.add_column("Errors", justify="right")
+        table.add_column("ms", justify="right")
+        table.add_column("Screenshot")
+        for entry in results:
+            if entry.get("ok"):
+                status = str(entry.get("status") or "")
+            else:
+                status = f"[red]{entry.get('error', 'failed')}[/red]"
+            errors = len(entry.get("console_errors", []))
+            table.add_row(
+                entry["url"],
+                f"{entry['width']}x{entry['height']}",
+                status,
+                entry.get("title") or "",
+                f"[red]{errors}[/red]" if errors else "0",
+                str(entry["ms"]),
+                entry.get("screenshot") or "",
+            )
+        console.print(table)
+    if not all(entry.get("ok") for entry in results):
+        raise SystemExit(1)
+
+
+def _parse_budgets(values: tuple[str, ...]) -> dict[str, float]:
+    budgets = {}
+    for item in _split_values(values):
+        metric, sep, limit = item.partition("=")
+        try:
+            budgets[metric.strip()] = float(limit)
+        except ValueError:
+            sep = ""
+        if not sep:
+            raise click.BadParameter(f"expected METRIC=LIMIT, got {item!r}", param_hint="--budget")
+        if metric.strip() not in PERF_METRICS:
+            raise click.BadParameter(f"unknown metric {metric.strip()!r}", param_hint="--budget")
+    return budgets
+
+
+def _fmt_ms(value) -> str:
+    return "-" if value is None else f"{value:,.0f} ms"
+
+
+@browser.command("perf")
+@click.argument("sandbox_id")
+@click.argument("url")
+@click.option("--viewport", default=None, help="WIDTHxHEIGHT or mobile/tablet/laptop/desktop/wide")
+@click.option("--wait-until", type=click.Choice(["load", "domcontentloaded", "networkidle", "commit"]), default="load", show_default=True)
+@click.option("--settle", type=float, default=1.0, show_default=True, help="Seconds to keep observing after load")
+@click.option("--cpu-throttle", type=click.FloatRange(1), default=1.0, show_default=True, help="CPU slowdown factor, e.g. 4")
+@click.option("--cpu-profile", default=None, help="Record a V8 CPU profile to this local .cpuprofile file")
+@click.option("--trace", default=None, help="Record a Chromium trace to this local .json file")
+@click.option("--budget", "-b", multiple=True, help=f"Fail if METRIC exceeds LIMIT, e.g. lcp=2500 ({', '.join(PERF_METRICS)})")
+@click.option("--timeout", type=int, default=60, show_default=True, help="Seconds allowed for the page load")
+@click.option("--json", "as_json", is_flag=True, help="Output the full report as JSON")
+@click.pass_context
+@friendly_errors
+def perf_cmd(
+    ctx: click.Context,
+    sandbox_id: str,
+    url: str,
+    viewport: str | None,
+    wait_until: str,
+    settle: float,
+    cpu_throttle: float,
+    cpu_profile: str | None,
+    trace: str | None,
+    budget: tuple[str, ...],
+    timeout: int,
+    as_json: bool,
+) -> None:
+    """Load URL and report timing, web vitals, resources and JS heap."""
+    console = Console()
+    budgets = _parse_budgets(budget)
+    sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    try:
+        report = measure_performance(
+            sbx,
+            url,
+            viewport=viewport,
+            wait_until=wait_until,
+            settle=settle,
+            cpu_throttle=cpu_throttle,
+            cpu_profile=cpu_profile,
+            trace=trace,
+            timeout=timeout,
+        )
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise SystemExit(1)
+    results = check_budgets(report, budgets)
+    if budgets:
+        report["budgets"] = results
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+    else:
+        nav_timing = report.get("navigation") or {}
+        vitals = report["vitals"]
+        resources = report["resources"]
+        runtime = report["runtime"]
+        long_tasks = report["long_tasks"]
+        table = Table(title=f"{report['url']} ({report.get('status')})", show_header=False)
+        table.add_column("Metric", style="cyan")
+        table.add_column("Value", justify="right")
+        table.add_row("TTFB", _fmt_ms(nav_timing.get("ttfb")))
+        table.add_row("First contentful paint", _fmt_ms(report["paint"]["first_contentful_paint"]))
+        table.add_row("DOMContentLoaded", _fmt_ms(nav_timing.get("dom_content_loaded")))
+        table.add_row("Load", _fmt_ms(nav_timing.get("load")))
+        lcp = _fmt_ms(vitals["lcp"])
+        table.add_row("LCP", f"{lcp} ({vitals['lcp_element']})" if vitals.get("lcp_element") else lcp)
+        table.add_row("CLS", f"{vitals['cls']:.3f}")
+        table.add_row("TBT", _fmt_ms(vitals["tbt"]))
+        table.add_row("Long tasks", f"{long_tasks['count']} (longest {_fmt_ms(long_tasks['longest_ms'])})")
+        table.add_row("Requests", str(resources["count"]))
+        table.add_row("Transferred", f"{resources['transfer_bytes'] / 1024:,.1f} KB")
+        table.add_row("JS heap used", f"{(runtime.get('js_heap_used_bytes') or 0) / 1048576:,.1f} MB")
+        table.add_row("DOM nodes", str(runtime.get("dom_nodes")))
+        console.print(table)
+        for kind, path in report.get("artifacts", {}).items():
+            console.print(f"[green]Saved {kind.replace('_', ' ')}: {path}[/green]")
+        for entry in results:
+            mark = "[green]ok[/green]" if entry["ok"] else "[red]over budget[/red]"
+            console.print(f"  {entry['metric']}: {entry['value']} / {entry['limit']}  {mark}")
+    if not all(entry["ok"] for entry in results):
+        raise SystemExit(1)
+
+
+@browser.group()
+def profile() -> None:
+    """Persistent browser profiles (HTTP cache, cookies, storage)."""
+
+
+@profile.command("use")
+@click.argument("sandbox_id")
+@click.argument("name", default="default")
+@click.option("--page", "-p", "page", default=DEFAULT_PAGE, show_default=True, help="Named page to open in the profile")
+@click.option("--default", "make_default", is_flag=True, help="Open every page created later in this profile too")
+@click.option("--max-mb", type=click.IntRange(16), default=512, show_default=True, help="Size cap; caches are dropped past it")
+@click.pass_context
+@friendly_errors
+def profile_use(ctx: click.Context, sandbox_id: str, name: str, page: str, make_default: bool, max_mb: int) -> None:
+    """Open a page in persistent profile NAME (created on first use)."""
+    console = Console()
+    sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    try:
+        info = use_profile(sbx, name, page=page, max_mb=max_mb, default=make_default)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise SystemExit(1)
+    console.print(
+        f"[green]Page {page} open in profile {name}[/green] "
+        f"({info['size_bytes'] / 1048576:.1f} MB{', caches trimmed' if info['trimmed'] else ''})"
+    )
+    if info["default"]:
+        console.print("[cyan]New pages will open in this profile[/cyan]")
+
+
+@profile.command("list")
+@click.argument("sandbox_id")
+@click.option("--json", "as_json", is_flag=True, help="Output as JSON")
+@click.pass_context
+@friendly_errors
+def profile_list(ctx: click.Context, sandbox_id: str, as_json: bool) -> None:
+    """List the browser profiles in the sandbox."""
+    console = Console()
+    sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    profiles = list_profiles(sbx)
+    if as_json:
+        click.echo(json.dumps(profiles, indent=2))
+        return
+    if not profiles:
+        console.print("No browser profiles")
+        return
+    table = Table(title="Browser profiles")
+    table.add_column("Name", style="cyan")
+    table.add_column("Size", justify="right")
+    table.add_column("Open")
+    for entry in profiles:
+        table.add_row(entry["name"], f"{entry['size_bytes'] / 1048576:.1f} MB", "yes" if entry["open"] else "")
+    console.print(table)
+
+
+@profile.command("reset")
+@click.argument("sandbox_id")
+@click.argument("name", default="default")
+@click.option("--cache-only", is_flag=True, help="Drop only the caches; keep cookies and storage")
+@click.pass_context
+@friendly_errors
+def profile_reset(ctx: click.Context, sandbox_id: str, name: str, cache_only: bool) -> None:
+    """Close profile NAME and delete it (or just its caches)."""
+    console = Console()
+    sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    try:
+        reset_profile(sbx, name, cache_only=cache_only)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise SystemExit(1)
+    console.print(f"[green]Profile {name} {'caches cleared' if cache_only else 'reset'}[/green]")
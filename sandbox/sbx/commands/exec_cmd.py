@@ -1,5 +1,7 @@
 """Command execution inside sandboxes."""
 
+import json
+
 import click
 from rich.console import Console
 from rich.syntax import Syntax
@@ -7,6 +9,7 @@ from rich.syntax import Syntax
 from sbx.errors import friendly_errors
 from sbx.modules.sandbox import get_sandbox
 from sbx.modules.commands import run_command, run_background, list_processes, kill_process
+from sbx.modules.shell_session import open_session, run_in_session, close_session, list_sessions
 
 
 @click.group("exec")
@@ -24,6 +27,8 @@ def exec_group() -> None:
 @click.option("--root", is_flag=True, help="Run as root user")
 @click.option("--timeout", "-t", default=60, help="Timeout in seconds")
 @click.option("--background", "-b", is_flag=True, help="Run in background")
+@click.option("--max-output", type=click.FloatRange(0), default=None, help="Cap per output stream in MB (0 = no cap) [default: SBX_MAX_OUTPUT_MB or 16]")
+@click.option("--no-spill", is_flag=True, help="Drop output over the cap instead of keeping it in the sandbox")
 @click.pass_context
 @friendly_errors
 def run(
@@ -36,6 +41,8 @@ def run(
     root: bool,
     timeout: int,
     background: bool,
+    max_output: float | None,
+    no_spill: bool,
 ) -> None:
     """Run a command inside a sandbox."""
     console = Console()
@@ -54,6 +61,9 @@ def run(
         console.print(f"[green]Background process started:[/green] PID {proc.pid}")
         return
 
+    limits = {}
+    if max_output is not None:
+        limits["max_output"] = int(max_output * 1024 * 1024) or None
     result = run_command(
         sbx,
         command,
@@ -61,13 +71,129 @@ def run(
         env_vars=env_vars,
         user="root" if root else "user",
         timeout=timeout,
+        spill=not no_spill,
+        **limits,
     )
 
     if result.stdout:
         console.print(result.stdout, end="")
     if result.stderr:
         console.print(f"[red]{result.stderr}[/red]", end="")
+    if result.truncated:
+        console.print(
+            f"\n[yellow]Output truncated (stdout {result.stdout_size:,} bytes, "
+            f"stderr {result.stderr_size:,} bytes)[/yellow]"
+        )
+        if result.spill_path:
+            console.print(f"[yellow]Full output: {result.spill_path}/stdout, {result.spill_path}/stderr[/yellow]")
     if result.exit_code != 0:
         console.print(f"\n[red]Exit code: {result.exit_code}[/red]")
     else:
         console.print(f"\n[green]Exit code: {result.exit_code}[/green]")
+
+
+def _print_result(console: Console, result) -> None:
+    if result.stdout:
+        console.print(result.stdout, end="", markup=False, highlight=False)
+    if result.stderr:
+        console.print(result.stderr, end="", style="red", markup=False, highlight=False)
+
+
+@exec_group.group()
+def session() -> None:
+    """Persistent shell sessions (cwd, env and functions survive between commands)."""
+
+
+@session.command("open")
+@click.argument("sandbox_id")
+@click.option("--name", "-n", default=None, help="Session name [default: generated]")
+@click.option("--cwd", default="/workspace", help="Starting directory inside sandbox")
+@click.option("--env", "-e", multiple=True, help="Environment variable (KEY=VALUE)")
+@click.option("--root", is_flag=True, help="Run the session as root user")
+@click.option("--login", is_flag=True, help="Source /etc/profile and ~/.profile once at start")
+@click.pass_context
+@friendly_errors
+def session_open(
+    ctx: click.Context,
+    sandbox_id: str,
+    name: str | None,
+    cwd: str,
+    env: tuple[str, ...],
+    root: bool,
+    login: bool,
+) -> None:
+    """Start a long-lived shell in the sandbox and print its name."""
+    console = Console()
+    provider = ctx.obj.get("provider") if ctx.obj else None
+    sbx = get_sandbox(sandbox_id, provider=provider)
+    env_vars = dict(e.partition("=")[::2] for e in env)
+    try:
+        info = open_session(sbx, name=name, cwd=cwd, env_vars=env_vars, user="root" if root else "user", login=login)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise SystemExit(1)
+    console.print(f"[green]Session opened:[/green] {info['name']} (cwd {info['cwd']})")
+
+
+@session.command("run")
+@click.argument("sandbox_id")
+@click.argument("name")
+@click.argument("command")
+@click.option("--timeout", "-t", default=60, help="Timeout in seconds")
+@click.pass_context
+@friendly_errors
+def session_run(ctx: click.Context, sandbox_id: str, name: str, command: str, timeout: int) -> None:
+    """Run COMMAND in session NAME; exits with the command's exit code."""
+    console = Console()
+    provider = ctx.obj.get("provider") if ctx.obj else None
+    sbx = get_sandbox(sandbox_id, provider=provider)
+    try:
+        result = run_in_session(sbx, name, command, timeout=timeout)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise SystemExit(1)
+    _print_result(console, result)
+    raise SystemExit(result.exit_code)
+
+
+@session.command("close")
+@click.argument("sandbox_id")
+@click.argument("name")
+@click.pass_context
+@friendly_errors
+def session_close(ctx: click.Context, sandbox_id: str, name: str) -> None:
+    """Stop session NAME and anything still running in it."""
+    console = Console()
+    provider = ctx.obj.get("provider") if ctx.obj else None
+    sbx = get_sandbox(sandbox_id, provider=provider)
+    try:
+        closed = close_session(sbx, name)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise SystemExit(1)
+    if closed:
+        console.print(f"[green]Session closed:[/green] {name}")
+    else:
+        console.print(f"[yellow]No such session: {name}[/yellow]")
+
+
+@session.command("list")
+@click.argument("sandbox_id")
+@click.option("--json", "as_json", is_flag=True, help="Output as JSON")
+@click.pass_context
+@friendly_errors
+def session_list(ctx: click.Context, sandbox_id: str, as_json: bool) -> None:
+    """List shell sessions in the sandbox."""
+    console = Console()
+    provider = ctx.obj.get("provider") if ctx.obj else None
+    sbx = get_sandbox(sandbox_id, provider=provider)
+    sessions = list_sessions(sbx)
+    if as_json:
+        click.echo(json.dumps(sessions, indent=2))
+        return
+    if not sessions:
+        console.print("No shell sessions")
+        return
+    for entry in sessions:
+        state = "[green]running[/green]" if entry["alive"] else "[red]exited[/red]"
+        console.print(f"  [bold]{entry['name']}[/bold]  {state}  {entry['cwd']}")
@@ -1,6 +1,8 @@
 """File operations inside sandboxes."""
 
+import json
 import os
+import time
 
 import click
 from rich.console import Console
@@ -11,8 +13,14 @@ from sbx.modules.sandbox import get_sandbox
 from sbx.errors import friendly_errors
 from sbx.modules.files import (
     list_files,
+    walk_files_remote,
+    entry_to_dict,
     read_file,
+    read_lines,
+    read_range,
+    tail_file,
     write_file,
+    edit_file,
     upload_file,
     download_file,
     upload_dir,
@@ -22,13 +30,25 @@ from sbx.modules.files import (
     mkdir_in_sandbox,
     remove_in_sandbox,
     move_in_sandbox,
+    copy_in_sandbox,
 )
+from sbx.modules.checkpoint import changed_since, create_checkpoint, download_changed
+from sbx.modules.remote_edit import apply_edits, parse_unified_diff, replacement_spec
+from sbx.modules.search import search
+from sbx.modules.sync import sync_dir
+from sbx.modules.watch import watch
 
 
 def _get_provider(ctx: click.Context) -> str | None:
     return ctx.obj.get("provider") if ctx.obj else None
 
 
+def _transfer_stats(sbx) -> dict | None:
+    """Transfer sizes/throughput recorded by the backend, if it tracks them."""
+    stats = getattr(sbx.filesystem, "stats", None)
+    return stats.to_dict() if stats is not None else None
+
+
 @click.group()
 def files() -> None:
     """File operations inside a sandbox."""
@@ -38,38 +58,129 @@ def files() -> None:
 @files.command("ls")
 @click.argument("sandbox_id")
 @click.argument("path", default="/workspace")
+@click.option("--recursive", "-r", is_flag=True, help="List the whole tree in one call")
+@click.option("--max-depth", type=int, default=None, help="Limit recursion depth (implies -r)")
+@click.option("--pattern", default=None, help="Only entries whose name matches this glob (implies -r)")
+@click.option("--json", "as_json", is_flag=True, help="Output as JSON")
 @click.pass_context
 @friendly_errors
-def ls_cmd(ctx: click.Context, sandbox_id: str, path: str) -> None:
+def ls_cmd(
+    ctx: click.Context,
+    sandbox_id: str,
+    path: str,
+    recursive: bool,
+    max_depth: int | None,
+    pattern: str | None,
+    as_json: bool,
+) -> None:
     """List files in a sandbox directory."""
     console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
-    entries = list_files(sbx, path)
+    if recursive or max_depth is not None or pattern:
+        entries = walk_files_remote(sbx, path, max_depth=max_depth, pattern=pattern)
+    else:
+        entries = list_files(sbx, path)
+    rows = [entry_to_dict(e) for e in entries]
+    if as_json:
+        click.echo(json.dumps(rows, indent=2))
+        return
+    base = path.rstrip("/")
     table = Table(title=f"Files in {path}")
     table.add_column("Name", style="cyan")
     table.add_column("Type", style="green")
-    for entry in entries:
-        entry_type = "dir" if getattr(entry, "is_dir", False) else "file"
-        table.add_row(entry.name, entry_type)
+    table.add_column("Size", justify="right")
+    table.add_column("Modified")
+    table.add_column("Mode")
+    for row in rows:
+        name = row["path"][len(base):].lstrip("/") if row["path"].startswith(base) else row["name"]
+        if row.get("symlink_target"):
+            name = f"{name} -> {row['symlink_target']}"
+        modified = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["modified"])) if row["modified"] else ""
+        table.add_row(name, row["type"], str(row["size"]), modified, row["permissions"])
     console.print(table)
 
 
+_SYNTAX_EXTS = ("js", "ts", "tsx", "jsx", "py", "json", "yaml", "yml", "md", "css", "html")
+
+# Larger content is printed as-is; highlighting it would stall the terminal
+_HIGHLIGHT_MAX_BYTES = 1024 * 1024
+
+
+def _parse_span(value: str, option: str) -> tuple[int, int | None]:
+    """Parse "A:B" (either side optional) into integers."""
+    first, sep, second = value.partition(":")
+    try:
+        start = int(first) if first else None
+        end = int(second) if second else None
+    except ValueError:
+        raise click.BadParameter(f"expected A:B, got {value!r}", param_hint=option)
+    if not sep and start is not None:
+        end = start
+    return start, end
+
+
 @files.command()
 @click.argument("sandbox_id")
 @click.argument("path")
+@click.option("--lines", "line_span", default=None, help="Only lines A:B (1-based, inclusive; A: reads to the end)")
+@click.option("--tail", "tail_lines", type=int, default=None, help="Only the last N lines")
+@click.option("--follow", "-f", is_flag=True, help="Keep printing lines as they are appended (Ctrl-C to stop)")
+@click.option("--bytes", "byte_span", default=None, help="Raw bytes OFFSET:LENGTH, written to stdout")
 @click.pass_context
 @friendly_errors
-def read(ctx: click.Context, sandbox_id: str, path: str) -> None:
-    """Read a file from the sandbox."""
+def read(
+    ctx: click.Context,
+    sandbox_id: str,
+    path: str,
+    line_span: str | None,
+    tail_lines: int | None,
+    follow: bool,
+    byte_span: str | None,
+) -> None:
+    """Read a file (or a slice of it) from the sandbox."""
     console = Console()
+    if sum(x is not None for x in (line_span, tail_lines, byte_span)) > 1:
+        console.print("[red]Error: use only one of --lines, --tail and --bytes[/red]")
+        raise SystemExit(1)
+    if follow and (line_span or byte_span):
+        console.print("[red]Error: --follow only combines with --tail[/red]")
+        raise SystemExit(1)
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
-    content = read_file(sbx, path)
     ext = os.path.splitext(path)[1].lstrip(".")
-    if ext in ("js", "ts", "tsx", "jsx", "py", "json", "yaml", "yml", "md", "css", "html"):
-        syntax = Syntax(content, ext, theme="monokai", line_numbers=True)
+    start_line = 1
+    try:
+        if byte_span is not None:
+            offset, length = _parse_span(byte_span, "--bytes")
+            if length is None:
+                raise click.BadParameter("expected OFFSET:LENGTH", param_hint="--bytes")
+            click.get_binary_stream("stdout").write(read_range(sbx, path, offset or 0, length))
+            return
+        if tail_lines is not None or follow:
+            lines = tail_file(sbx, path, 10 if tail_lines is None else tail_lines, follow)
+            try:
+                for line in lines:
+                    click.echo(line)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                close = getattr(lines, "close", None)
+                if close:
+                    close()
+            return
+        if line_span is not None:
+            start, end = _parse_span(line_span, "--lines")
+            start_line = start or 1
+            content = read_lines(sbx, path, start_line, end)
+        else:
+            content = read_file(sbx, path)
+    except (ValueError, FileNotFoundError) as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise SystemExit(1)
+    if ext in _SYNTAX_EXTS and len(content) <= _HIGHLIGHT_MAX_BYTES:
+        syntax = Syntax(content, ext, theme="monokai", line_numbers=True, start_line=start_line)
         console.print(syntax)
     else:
-        console.print(content)
+        click.echo(content, nl=not content.endswith("\n"))
 
 
 @files.command()
@@ -97,26 +208,106 @@ def edit(ctx: click.Context, sandbox_id: str, path: str, old_text: str, new_text
     """Edit a file by replacing text."""
     console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
-    content = read_file(sbx, path)
-    if old_text not in content:
+    if not edit_file(sbx, path, old_text, new_text):
         console.print("[red]Error: old_text not found in file[/red]")
         raise SystemExit(1)
-    updated = content.replace(old_text, new_text, 1)
-    write_file(sbx, path, updated)
     console.print(f"[green]Edited {path}[/green]")
 
 
+def _print_edit_report(console: Console, report: dict, as_json: bool) -> None:
+    """Show per-file / per-hunk results of a remote edit and exit 1 on failure."""
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+    else:
+        verb = "Would apply" if report.get("dry_run") else "Applied"
+        for file_report in report["files"]:
+            results = file_report.get("results", [])
+            if file_report.get("ok"):
+                console.print(
+                    f"[green]{verb} {file_report['applied']}/{len(results)} to {file_report['path']}[/green]"
+                )
+                continue
+            reason = file_report.get("error") or f"{file_report.get('applied', 0)}/{len(results)} applied"
+            console.print(f"[red]{file_report['path']}: {reason}[/red]")
+            for r in results:
+                label = f"hunk {r['hunk']}" if "hunk" in r else f"edit {r['edit']}"
+                mark = "[green]ok[/green]" if r["ok"] else f"[red]{r['error']}[/red]"
+                console.print(f"  {label}: {mark}")
+        if not report["ok"]:
+            console.print("[red]Nothing was written.[/red]")
+    if not report["ok"]:
+        raise SystemExit(1)
+
+
+@files.command("multi-edit")
+@click.argument("sandbox_id")
+@click.argument("edits_file", type=click.File("r"), default="-")
+@click.option("--root", default="/workspace", help="Directory relative paths are resolved against")
+@click.option("--dry-run", is_flag=True, help="Check that every edit applies without writing")
+@click.option("--json", "as_json", is_flag=True, help="Output per-edit results as JSON")
+@click.pass_context
+@friendly_errors
+def multi_edit(
+    ctx: click.Context, sandbox_id: str, edits_file, root: str, dry_run: bool, as_json: bool
+) -> None:
+    """Apply many text replacements, across files, in one step.
+
+    EDITS_FILE (default: stdin) is a JSON list of
+    {"path", "old_text", "new_text", "replace_all"} objects. The edits are
+    applied inside the sandbox; either all of them apply or nothing is written.
+    """
+    console = Console()
+    try:
+        files_spec = replacement_spec(json.load(edits_file), root=root)
+    except (json.JSONDecodeError, ValueError, TypeError) as exc:
+        console.print(f"[red]Error: invalid edits: {exc}[/red]")
+        raise SystemExit(1)
+    sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    _print_edit_report(console, apply_edits(sbx, files_spec, dry_run=dry_run), as_json)
+
+
+@files.command()
+@click.argument("sandbox_id")
+@click.argument("patch_file", type=click.File("r"), default="-")
+@click.option("--root", default="/workspace", help="Directory the diff paths are relative to")
+@click.option("-p", "--strip", type=int, default=1, help="Strip N leading path components (like patch -p)")
+@click.option("--dry-run", is_flag=True, help="Check that every hunk applies without writing")
+@click.option("--json", "as_json", is_flag=True, help="Output per-hunk results as JSON")
+@click.pass_context
+@friendly_errors
+def patch(
+    ctx: click.Context, sandbox_id: str, patch_file, root: str, strip: int, dry_run: bool, as_json: bool
+) -> None:
+    """Apply a unified diff (one or many files) inside the sandbox.
+
+    PATCH_FILE defaults to stdin. Only the diff is sent; hunks are located
+    with their context (tolerating line offsets) and either every hunk
+    applies or nothing is written.
+    """
+    console = Console()
+    files_spec = parse_unified_diff(patch_file.read(), root=root, strip=strip)
+    if not files_spec:
+        console.print("[red]Error: no hunks found in patch[/red]")
+        raise SystemExit(1)
+    sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    _print_edit_report(console, apply_edits(sbx, files_spec, dry_run=dry_run), as_json)
+
+
 @files.command()
 @click.argument("sandbox_id")
 @click.argument("local_path")
 @click.argument("remote_path")
+@click.option("--json", "as_json", is_flag=True, help="Output transfer stats as JSON (for agents)")
 @click.pass_context
 @friendly_errors
-def upload(ctx: click.Context, sandbox_id: str, local_path: str, remote_path: str) -> None:
+def upload(ctx: click.Context, sandbox_id: str, local_path: str, remote_path: str, as_json: bool) -> None:
     """Upload a local file to the sandbox."""
     console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
     upload_file(sbx, local_path, remote_path)
+    if as_json:
+        click.echo(json.dumps({"remote_path": remote_path, "transfer": _transfer_stats(sbx)}, indent=2))
+        return
     console.print(f"[green]Uploaded {local_path} -> {remote_path}[/green]")
 
 
@@ -124,13 +315,17 @@ def upload(ctx: click.Context, sandbox_id: str, local_path: str, remote_path: st
 @click.argument("sandbox_id")
 @click.argument("remote_path")
 @click.argument("local_path")
+@click.option("--json", "as_json", is_flag=True, help="Output transfer stats as JSON (for agents)")
 @click.pass_context
 @friendly_errors
-def download(ctx: click.Context, sandbox_id: str, remote_path: str, local_path: str) -> None:
+def download(ctx: click.Context, sandbox_id: str, remote_path: str, local_path: str, as_json: bool) -> None:
     """Download a file from the sandbox."""
     console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
     download_file(sbx, remote_path, local_path)
+    if as_json:
+        click.echo(json.dumps({"local_path": local_path, "transfer": _transfer_stats(sbx)}, indent=2))
+        return
     console.print(f"[green]Downloaded {remote_path} -> {local_path}[/green]")
 
 
@@ -138,13 +333,20 @@ def download(ctx: click.Context, sandbox_id: str, remote_path: str, local_path:
 @click.argument("sandbox_id")
 @click.argument("local_dir")
 @click.argument("remote_dir")
+@click.option("--no-ignore", is_flag=True, help="Include files matched by .gitignore/.sbxignore and built-in ignores")
+@click.option("--json", "as_json", is_flag=True, help="Output transfer stats as JSON (for agents)")
 @click.pass_context
 @friendly_errors
-def upload_dir_cmd(ctx: click.Context, sandbox_id: str, local_dir: str, remote_dir: str) -> None:
+def upload_dir_cmd(
+    ctx: click.Context, sandbox_id: str, local_dir: str, remote_dir: str, no_ignore: bool, as_json: bool
+) -> None:
     """Upload a local directory to the sandbox recursively."""
     console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
-    count = upload_dir(sbx, local_dir, remote_dir)
+    count = upload_dir(sbx, local_dir, remote_dir, use_ignore=not no_ignore)
+    if as_json:
+        click.echo(json.dumps({"files": count, "transfer": _transfer_stats(sbx)}, indent=2))
+        return
     console.print(f"[green]Uploaded {count} files to {remote_dir}[/green]")
 
 
@@ -152,16 +354,70 @@ def upload_dir_cmd(ctx: click.Context, sandbox_id: str, local_dir: str, remote_d
 @click.argument("sandbox_id")
 @click.argument("remote_dir")
 @click.argument("local_dir")
+@click.option("--no-ignore", is_flag=True, help="Include files matched by .gitignore/.sbxignore and built-in ignores")
+@click.option("--json", "as_json", is_flag=True, help="Output transfer stats as JSON (for agents)")
 @click.pass_context
 @friendly_errors
-def download_dir_cmd(ctx: click.Context, sandbox_id: str, remote_dir: str, local_dir: str) -> None:
+def download_dir_cmd(
+    ctx: click.Context, sandbox_id: str, remote_dir: str, local_dir: str, no_ignore: bool, as_json: bool
+) -> None:
     """Download a sandbox directory to local recursively."""
     console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
-    count = download_dir(sbx, remote_dir, local_dir)
+    skipped: list[str] = []
+    count = download_dir(sbx, remote_dir, local_dir, use_ignore=not no_ignore, skipped=skipped)
+    if as_json:
+        click.echo(json.dumps({"files": count, "skipped": skipped, "transfer": _transfer_stats(sbx)}, indent=2))
+        return
+    for message in skipped:
+        console.print(f"[yellow]Skipped: {message}[/yellow]")
     console.print(f"[green]Downloaded {count} files to {local_dir}[/green]")
 
 
+@files.command()
+@click.argument("sandbox_id")
+@click.argument("local_dir")
+@click.argument("remote_dir")
+@click.option("--delete/--no-delete", default=True, help="Delete sandbox files missing locally")
+@click.option("--dry-run", is_flag=True, help="Show what would change without transferring")
+@click.option("--no-ignore", is_flag=True, help="Include files matched by .gitignore/.sbxignore and built-in ignores")
+@click.option("--json", "as_json", is_flag=True, help="Output results as JSON (for agents)")
+@click.pass_context
+@friendly_errors
+def sync(
+    ctx: click.Context,
+    sandbox_id: str,
+    local_dir: str,
+    remote_dir: str,
+    delete: bool,
+    dry_run: bool,
+    no_ignore: bool,
+    as_json: bool,
+) -> None:
+    """Incrementally sync a local directory into the sandbox."""
+    sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    result = sync_dir(
+        sbx, local_dir, remote_dir, delete=delete, dry_run=dry_run, use_ignore=not no_ignore
+    )
+    if as_json:
+        click.echo(json.dumps({**result.to_dict(), "transfer": _transfer_stats(sbx)}, indent=2))
+        return
+    console = Console()
+    if dry_run and result.plan:
+        for path in result.plan.added:
+            console.print(f"[green]+ {path}[/green]")
+        for path in result.plan.changed:
+            console.print(f"[yellow]~ {path}[/yellow]")
+        for path in result.plan.deleted:
+            console.print(f"[red]- {path}[/red]")
+    verb = "Would sync" if dry_run else "Synced"
+    console.print(
+        f"[green]{verb} {local_dir} -> {remote_dir}:[/green] "
+        f"{result.added} added, {result.changed} changed, {result.deleted} deleted, "
+        f"{result.unchanged} unchanged ({result.bytes_sent} bytes, {result.seconds:.2f}s)"
+    )
+
+
 @files.command()
 @click.argument("sandbox_id")
 @click.argument("path")
@@ -195,13 +451,27 @@ def rm(ctx: click.Context, sandbox_id: str, path: str) -> None:
 @click.pass_context
 @friendly_errors
 def mv(ctx: click.Context, sandbox_id: str, src: str, dst: str) -> None:
-    """Move/rename a file in the sandbox."""
+    """Move/rename a file or directory in the sandbox."""
     console = Console()
     sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
     move_in_sandbox(sbx, src, dst)
     console.print(f"[green]Moved {src} -> {dst}[/green]")
 
 
+@files.command()
+@click.argument("sandbox_id")
+@click.argument("src")
+@click.argument("dst")
+@click.pass_context
+@friendly_errors
+def cp(ctx: click.Context, sandbox_id: str, src: str, dst: str) -> None:
+    """Copy a file or directory (recursively) in the sandbox."""
+    console = Console()
+    sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    copy_in_sandbox(sbx, src, dst)
+    console.print(f"[green]Copied {src} -> {dst}[/green]")
+
+
 @files.command()
 @click.argument("sandbox_id")
 @click.argument("path")
@@ -230,3 +500,195 @@ def info_cmd(ctx: click.Context, sandbox_id: str, path: str) -> None:
     console.print(f"[cyan]Path:[/cyan] {path}")
     for key, value in finfo.items():
         console.print(f"[cyan]{key}:[/cyan] {value}")
+
+
+@files.command("search")
+@click.argument("sandbox_id")
+@click.argument("pattern")
+@click.argument("path", default="/workspace")
+@click.option("--glob", "-g", "globs", multiple=True, help="Only files matching this glob (prefix with ! to exclude; repeatable)")
+@click.option("--max-results", "-m", type=int, default=200, show_default=True, help="Stop after N matches (0 = no limit)")
+@click.option("--context", "-C", type=int, default=0, help="Lines of context around each match")
+@click.option("--ignore-case", "-i", is_flag=True, help="Case-insensitive search")
+@click.option("--fixed-strings", "-F", is_flag=True, help="Treat the pattern as a literal string")
+@click.option("--no-ignore", is_flag=True, help="Also search ignored files")
+@click.option("--json", "as_json", is_flag=True, help="Output one JSON match per line")
+@click.pass_context
+@friendly_errors
+def search_cmd(
+    ctx: click.Context,
+    sandbox_id: str,
+    pattern: str,
+    path: str,
+    globs: tuple[str, ...],
+    max_results: int,
+    context: int,
+    ignore_case: bool,
+    fixed_strings: bool,
+    no_ignore: bool,
+    as_json: bool,
+) -> None:
+    """Search file contents in the sandbox (ripgrep, or grep as a fallback)."""
+    console = Console()
+    sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    matches = search(
+        sbx,
+        pattern,
+        path,
+        globs=list(globs),
+        max_results=max_results,
+        context=context,
+        ignore_case=ignore_case,
+        fixed_strings=fixed_strings,
+        use_ignore=not no_ignore,
+    )
+    count = shown = 0
+    current = None
+    try:
+        for match in matches:
+            count += 1
+            if as_json:
+                click.echo(json.dumps(match.to_dict()))
+                continue
+            if match.path != current:
+                if current is not None:
+                    console.print()
+                console.print(f"[bold magenta]{match.path}[/bold magenta]", highlight=False)
+                current = match.path
+                shown = 0
+            # Context shared by neighbouring matches is printed once
+            first = match.line - len(match.before)
+            for number, text in enumerate(match.before, first):
+                if number > shown:
+                    console.print(f"{number}-{text}", markup=False, style="dim", highlight=False)
+            console.print(f"[green]{match.line}[/green]:", end="")
+            console.print(match.text, markup=False, highlight=False)
+            for number, text in enumerate(match.after, match.line + 1):
+                console.print(f"{number}-{text}", markup=False, style="dim", highlight=False)
+            shown = match.line + len(match.after)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        matches.close()
+    if not as_json:
+        if not count:
+            console.print("[dim]No matches[/dim]")
+        elif max_results and count >= max_results:
+            console.print(f"[yellow]Stopped after {count} matches (--max-results)[/yellow]")
+
+
+_EVENT_STYLE = {"created": ("+", "green"), "modified": ("~", "yellow"), "deleted": ("-", "red")}
+
+
+@files.command("watch")
+@click.argument("sandbox_id")
+@click.argument("path", default="/workspace")
+@click.option("--debounce", type=float, default=0.5, show_default=True, help="Quiet seconds that end a batch")
+@click.option("--method", type=click.Choice(["auto", "inotify", "poll"]), default="auto", show_default=True)
+@click.option("--interval", type=float, default=2.0, show_default=True, help="Seconds between polls (poll method)")
+@click.option("--timeout", type=float, default=None, help="Stop after N seconds")
+@click.option("--once", is_flag=True, help="Exit after the first batch of changes")
+@click.option("--no-ignore", is_flag=True, help="Also report .gitignore/.sbxignore and built-in ignored paths")
+@click.option("--json", "as_json", is_flag=True, help="Output one JSON event per line")
+@click.pass_context
+@friendly_errors
+def watch_cmd(
+    ctx: click.Context,
+    sandbox_id: str,
+    path: str,
+    debounce: float,
+    method: str,
+    interval: float,
+    timeout: float | None,
+    once: bool,
+    no_ignore: bool,
+    as_json: bool,
+) -> None:
+    """Stream created/modified/deleted events under a sandbox directory."""
+    console = Console()
+    sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    events = watch(
+        sbx,
+        path,
+        debounce=debounce,
+        method=method,
+        poll_interval=interval,
+        use_ignore=not no_ignore,
+        timeout=timeout,
+    )
+    try:
+        for batch in events:
+            for event in batch:
+                if as_json:
+                    click.echo(json.dumps(event.to_dict()))
+                else:
+                    mark, color = _EVENT_STYLE[event.kind]
+                    suffix = "/" if event.is_dir else ""
+                    console.print(f"[{color}]{mark} {event.path}{suffix}[/{color}]")
+            if once:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        events.close()
+
+
+@files.command()
+@click.argument("sandbox_id")
+@click.argument("path", default="/workspace")
+@click.option("--name", default=None, help="Checkpoint name (default: timestamp-based)")
+@click.option("--no-ignore", is_flag=True, help="Also record built-in ignored dirs (node_modules, .git, ...)")
+@click.option("--json", "as_json", is_flag=True, help="Output as JSON")
+@click.pass_context
+@friendly_errors
+def checkpoint(
+    ctx: click.Context, sandbox_id: str, path: str, name: str | None, no_ignore: bool, as_json: bool
+) -> None:
+    """Record the state of a sandbox directory for 'files changed --since'."""
+    console = Console()
+    sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    try:
+        cp = create_checkpoint(sbx, path, name=name, use_ignore=not no_ignore)
+    except ValueError as exc:
+        console.print(f"[red]Error: {exc}[/red]")
+        raise SystemExit(1)
+    if as_json:
+        click.echo(json.dumps(cp, indent=2))
+        return
+    console.print(f"[green]Checkpoint {cp['name']}[/green] ({cp['files']} files in {cp['root']})")
+
+
+@files.command()
+@click.argument("sandbox_id")
+@click.option("--since", "since", required=True, help="Checkpoint name from 'files checkpoint'")
+@click.option("--download", "download_to", default=None, help="Download added/modified files into this local directory")
+@click.option("--json", "as_json", is_flag=True, help="Output as JSON")
+@click.pass_context
+@friendly_errors
+def changed(ctx: click.Context, sandbox_id: str, since: str, download_to: str | None, as_json: bool) -> None:
+    """List files added, modified or deleted since a checkpoint."""
+    console = Console()
+    sbx = get_sandbox(sandbox_id, provider=_get_provider(ctx))
+    try:
+        changes = changed_since(sbx, since)
+    except ValueError as exc:
+        console.print(f"[red]Error: {exc}[/red]")
+        raise SystemExit(1)
+    downloaded = download_changed(sbx, changes, download_to) if download_to else None
+    if as_json:
+        data = changes.to_dict()
+        if download_to:
+            data["downloaded"] = downloaded
+            data["transfer"] = _transfer_stats(sbx)
+        click.echo(json.dumps(data, indent=2))
+        return
+    for kind, paths in (("added", changes.added), ("modified", changes.modified), ("deleted", changes.deleted)):
+        mark, color = _EVENT_STYLE[{"added": "created"}.get(kind, kind)]
+        for rel in paths:
+            console.print(f"[{color}]{mark} {rel}[/{color}]")
+    console.print(
+        f"{len(changes.added)} added, {len(changes.modified)} modified, "
+        f"{len(changes.deleted)} deleted since {since}"
+    )
+    if download_to:
+        console.print(f"[green]Downloaded {downloaded} files to {download_to}[/green]")
@@ -2,19 +2,20 @@
 
 import json
 import os
+import time
 
 import click
 from rich.console import Console
 from rich.table import Table
 
 from sbx.errors import friendly_errors
+from sbx.modules.registry import get_record
 from sbx.modules.sandbox import (
     create_sandbox,
+    extend_sandbox,
     get_sandbox,
     kill_sandbox,
     list_sandboxes,
-    load_state,
-    save_state,
 )
 
 
@@ -31,7 +32,7 @@ def sandbox(ctx: click.Context) -> None:
 
 
 @sandbox.command()
-@click.option("--template", "-t", default=None, help="Template name (base, node, python)")
+@click.option("--template", "-t", default=None, help="Template name (base, node, python, browser)")
 @click.option("--timeout", default=600, help="Sandbox timeout in seconds")
 @click.pass_context
 @friendly_errors
@@ -45,9 +46,9 @@ def create(ctx: click.Context, template: str | None, timeout: int) -> None:
     console.print(f"[green]Sandbox created:[/green] {sbx.sandbox_id}")
     console.print(f"  Template: {template}")
     console.print(f"  Timeout:  {timeout}s")
-    state = load_state()
-    if state.get("provider"):
-        console.print(f"  Provider: {state['provider']}")
+    record = get_record(sbx.sandbox_id)
+    if record and record.provider:
+        console.print(f"  Provider: {record.provider}")
 
 
 @sandbox.command("list")
@@ -100,9 +101,18 @@ def info(ctx: click.Context, sandbox_id: str) -> None:
     provider = _get_provider(ctx)
     sbx = get_sandbox(sandbox_id, provider=provider)
     console.print(f"[cyan]Sandbox ID:[/cyan] {sbx.sandbox_id}")
-    state = load_state()
-    console.print(f"[cyan]Provider:[/cyan]   {state.get('provider', 'unknown')}")
-    console.print(f"[cyan]Template:[/cyan]   {state.get('template', 'unknown')}")
+    record = get_record(sandbox_id)
+    if record is None:
+        console.print("[dim]Not in the local registry (created outside this checkout)[/dim]")
+        return
+    console.print(f"[cyan]Provider:[/cyan]   {record.provider or 'unknown'}")
+    console.print(f"[cyan]Template:[/cyan]   {record.template or 'unknown'}")
+    if record.ports:
+        ports = ", ".join(f"{c}->{h}" for c, h in sorted(record.ports.items()))
+        console.print(f"[cyan]Ports:[/cyan]      {ports}")
+    if record.deadline:
+        remaining = int(record.deadline - time.time())
+        console.print(f"[cyan]Expires in:[/cyan] {max(remaining, 0)}s")
 
 
 @sandbox.command()
@@ -148,7 +158,7 @@ def extend_lifetime(ctx: click.Context, sandbox_id: str, timeout: int) -> None:
     console = Console()
     provider = _get_provider(ctx)
     sbx = get_sandbox(sandbox_id, provider=provider)
-    sbx.set_timeout(timeout)
+    extend_sandbox(sbx, timeout)
     console.print(f"[green]Sandbox {sandbox_id} lifetime extended to {timeout}s[/green]")
 
 
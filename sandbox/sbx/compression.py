@@ -0,0 +1,174 @@
+"""On-the-wire compression for sandbox file transfers.
+
+Backends compress payloads transparently: zstd when both the host
+(`zstandard` package) and the sandbox (`zstd` binary) support it, gzip
+otherwise. Payloads below a backend-specific threshold are sent raw, since
+compressing them costs more than it saves.
+
+Set SBX_COMPRESSION=off|gzip|zstd to force a method.
+"""
+
+from __future__ import annotations
+
+import gzip
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install sbx[zstd]
+    zstandard = None
+
+GZIP = "gzip"
+ZSTD = "zstd"
+
+# Shell snippet printing the methods the sandbox can decode, one per line
+PROBE_COMMAND = (
+    "command -v zstd >/dev/null 2>&1 && echo zstd; "
+    "command -v gzip >/dev/null 2>&1 && echo gzip; true"
+)
+
+_REMOTE_COMPRESS = {ZSTD: "zstd -q -c -3", GZIP: "gzip -c -6"}
+_REMOTE_DECOMPRESS = {ZSTD: "zstd -q -d -c", GZIP: "gzip -d -c"}
+
+# One-letter tags used to mark compressed/raw payloads in exec output
+TAGS = {ZSTD: "S", GZIP: "Z", None: "R"}
+_TAG_TO_METHOD = {v: k for k, v in TAGS.items()}
+
+
+def _forced() -> str | None:
+    value = os.environ.get("SBX_COMPRESSION", "").strip().lower()
+    return value or None
+
+
+def host_methods() -> list[str]:
+    """Methods the host can encode/decode, in preference order."""
+    forced = _forced()
+    if forced in ("off", "none", "0", "false"):
+        return []
+    methods = [ZSTD] if zstandard is not None else []
+    methods.append(GZIP)
+    if forced in (ZSTD, GZIP):
+        methods = [m for m in methods if m == forced]
+    return methods
+
+
+def choose_method(remote_methods: set[str] | list[str]) -> str | None:
+    """Best method supported on both ends, or None for raw transfers."""
+    for method in host_methods():
+        if method in remote_methods:
+            return method
+    return None
+
+
+def parse_probe(output: str) -> set[str]:
+    """Parse PROBE_COMMAND output."""
+    return {line.strip() for line in output.splitlines() if line.strip() in (ZSTD, GZIP)}
+
+
+def compress(data: bytes, method: str | None) -> bytes:
+    if method == ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if method == GZIP:
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    return data
+
+
+def decompress(data: bytes, method: str | None) -> bytes:
+    if method == ZSTD:
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if method == GZIP:
+        return gzip.decompress(data)
+    return data
+
+
+def remote_compress_cmd(method: str) -> str:
+    """Sandbox-side command that compresses stdin to stdout."""
+    return _REMOTE_COMPRESS[method]
+
+
+def remote_decompress_cmd(method: str) -> str:
+    """Sandbox-side command that decompresses stdin to stdout."""
+    return _REMOTE_DECOMPRESS[method]
+
+
+def file_guard(quoted_path: str) -> str:
+    """Shell prefix that fails with exit 2 unless the path is a regular file."""
+    return f"[ -f {quoted_path} ] || {{ echo \"No such file: \"{quoted_path} >&2; exit 2; }}; "
+
+
+def read_script(quoted_path: str, min_bytes: int, encode: str = "") -> str:
+    """Shell script that emits a one-letter tag then the (maybe compressed) file.
+
+    Negotiation happens inline: the sandbox picks the best method the host
+    supports that it also has installed, so reads need no extra round-trip.
+    `encode` is an optional pipeline suffix (e.g. "| base64 -w0") for
+    backends whose exec output is text.
+    """
+    raw = f"printf {TAGS[None]}; cat {quoted_path} {encode}"
+    branches = []
+    for i, method in enumerate(host_methods()):
+        keyword = "if" if i == 0 else "elif"
+        branches.append(
+            f"{keyword} [ \"$s\" -ge {min_bytes} ] && command -v {method} >/dev/null 2>&1; "
+            f"then printf {TAGS[method]}; {remote_compress_cmd(method)} < {quoted_path} {encode}"
+        )
+    body = "; ".join(branches) + f"; else {raw}; fi" if branches else raw
+    return f"{file_guard(quoted_path)}s=$(wc -c < {quoted_path}); {body}"
+
+
+def command_script(command: str, method: str | None, encode: str = "") -> str:
+    """Shell script that emits a tag then the (maybe compressed) stdout of `command`.
+
+    Used for partial reads (byte ranges, line windows) where the sandbox
+    produces the payload with a pipeline instead of reading a whole file.
+    """
+    if method is None:
+        return f"printf {TAGS[None]}; {command} {encode}"
+    return f"printf {TAGS[method]}; {command} | {remote_compress_cmd(method)} {encode}"
+
+
+def split_tagged(payload: bytes) -> tuple[str | None, bytes]:
+    """Split read_script output into (method, body)."""
+    if not payload:
+        return None, b""
+    tag = payload[:1].decode(errors="replace")
+    if tag not in _TAG_TO_METHOD:
+        raise ValueError("Unexpected transfer payload (missing method tag)")
+    return _TAG_TO_METHOD[tag], payload[1:]
+
+
+@dataclass
+class TransferStats:
+    """Cumulative transfer accounting for one filesystem handle."""
+
+    files: int = 0
+    raw_bytes: int = 0
+    wire_bytes: int = 0
+    seconds: float = 0.0
+    method: str | None = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, raw: int, wire: int, started: float, method: str | None) -> None:
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self.files += 1
+            self.raw_bytes += raw
+            self.wire_bytes += wire
+            self.seconds += elapsed
+            if method:
+                self.method = method
+
+    def to_dict(self) -> dict:
+        secs = self.seconds or 1e-9
+        return {
+            "files": self.files,
+            "raw_bytes": self.raw_bytes,
+            "wire_bytes": self.wire_bytes,
+            "compression": self.method or "none",
+            "ratio": round(self.raw_bytes / self.wire_bytes, 2) if self.wire_bytes else None,
+            "seconds": round(self.seconds, 3),
+            "throughput_mb_s": round(self.raw_bytes / secs / 1_000_000, 2),
+        }
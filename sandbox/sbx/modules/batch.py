@@ -0,0 +1,589 @@
+"""JSONL batch runner — many sandbox operations in one process.
+
+Each input line is a JSON object describing one operation:
+
+    {"id": "w1", "op": "files.write", "sandbox_id": "abc123",
+     "args": {"path": "/workspace/a.txt", "content": "hi"}}
+
+Operation names mirror the CLI (`files.<cmd>`, `exec.<cmd>`, `sandbox.<cmd>`)
+and `args` mirror the subcommand arguments. Independent operations run
+concurrently on a thread pool; an operation waits for every earlier operation
+it conflicts with (same sandbox and overlapping paths, or any exec/sandbox
+operation on that sandbox). Results are emitted one JSON line per operation,
+in input order, as soon as each one (and everything before it) has finished.
+"""
+
+from __future__ import annotations
+
+import json
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Iterator
+
+from sbx.modules.checkpoint import changed_since, create_checkpoint, download_changed
+from sbx.modules.commands import run_background, run_command
+from sbx.modules.shell_session import close_session, open_session, run_in_session
+from sbx.modules.files import (
+    download_dir,
+    download_file,
+    copy_in_sandbox,
+    edit_file,
+    entry_to_dict,
+    file_exists,
+    file_info,
+    list_files,
+    mkdir_in_sandbox,
+    move_in_sandbox,
+    read_file,
+    read_lines,
+    read_range,
+    remove_in_sandbox,
+    tail_file,
+    upload_dir,
+    upload_file,
+    walk_files_remote,
+    write_file,
+)
+from sbx.modules.registry import get_record
+from sbx.modules.remote_edit import (
+    apply_edits,
+    apply_patch,
+    describe_failures,
+    replacement_spec,
+)
+from sbx.modules.sandbox import (
+    create_sandbox,
+    extend_sandbox,
+    get_sandbox,
+    kill_sandbox,
+    list_sandboxes,
+)
+from sbx.modules.search import search
+from sbx.modules.sync import sync_dir
+from sbx.provider import BackgroundProcess, SandboxInstance
+
+# Conflict classes for scheduling
+_READ = "read"
+_WRITE = "write"
+_BARRIER = "barrier"
+_FREE = "free"
+
+
+@dataclass
+class BatchOp:
+    """One parsed batch operation."""
+
+    index: int
+    id: Any
+    op: str
+    args: dict = field(default_factory=dict)
+    sandbox_id: str | None = None
+    error: str | None = None
+
+
+@dataclass
+class _OpSpec:
+    handler: Callable[["BatchRunner", BatchOp], Any]
+    kind: str
+    path_args: tuple[str, ...] = ()
+
+
+def _arg(op: BatchOp, name: str, default: Any = ...) -> Any:
+    if name in op.args:
+        return op.args[name]
+    if default is ...:
+        raise ValueError(f"{op.op}: missing required argument {name!r}")
+    return default
+
+
+# ── Handlers ──────────────────────────────────────────────────────
+
+
+def _files_ls(runner: BatchRunner, op: BatchOp) -> Any:
+    sbx = runner.sandbox(op)
+    path = _arg(op, "path", "/workspace")
+    if _arg(op, "recursive", False) or _arg(op, "pattern", None):
+        entries = walk_files_remote(
+            sbx, path, max_depth=_arg(op, "max_depth", None), pattern=_arg(op, "pattern", None)
+        )
+    else:
+        entries = list_files(sbx, path)
+    return [entry_to_dict(e) for e in entries]
+
+
+def _files_read(runner: BatchRunner, op: BatchOp) -> Any:
+    sbx = runner.sandbox(op)
+    path = _arg(op, "path")
+    if "tail" in op.args:
+        return {"content": "\n".join(tail_file(sbx, path, int(op.args["tail"])))}
+    if "start" in op.args:
+        end = op.args.get("end")
+        return {"content": read_lines(sbx, path, int(op.args["start"]), None if end is None else int(end))}
+    if "offset" in op.args:
+        data = read_range(sbx, path, int(op.args["offset"]), int(_arg(op, "length")))
+        return {"content": data.decode(errors="replace"), "bytes": len(data)}
+    return {"content": read_file(sbx, path)}
+
+
+def _files_write(runner: BatchRunner, op: BatchOp) -> Any:
+    write_file(runner.sandbox(op), _arg(op, "path"), _arg(op, "content"))
+    return {"path": op.args["path"]}
+
+
+def _files_edit(runner: BatchRunner, op: BatchOp) -> Any:
+    path = _arg(op, "path")
+    if not edit_file(runner.sandbox(op), path, _arg(op, "old_text"), _arg(op, "new_text")):
+        raise ValueError(f"old_text not found in {path}")
+    return {"path": path}
+
+
+def _files_multi_edit(runner: BatchRunner, op: BatchOp) -> Any:
+    files = replacement_spec(_arg(op, "edits"), root=_arg(op, "root", "/workspace"))
+    report = apply_edits(runner.sandbox(op), files, dry_run=_arg(op, "dry_run", False))
+    if not report["ok"]:
+        raise ValueError(describe_failures(report))
+    return report
+
+
+def _files_patch(runner: BatchRunner, op: BatchOp) -> Any:
+    report = apply_patch(
+        runner.sandbox(op),
+        _arg(op, "patch"),
+        root=_arg(op, "root", "/workspace"),
+        strip=_arg(op, "strip", 1),
+        dry_run=_arg(op, "dry_run", False),
+    )
+    if not report["ok"]:
+        raise ValueError(describe_failures(report))
+    return report
+
+
+def _files_checkpoint(runner: BatchRunner, op: BatchOp) -> Any:
+    return create_checkpoint(
+        runner.sandbox(op),
+        _arg(op, "path", "/workspace"),
+        name=_arg(op, "name", None),
+        use_ignore=not _arg(op, "no_ignore", False),
+    )
+
+
+def _files_changed(runner: BatchRunner, op: BatchOp) -> Any:
+    sbx = runner.sandbox(op)
+    changes = changed_since(sbx, _arg(op, "since"))
+    data = changes.to_dict()
+    if _arg(op, "download", None):
+        data["downloaded"] = download_changed(sbx, changes, op.args["download"])
+    return data
+
+
+def _files_search(runner: BatchRunner, op: BatchOp) -> Any:
+    limit = int(_arg(op, "max_results", 200))
+    globs = _arg(op, "glob", None) or []
+    matches = [
+        m.to_dict()
+        for m in search(
+            runner.sandbox(op),
+            _arg(op, "pattern"),
+            _arg(op, "path", "/workspace"),
+            globs=[globs] if isinstance(globs, str) else globs,
+            max_results=limit,
+            context=int(_arg(op, "context", 0)),
+            ignore_case=bool(_arg(op, "ignore_case", False)),
+            fixed_strings=bool(_arg(op, "fixed_strings", False)),
+            use_ignore=not _arg(op, "no_ignore", False),
+        )
+    ]
+    return {"matches": matches, "truncated": bool(limit) and len(matches) >= limit}
+
+
+def _files_upload(runner: BatchRunner, op: BatchOp) -> Any:
+    upload_file(runner.sandbox(op), _arg(op, "local_path"), _arg(op, "remote_path"))
+    return {"remote_path": op.args["remote_path"]}
+
+
+def _files_download(runner: BatchRunner, op: BatchOp) -> Any:
+    download_file(runner.sandbox(op), _arg(op, "remote_path"), _arg(op, "local_path"))
+    return {"local_path": op.args["local_path"]}
+
+
+def _files_upload_dir(runner: BatchRunner, op: BatchOp) -> Any:
+    count = upload_dir(
+        runner.sandbox(op),
+        _arg(op, "local_dir"),
+        _arg(op, "remote_dir"),
+        use_ignore=not _arg(op, "no_ignore", False),
+    )
+    return {"count": count}
+
+
+def _files_download_dir(runner: BatchRunner, op: BatchOp) -> Any:
+    skipped: list[str] = []
+    count = download_dir(
+        runner.sandbox(op),
+        _arg(op, "remote_dir"),
+        _arg(op, "local_dir"),
+        use_ignore=not _arg(op, "no_ignore", False),
+        skipped=skipped,
+    )
+    return {"count": count, "skipped": skipped}
+
+
+def _files_sync(runner: BatchRunner, op: BatchOp) -> Any:
+    result = sync_dir(
+        runner.sandbox(op),
+        _arg(op, "local_dir"),
+        _arg(op, "remote_dir"),
+        delete=bool(_arg(op, "delete", True)),
+        dry_run=bool(_arg(op, "dry_run", False)),
+        use_ignore=not _arg(op, "no_ignore", False),
+    )
+    return result.to_dict()
+
+
+def _files_mkdir(runner: BatchRunner, op: BatchOp) -> Any:
+    mkdir_in_sandbox(runner.sandbox(op), _arg(op, "path"))
+    return {"path": op.args["path"]}
+
+
+def _files_rm(runner: BatchRunner, op: BatchOp) -> Any:
+    remove_in_sandbox(runner.sandbox(op), _arg(op, "path"))
+    return {"path": op.args["path"]}
+
+
+def _files_mv(runner: BatchRunner, op: BatchOp) -> Any:
+    move_in_sandbox(runner.sandbox(op), _arg(op, "src"), _arg(op, "dst"))
+    return {"src": op.args["src"], "dst": op.args["dst"]}
+
+
+def _files_cp(runner: BatchRunner, op: BatchOp) -> Any:
+    copy_in_sandbox(runner.sandbox(op), _arg(op, "src"), _arg(op, "dst"))
+    return {"src": op.args["src"], "dst": op.args["dst"]}
+
+
+def _files_exists(runner: BatchRunner, op: BatchOp) -> Any:
+    return {"exists": file_exists(runner.sandbox(op), _arg(op, "path"))}
+
+
+def _files_info(runner: BatchRunner, op: BatchOp) -> Any:
+    return file_info(runner.sandbox(op), _arg(op, "path"))
+
+
+def _exec_run(runner: BatchRunner, op: BatchOp) -> Any:
+    sbx = runner.sandbox(op)
+    env = _arg(op, "env", {})
+    if isinstance(env, list):
+        env = dict(e.partition("=")[::2] for e in env)
+    user = "root" if _arg(op, "root", False) else "user"
+    cwd = _arg(op, "cwd", "/workspace")
+    if _arg(op, "background", False):
+        proc = run_background(sbx, _arg(op, "command"), cwd=cwd, env_vars=env, user=user)
+        return {"pid": proc.pid}
+    limits = {}
+    if _arg(op, "max_output_mb", None) is not None:
+        limits["max_output"] = int(float(op.args["max_output_mb"]) * 1024 * 1024) or None
+    result = run_command(
+        sbx,
+        _arg(op, "command"),
+        cwd=cwd,
+        env_vars=env,
+        user=user,
+        timeout=int(_arg(op, "timeout", 60)),
+        spill=bool(_arg(op, "spill", True)),
+        **limits,
+    )
+    if isinstance(result, BackgroundProcess):
+        return {"pid": result.pid}
+    reply = {"stdout": result.stdout, "stderr": result.stderr, "exit_code": result.exit_code}
+    if result.truncated:
+        reply.update(
+            truncated=True,
+            stdout_size=result.stdout_size,
+            stderr_size=result.stderr_size,
+            spill_path=result.spill_path,
+        )
+    return reply
+
+
+def _exec_session_open(runner: BatchRunner, op: BatchOp) -> Any:
+    env = _arg(op, "env", {})
+    if isinstance(env, list):
+        env = dict(e.partition("=")[::2] for e in env)
+    return open_session(
+        runner.sandbox(op),
+        name=_arg(op, "name", None),
+        cwd=_arg(op, "cwd", "/workspace"),
+        env_vars=env,
+        user="root" if _arg(op, "root", False) else "user",
+        login=bool(_arg(op, "login", False)),
+    )
+
+
+def _exec_session_run(runner: BatchRunner, op: BatchOp) -> Any:
+    result = run_in_session(
+        runner.sandbox(op), _arg(op, "name"), _arg(op, "command"), timeout=int(_arg(op, "timeout", 60))
+    )
+    return {"stdout": result.stdout, "stderr": result.stderr, "exit_code": result.exit_code}
+
+
+def _exec_session_close(runner: BatchRunner, op: BatchOp) -> Any:
+    return {"closed": close_session(runner.sandbox(op), _arg(op, "name"))}
+
+
+def _sandbox_create(runner: BatchRunner, op: BatchOp) -> Any:
+    sbx = create_sandbox(
+        template=_arg(op, "template", "base"),
+        timeout=int(_arg(op, "timeout", 600)),
+        provider=runner.provider,
+    )
+    runner.remember(sbx)
+    return {"sandbox_id": sbx.sandbox_id}
+
+
+def _sandbox_kill(runner: BatchRunner, op: BatchOp) -> Any:
+    sandbox_id = runner.sandbox_id(op)
+    kill_sandbox(sandbox_id, provider=runner.provider)
+    runner.forget(sandbox_id)
+    return {"sandbox_id": sandbox_id}
+
+
+def _sandbox_info(runner: BatchRunner, op: BatchOp) -> Any:
+    sbx = runner.sandbox(op)
+    record = get_record(sbx.sandbox_id)
+    return record.to_dict() if record else {"sandbox_id": sbx.sandbox_id}
+
+
+def _sandbox_status(runner: BatchRunner, op: BatchOp) -> Any:
+    try:
+        runner.sandbox(op)
+        return {"running": True}
+    except Exception:
+        return {"running": False}
+
+
+def _sandbox_get_host(runner: BatchRunner, op: BatchOp) -> Any:
+    return {"host": runner.sandbox(op).get_host(int(_arg(op, "port")))}
+
+
+def _sandbox_extend_lifetime(runner: BatchRunner, op: BatchOp) -> Any:
+    timeout = int(_arg(op, "timeout"))
+    extend_sandbox(runner.sandbox(op), timeout)
+    return {"timeout": timeout}
+
+
+def _sandbox_pause(runner: BatchRunner, op: BatchOp) -> Any:
+    sbx = runner.sandbox(op)
+    sbx.pause()
+    return {"sandbox_id": sbx.sandbox_id}
+
+
+def _sandbox_list(runner: BatchRunner, op: BatchOp) -> Any:
+    result = []
+    for sbx in list_sandboxes(provider=runner.provider):
+        if isinstance(sbx, dict):
+            result.append(sbx)
+        else:
+            result.append({
+                "sandbox_id": getattr(sbx, "sandbox_id", None),
+                "template_id": getattr(sbx, "template_id", None),
+            })
+    return result
+
+
+OPS: dict[str, _OpSpec] = {
+    "files.ls": _OpSpec(_files_ls, _READ, ("path",)),
+    "files.read": _OpSpec(_files_read, _READ, ("path",)),
+    "files.write": _OpSpec(_files_write, _WRITE, ("path",)),
+    "files.edit": _OpSpec(_files_edit, _WRITE, ("path",)),
+    "files.multi-edit": _OpSpec(_files_multi_edit, _WRITE, ("root",)),
+    "files.patch": _OpSpec(_files_patch, _WRITE, ("root",)),
+    "files.checkpoint": _OpSpec(_files_checkpoint, _READ, ("path",)),
+    "files.changed": _OpSpec(_files_changed, _READ),
+    "files.search": _OpSpec(_files_search, _READ, ("path",)),
+    "files.upload": _OpSpec(_files_upload, _WRITE, ("remote_path",)),
+    "files.download": _OpSpec(_files_download, _READ, ("remote_path",)),
+    "files.upload-dir": _OpSpec(_files_upload_dir, _WRITE, ("remote_dir",)),
+    "files.download-dir": _OpSpec(_files_download_dir, _READ, ("remote_dir",)),
+    "files.sync": _OpSpec(_files_sync, _WRITE, ("remote_dir",)),
+    "files.mkdir": _OpSpec(_files_mkdir, _WRITE, ("path",)),
+    "files.rm": _OpSpec(_files_rm, _WRITE, ("path",)),
+    "files.mv": _OpSpec(_files_mv, _WRITE, ("src", "dst")),
+    "files.cp": _OpSpec(_files_cp, _WRITE, ("src", "dst")),
+    "files.exists": _OpSpec(_files_exists, _READ, ("path",)),
+    "files.info": _OpSpec(_files_info, _READ, ("path",)),
+    "exec.run": _OpSpec(_exec_run, _BARRIER),
+    "exec.session-open": _OpSpec(_exec_session_open, _BARRIER),
+    "exec.session-run": _OpSpec(_exec_session_run, _BARRIER),
+    "exec.session-close": _OpSpec(_exec_session_close, _BARRIER),
+    "sandbox.create": _OpSpec(_sandbox_create, _FREE),
+    "sandbox.kill": _OpSpec(_sandbox_kill, _BARRIER),
+    "sandbox.info": _OpSpec(_sandbox_info, _READ),
+    "sandbox.status": _OpSpec(_sandbox_status, _READ),
+    "sandbox.get-host": _OpSpec(_sandbox_get_host, _READ),
+    "sandbox.extend-lifetime": _OpSpec(_sandbox_extend_lifetime, _BARRIER),
+    "sandbox.pause": _OpSpec(_sandbox_pause, _BARRIER),
+    "sandbox.list": _OpSpec(_sandbox_list, _FREE),
+}
+
+
+# ── Scheduling ────────────────────────────────────────────────────
+
+
+def _paths_overlap(a: str, b: str) -> bool:
+    a = a.rstrip("/") or "/"
+    b = b.rstrip("/") or "/"
+    if a == b or a == "/" or b == "/":
+        return True
+    return a.startswith(b + "/") or b.startswith(a + "/")
+
+
+def _conflicts(earlier: BatchOp, later: BatchOp) -> bool:
+    """Whether `later` must wait for `earlier` to finish."""
+    spec_a, spec_b = OPS.get(earlier.op), OPS.get(later.op)
+    if spec_a is None or spec_b is None:
+        return False
+    if _FREE in (spec_a.kind, spec_b.kind):
+        return False
+    if earlier.sandbox_id != later.sandbox_id:
+        return False
+    if _BARRIER in (spec_a.kind, spec_b.kind):
+        return True
+    if spec_a.kind == _READ and spec_b.kind == _READ:
+        return False
+    paths_a = [earlier.args.get(k) for k in spec_a.path_args if earlier.args.get(k)]
+    paths_b = [later.args.get(k) for k in spec_b.path_args if later.args.get(k)]
+    if not paths_a or not paths_b:
+        return True
+    return any(_paths_overlap(str(a), str(b)) for a in paths_a for b in paths_b)
+
+
+def parse_op(index: int, line: str, default_sandbox: str | None = None) -> BatchOp:
+    """Parse one JSONL line into a BatchOp (errors are recorded, not raised)."""
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError as exc:
+        return BatchOp(index=index, id=index, op="", error=f"Invalid JSON: {exc}")
+    if not isinstance(data, dict):
+        return BatchOp(index=index, id=index, op="", error="Operation must be a JSON object")
+    op = BatchOp(
+        index=index,
+        id=data.get("id", index),
+        op=str(data.get("op", "")),
+        args=data.get("args") or {},
+        sandbox_id=data.get("sandbox_id") or default_sandbox,
+    )
+    if op.op not in OPS:
+        op.error = f"Unknown operation: {op.op!r}. Valid: {', '.join(sorted(OPS))}"
+    elif not isinstance(op.args, dict):
+        op.error = "'args' must be a JSON object"
+    return op
+
+
+class BatchRunner:
+    """Executes a stream of batch operations over shared sandbox connections."""
+
+    def __init__(
+        self,
+        provider: str | None = None,
+        jobs: int = 8,
+        default_sandbox: str | None = None,
+        stop_on_error: bool = False,
+    ) -> None:
+        self.provider = provider
+        self.jobs = max(1, jobs)
+        self.default_sandbox = default_sandbox
+        self.stop_on_error = stop_on_error
+        self._sandboxes: dict[str, SandboxInstance] = {}
+        self._lock = threading.Lock()
+        self._failed = threading.Event()
+
+    # Connection cache -------------------------------------------------
+
+    def sandbox_id(self, op: BatchOp) -> str:
+        if not op.sandbox_id:
+            raise ValueError(f"{op.op}: no sandbox_id given (set it per op or pass --sandbox)")
+        return op.sandbox_id
+
+    def sandbox(self, op: BatchOp) -> SandboxInstance:
+        """Connect to the op's sandbox once and reuse the instance afterwards."""
+        sandbox_id = self.sandbox_id(op)
+        with self._lock:
+            sbx = self._sandboxes.get(sandbox_id)
+            if sbx is None:
+                sbx = get_sandbox(sandbox_id, provider=self.provider)
+                self._sandboxes[sandbox_id] = sbx
+            return sbx
+
+    def remember(self, sbx: SandboxInstance) -> None:
+        with self._lock:
+            self._sandboxes[sbx.sandbox_id] = sbx
+
+    def forget(self, sandbox_id: str) -> None:
+        with self._lock:
+            self._sandboxes.pop(sandbox_id, None)
+
+    # Execution --------------------------------------------------------
+
+    def _execute(self, op: BatchOp, deps: list[Future]) -> dict:
+        if deps:
+            wait(deps)
+        result: dict = {"id": op.id, "op": op.op}
+        if op.error:
+            result.update(ok=False, error=op.error)
+        elif self.stop_on_error and self._failed.is_set():
+            result.update(ok=False, error="skipped (an earlier operation failed)")
+        else:
+            try:
+                result.update(ok=True, result=OPS[op.op].handler(self, op))
+            except Exception as exc:
+                result.update(ok=False, error=str(exc) or type(exc).__name__)
+        if not result["ok"]:
+            self._failed.set()
+        return result
+
+    def run(self, lines: Iterable[str]) -> Iterator[dict]:
+        """Execute operations from JSONL lines, yielding results in input order.
+
+        Input is consumed on a background thread so results are yielded as soon
+        as they are ready, even while the producer is still writing.
+        """
+        events: queue.Queue = queue.Queue()
+
+        def _reader() -> None:
+            try:
+                for line in lines:
+                    if line.strip():
+                        events.put(("line", line))
+            finally:
+                events.put(("eof", None))
+
+        threading.Thread(target=_reader, daemon=True).start()
+
+        inflight: list[tuple[BatchOp, Future]] = []
+        finished: dict[int, dict] = {}
+        next_index = 0
+        emitted = 0
+        eof = False
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while not eof or emitted < next_index:
+                kind, payload = events.get()
+                if kind == "line":
+                    op = parse_op(next_index, payload, self.default_sandbox)
+                    inflight = [(o, f) for o, f in inflight if not f.done()]
+                    deps = [f for o, f in inflight if _conflicts(o, op)]
+                    future = pool.submit(self._execute, op, deps)
+                    future.add_done_callback(
+                        lambda f, i=op.index: events.put(("done", (i, f)))
+                    )
+                    inflight.append((op, future))
+                    next_index += 1
+                elif kind == "done":
+                    index, future = payload
+                    finished[index] = future.result()
+                    while emitted in finished:
+                        yield finished.pop(emitted)
+                        emitted += 1
+                else:
+                    eof = True
@@ -1,5 +1,28 @@
-"""Browser interaction helpers for sandboxes using Playwright."""
+"""Browser interaction helpers for sandboxes using Playwright.
 
+`start_browser` launches a persistent browser server inside the sandbox
+(`browser_server.js`): Chromium runs as a Playwright browser server with a
+websocket endpoint, and named pages (each in its own browser context) stay
+open between commands. Every helper below is one small HTTP request to
+that server, made with curl in a single exec, so page state carries over
+from `nav` to `click` to `screenshot` and no action pays a browser cold
+start. The server is started on demand if it is not running yet.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import os
+import posixpath
+import re
+import shlex
+import time
+import urllib.parse
+import uuid
+from pathlib import Path
+
+from sbx.modules.checkpoint import extract_archive
 from sbx.provider import SandboxInstance
 
 
@@ -8,170 +31,765 @@ cd /tmp && npm init -y && npm install playwright
 npx playwright install chromium
 """
 
+# Finds Playwright where the browser template installs it (/opt/playwright,
+# browsers in /ms-playwright) in addition to the usual node resolution
+_ENV_SETUP = (
+    'export NODE_PATH="${NODE_PATH:+$NODE_PATH:}/opt/playwright/node_modules"; '
+    '[ -z "$PLAYWRIGHT_BROWSERS_PATH" ] && [ -d /ms-playwright ] && export PLAYWRIGHT_BROWSERS_PATH=/ms-playwright; '
+)
 
-def init_browser(sbx: SandboxInstance) -> None:
-    """Install browser dependencies in the sandbox."""
-    sbx.commands.run(BROWSER_SETUP_SCRIPT, timeout=120)
-
-
-def start_browser(sbx: SandboxInstance, headless: bool = True) -> None:
-    """Start a Playwright browser process in the sandbox."""
-    headless_flag = "true" if headless else "false"
-    script = f"""
-cat > /tmp/browser-server.js << 'SCRIPT'
-const {{ chromium }} = require('playwright');
-(async () => {{
-    const browser = await chromium.launch({{ headless: {headless_flag} }});
-    const page = await browser.newPage();
-    console.log('BROWSER_READY');
-    process.stdin.resume();
-}})();
-SCRIPT
-"""
-    sbx.commands.run(script)
-    sbx.commands.run("node /tmp/browser-server.js", background=True)
+# Succeeds only if the playwright package resolves and its Chromium is downloaded
+_CHECK_SCRIPT = (
+    _ENV_SETUP
+    + "cd /tmp && node -e \"require('fs').accessSync(require('playwright').chromium.executablePath())\" "
+    ">/dev/null 2>&1"
+)
+
+SERVER_SOURCE = Path(__file__).with_name("browser_server.js")
+
+STATE_DIR = "/tmp/.sbx/browser"
+SERVER_SCRIPT = f"{STATE_DIR}/server.js"
+STATE_FILE = f"{STATE_DIR}/state.json"
+LOG_FILE = f"{STATE_DIR}/server.log"
+
+BASELINE_DIR = f"{STATE_DIR}/baselines"
+
+HAR_DIR = f"{STATE_DIR}/har"
+
+PROFILE_DIR = f"{STATE_DIR}/profiles"
+
+_PROFILE_NAME = re.compile(r"^[A-Za-z0-9._-]+$")
+
+# Chromium cache directories in a profile; cookies and storage live elsewhere
+_PROFILE_CACHES = (
+    "Default/Cache",
+    "Default/Code Cache",
+    "Default/GPUCache",
+    "Default/Service Worker/CacheStorage",
+    "GrShaderCache",
+    "ShaderCache",
+)
+
+IMAGE_FORMATS = ("png", "jpeg", "webp")
+
+VIEWPORT_PRESETS = {
+    "mobile": (390, 844),
+    "tablet": (768, 1024),
+    "laptop": (1366, 768),
+    "desktop": (1440, 900),
+    "wide": (1920, 1080),
+}
+
+BROWSER_PORT = 9323
+
+DEFAULT_PAGE = "default"
+
+# Exit status of the request script when no server is listening
+_NOT_RUNNING = 3
+
+# Seconds to wait for Chromium to come up
+_START_TIMEOUT = 30
+
+
+def browser_installed(sbx: SandboxInstance) -> bool:
+    """Whether Playwright and its Chromium are already present (e.g. the browser template)."""
+    result = sbx.commands.run(_CHECK_SCRIPT, timeout=30)
+    return result.exit_code == 0
+
+
+def init_browser(sbx: SandboxInstance) -> bool:
+    """Install browser dependencies in the sandbox unless they are already there.
+
+    Returns True if Playwright was preinstalled and nothing had to be done.
+    """
+    if browser_installed(sbx):
+        return True
+    result = sbx.commands.run(BROWSER_SETUP_SCRIPT, timeout=120)
+    if result.exit_code != 0 or not browser_installed(sbx):
+        raise RuntimeError(f"Browser setup failed: {result.stderr.strip()[-500:] or 'exit ' + str(result.exit_code)}")
+    return False
+
+
+def _request_script(body: str, timeout: int) -> str:
+    """Shell script that POSTs one request to the server on the port in its state file."""
+    marker = f"SBX_EOF_{uuid.uuid4().hex}"
+    post = (
+        f"curl -sS --max-time {timeout} -H 'Content-Type: application/json' "
+        f"--data-binary @- http://127.0.0.1:$port/"
+    )
+    # No state file, or curl exit 7 (nothing listening): the server is not running
+    return (
+        f"port=$(sed -n 's/.*\"port\": *\\([0-9]*\\).*/\\1/p' {STATE_FILE} 2>/dev/null); "
+        f"[ -n \"$port\" ] || exit {_NOT_RUNNING}\n"
+        f"if command -v curl >/dev/null 2>&1; then {post} <<'{marker}'\n{body}\n{marker}\n"
+        f"s=$?; [ $s -eq 7 ] && exit {_NOT_RUNNING}; exit $s\n"
+        f"else node {SERVER_SCRIPT} call --port $port <<'{marker}'\n{body}\n{marker}\nfi"
+    )
+
+
+def browser_call(
+    sbx: SandboxInstance,
+    action: str,
+    page: str = DEFAULT_PAGE,
+    timeout: int = 30,
+    start: bool = True,
+    **params,
+) -> object:
+    """Run one action on the browser server and return its result.
+
+    Starts the server (headless) first if it is not running and `start` is
+    set. Raises RuntimeError if the action fails.
+    """
+    body = json.dumps({"action": action, "page": page, "params": {"timeout": timeout * 1000, **params}})
+    script = _request_script(body, timeout + 5)
+    result = sbx.commands.run(script, timeout=timeout + 10)
+    if result.exit_code == _NOT_RUNNING and start:
+        start_browser(sbx)
+        result = sbx.commands.run(script, timeout=timeout + 10)
+    if result.exit_code == _NOT_RUNNING:
+        raise RuntimeError("Browser is not running. Start it with: sbx browser start <sandbox_id>")
+    if result.exit_code != 0:
+        raise RuntimeError(f"Browser {action} failed: {result.stderr.strip() or result.stdout.strip()}")
+    try:
+        reply = json.loads(result.stdout)
+    except json.JSONDecodeError:
+        raise RuntimeError(f"Browser {action} failed: unexpected reply {result.stdout[:200]!r}")
+    if not reply.get("ok"):
+        raise RuntimeError(f"Browser {action} failed: {reply.get('error')}")
+    return reply.get("result")
+
+
+def start_browser(sbx: SandboxInstance, headless: bool = True, port: int = BROWSER_PORT) -> dict:
+    """Start the persistent browser server in the sandbox (no-op if running).
+
+    Returns the server state: {"pid", "port", "ws_endpoint", "headless"}.
+    The websocket endpoint accepts `chromium.connect()` from other
+    Playwright clients inside the sandbox.
+    """
+    status = browser_status(sbx)
+    if status["running"]:
+        return status
+    # The server runs as the default user, but on Docker the filesystem API
+    # (and `exec --root`, sessions, HAR uploads) create directories as root:
+    # make the state tree world-writable (sticky) so both can use it
+    prepare = sbx.commands.run(
+        f"mkdir -p {STATE_DIR} && chmod 1777 /tmp/.sbx {STATE_DIR} && "
+        f"for d in {STATE_DIR}/*/; do [ -d \"$d\" ] && chmod 1777 \"$d\"; done; true",
+        user="root",
+        timeout=15,
+    )
+    if prepare.exit_code != 0:
+        raise RuntimeError(f"Cannot create {STATE_DIR}: {prepare.stderr.strip()}")
+    sbx.filesystem.write(SERVER_SCRIPT, SERVER_SOURCE.read_text())
+    headed = "" if headless else " --headed"
+    sbx.commands.run(
+        f"{_ENV_SETUP}cd /tmp && rm -f {STATE_FILE} && exec node {SERVER_SCRIPT} serve "
+        f"--port {int(port)} --state-dir {STATE_DIR}{headed} > {LOG_FILE} 2>&1",
+        cwd="/tmp",
+        background=True,
+    )
+    polls = _START_TIMEOUT * 10
+    wait = (
+        f"i=0; while [ $i -lt {polls} ]; do [ -s {STATE_FILE} ] && cat {STATE_FILE} && exit 0; "
+        f"i=$((i+1)); sleep 0.1; done; tail -n 20 {LOG_FILE} >&2; exit 1"
+    )
+    started = time.monotonic()
+    result = sbx.commands.run(wait, timeout=_START_TIMEOUT + 10)
+    if result.exit_code != 0:
+        raise RuntimeError(
+            "Browser failed to start (run `sbx browser init` first?): "
+            + (result.stderr.strip() or "no output")
+        )
+    state = json.loads(result.stdout)
+    state["startup_seconds"] = round(time.monotonic() - started, 2)
+    state["running"] = True
+    return state
 
 
 def close_browser(sbx: SandboxInstance) -> None:
-    """Close the browser process."""
-    sbx.commands.run("pkill -f browser-server.js || true")
-
-
-def navigate(sbx: SandboxInstance, url: str) -> None:
-    """Navigate to a URL using a Playwright script."""
-    script = f"""
-cat > /tmp/nav.js << 'SCRIPT'
-const {{ chromium }} = require('playwright');
-(async () => {{
-    const browser = await chromium.launch({{ headless: true }});
-    const page = await browser.newPage();
-    await page.goto('{url}');
-    console.log('Navigated to: ' + page.url());
-    console.log('Title: ' + await page.title());
-    await browser.close();
-}})();
-SCRIPT
-node /tmp/nav.js
-"""
-    sbx.commands.run(script, timeout=30)
+    """Stop the browser server and everything it holds open."""
+    try:
+        browser_call(sbx, "shutdown", start=False, timeout=10)
+    except RuntimeError:
+        pass
+    sbx.commands.run(f"pkill -f {shlex.quote(SERVER_SCRIPT)} || true; rm -f {STATE_FILE}", timeout=15)
+
+
+def close_page(sbx: SandboxInstance, page: str) -> bool:
+    """Close one named page and its context; returns False if it was not open."""
+    return browser_call(sbx, "close-page", page=page, start=False, timeout=10)["closed"]
+
 
+def navigate(sbx: SandboxInstance, url: str, page: str = DEFAULT_PAGE, wait_until: str = "load") -> dict:
+    """Navigate a page to a URL. Returns {"url", "title", "status"}."""
+    return browser_call(sbx, "navigate", page=page, url=url, wait_until=wait_until)
 
-def click_element(sbx: SandboxInstance, selector: str) -> None:
+
+def click_element(sbx: SandboxInstance, selector: str, page: str = DEFAULT_PAGE) -> None:
     """Click an element by CSS selector."""
-    script = f"""
-cat > /tmp/click.js << 'SCRIPT'
-const {{ chromium }} = require('playwright');
-(async () => {{
-    const browser = await chromium.launch({{ headless: true }});
-    const page = await browser.newPage();
-    await page.click('{selector}');
-    await browser.close();
-}})();
-SCRIPT
-node /tmp/click.js
-"""
-    sbx.commands.run(script, timeout=15)
+    browser_call(sbx, "click", page=page, selector=selector, timeout=15)
 
 
-def type_text(sbx: SandboxInstance, selector: str, text: str) -> None:
+def type_text(sbx: SandboxInstance, selector: str, text: str, page: str = DEFAULT_PAGE) -> None:
     """Type text into an element."""
-    script = f"""
-cat > /tmp/type.js << 'SCRIPT'
-const {{ chromium }} = require('playwright');
-(async () => {{
-    const browser = await chromium.launch({{ headless: true }});
-    const page = await browser.newPage();
-    await page.fill('{selector}', '{text}');
-    await browser.close();
-}})();
-SCRIPT
-node /tmp/type.js
-"""
-    sbx.commands.run(script, timeout=15)
-
-
-def evaluate_js(sbx: SandboxInstance, script: str) -> str:
-    """Evaluate JavaScript in the browser context."""
-    js = f"""
-cat > /tmp/eval.js << 'SCRIPT'
-const {{ chromium }} = require('playwright');
-(async () => {{
-    const browser = await chromium.launch({{ headless: true }});
-    const page = await browser.newPage();
-    const result = await page.evaluate(() => {{ {script} }});
-    console.log(JSON.stringify(result, null, 2));
-    await browser.close();
-}})();
-SCRIPT
-node /tmp/eval.js
-"""
-    result = sbx.commands.run(js, timeout=15)
-    return result.stdout
-
-
-def take_screenshot(sbx: SandboxInstance, output: str = "screenshot.png") -> None:
-    """Take a screenshot and download it."""
-    remote_path = f"/tmp/{output}"
-    script = f"""
-cat > /tmp/screenshot.js << 'SCRIPT'
-const {{ chromium }} = require('playwright');
-(async () => {{
-    const browser = await chromium.launch({{ headless: true }});
-    const page = await browser.newPage();
-    await page.screenshot({{ path: '{remote_path}', fullPage: true }});
-    console.log('Screenshot saved');
-    await browser.close();
-}})();
-SCRIPT
-node /tmp/screenshot.js
-"""
-    sbx.commands.run(script, timeout=15)
+    browser_call(sbx, "fill", page=page, selector=selector, text=text, timeout=15)
+
+
+def evaluate_js(sbx: SandboxInstance, script: str, page: str = DEFAULT_PAGE) -> str:
+    """Evaluate JavaScript (a function body) in the page; returns the result as JSON."""
+    return json.dumps(browser_call(sbx, "evaluate", page=page, script=script, timeout=15), indent=2)
+
+
+def har_path(page: str) -> str:
+    """Sandbox path a page records its HAR to."""
+    return f"{HAR_DIR}/{_slug(page)}.har"
+
+
+def set_routes(
+    sbx: SandboxInstance,
+    page: str = DEFAULT_PAGE,
+    rules: list[dict] | None = None,
+    block_external: bool = False,
+    allow_hosts: list[str] | None = None,
+    har_replay: str | None = None,
+    har_record: bool = False,
+    har_url: str | None = None,
+    har_not_found: str = "abort",
+    all_pages: bool = False,
+    clear: bool = False,
+) -> dict:
+    """Intercept a page's network requests (or every page's, with all_pages).
+
+    Each rule matches `url` (a glob like "**/api/users", or "re:" + a
+    regex) and optionally `method`, and then either fulfills the request
+    (`status`, `json` | `body` | `file` (sandbox path), `content_type`,
+    `headers`), aborts it (`abort`: true or an error code) or lets it
+    through (`continue`); `delay_ms` delays any of these. When several
+    rules match, the one added last wins.
+
+    `block_external` aborts requests to anything but localhost (and
+    `allow_hosts`) at once instead of letting them hang. `har_replay` is a
+    local HAR file answered from (`har_not_found`: "abort" or "fallback"
+    for requests it does not contain); `har_record` records the page's
+    traffic to `har_path(page)`, written when the page is closed (see
+    save_har). `har_url` limits either to matching URLs.
+
+    Routes add to the existing ones unless `clear` is set. With
+    `all_pages` they apply to every open page and to every page, capture
+    and perf context created later.
+
+    Returns {"routes": [{"url", "kind", "hits"}], ...}.
+    """
+    if har_record and all_pages:
+        raise ValueError("HAR recording is per page; use --page instead of --all")
+    if har_record and har_replay:
+        raise ValueError("Choose one of HAR replay and HAR recording")
+    params: dict = {"rules": rules or [], "block_external": block_external, "all": all_pages, "clear": clear}
+    if allow_hosts:
+        params["allow_hosts"] = allow_hosts
+    if har_replay:
+        remote = f"{HAR_DIR}/replay-{uuid.uuid4().hex[:12]}.har"
+        with open(har_replay, "rb") as f:
+            sbx.filesystem.write_bytes(remote, f.read())
+        params.update(har=remote, har_not_found=har_not_found)
+    elif har_record:
+        remote = har_path(page)
+        sbx.commands.run(f"mkdir -p {HAR_DIR} && rm -f {shlex.quote(remote)}", timeout=15)
+        params.update(har=remote, har_record=True)
+    if har_url:
+        params["har_url"] = har_url
+    return browser_call(sbx, "route", page=page, timeout=30, **params)
+
+
+def save_har(sbx: SandboxInstance, output: str, page: str = DEFAULT_PAGE) -> str:
+    """Close a recording page (which writes its HAR) and download the HAR."""
+    if not close_page(sbx, page):
+        raise RuntimeError(f"Page {page!r} is not open")
+    result = sbx.commands.run(f"test -s {shlex.quote(har_path(page))}", timeout=15)
+    if result.exit_code != 0:
+        raise RuntimeError(f"Page {page!r} was not recording a HAR (sbx browser route --har-record)")
+    return _download_artifact(sbx, har_path(page), output)
+
+
+def _profile_dir(name: str) -> str:
+    if not _PROFILE_NAME.match(name):
+        raise ValueError(f"Invalid profile name: {name!r} (use letters, digits, '.', '_', '-')")
+    return f"{PROFILE_DIR}/{name}"
+
 
+def use_profile(
+    sbx: SandboxInstance,
+    name: str = "default",
+    page: str = DEFAULT_PAGE,
+    max_mb: int = 512,
+    default: bool = False,
+) -> dict:
+    """Open a named page in a persistent browser profile.
 
-def get_accessibility_tree(sbx: SandboxInstance) -> str:
+    The profile is a Chromium user-data directory in the sandbox (HTTP
+    cache, cookies, local storage, IndexedDB) that outlives pages and
+    browser restarts, so repeated checks load assets from cache and stay
+    logged in. All pages opened in a profile share it. If the page is
+    already open it is replaced.
+
+    The HTTP cache is limited to half of `max_mb`; a profile that has grown
+    past `max_mb` has its caches dropped (not its cookies or storage) the
+    next time it is opened. With `default`, every page opened later uses
+    this profile too.
+
+    Returns {"profile", "page", "dir", "size_bytes", "trimmed", "default"}.
+    """
+    _profile_dir(name)
+    return browser_call(
+        sbx, "profile", page=page, timeout=60, profile=name, max_bytes=max_mb * 1024 * 1024, default=default
+    )
+
+
+def list_profiles(sbx: SandboxInstance) -> list[dict]:
+    """Profiles in the sandbox: [{"name", "size_bytes", "open"}]."""
+    result = sbx.commands.run(
+        f"for d in {PROFILE_DIR}/*/; do [ -d \"$d\" ] && "
+        f"printf '%s\\t%s\\n' \"$(basename \"$d\")\" \"$(du -sk \"$d\" | cut -f1)\"; done; true",
+        timeout=60,
+    )
+    open_profiles = set(browser_status(sbx).get("profiles", []))
+    profiles = []
+    for line in result.stdout.splitlines():
+        name, sep, size = line.partition("\t")
+        if sep:
+            profiles.append({"name": name, "size_bytes": int(size or 0) * 1024, "open": name in open_profiles})
+    return profiles
+
+
+def reset_profile(sbx: SandboxInstance, name: str, cache_only: bool = False) -> dict:
+    """Close a profile and delete it, or with `cache_only` just its caches.
+
+    Pages open in the profile are closed. Returns {"profile", "closed"}.
+    """
+    directory = _profile_dir(name)
+    try:
+        closed = browser_call(sbx, "close-profile", start=False, timeout=30, profile=name)["closed"]
+    except RuntimeError:
+        closed = False
+    if cache_only:
+        targets = " ".join(shlex.quote(f"{directory}/{cache}") for cache in _PROFILE_CACHES)
+    else:
+        targets = shlex.quote(directory)
+    result = sbx.commands.run(f"rm -rf {targets}", timeout=60)
+    if result.exit_code != 0:
+        raise RuntimeError(f"Cannot reset profile {name}: {result.stderr.strip()}")
+    return {"profile": name, "closed": closed}
+
+
+def baseline_path(name: str) -> str:
+    """Sandbox path of a named screenshot baseline (paths are used as given)."""
+    if "/" in name:
+        return name
+    if not name or name.startswith("."):
+        raise ValueError(f"Invalid baseline name: {name!r}")
+    return f"{BASELINE_DIR}/{name}.png"
+
+
+def _capture_params(
+    image_format: str,
+    quality: int | None,
+    clip: dict | None,
+    viewport: dict | None,
+    full_page: bool,
+    selector: str | None,
+) -> dict:
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown image format: {image_format!r} (use {', '.join(IMAGE_FORMATS)})")
+    if quality is not None and not 0 <= quality <= 100:
+        raise ValueError("quality must be between 0 and 100")
+    params = {"format": image_format, "full_page": full_page}
+    for key, value in (("quality", quality), ("clip", clip), ("viewport", viewport), ("selector", selector)):
+        if value is not None:
+            params[key] = value
+    return params
+
+
+def take_screenshot(
+    sbx: SandboxInstance,
+    output: str = "screenshot.png",
+    page: str = DEFAULT_PAGE,
+    image_format: str = "png",
+    quality: int | None = None,
+    clip: dict | None = None,
+    viewport: dict | None = None,
+    full_page: bool = True,
+    selector: str | None = None,
+    save_baseline: str | None = None,
+) -> dict:
+    """Take a screenshot and write it to the local `output` path.
+
+    The image comes back in the response of the capture request, so no
+    file is left in the sandbox. JPEG and WebP take a quality (0-100);
+    `clip` is {"x", "y", "width", "height"}, `viewport` {"width",
+    "height"} (restored afterwards), `selector` captures one element.
+    With save_baseline, a lossless copy is also kept in the sandbox for
+    later `diff_screenshot` calls.
+
+    Returns {"path", "size", "format"}.
+    """
+    params = _capture_params(image_format, quality, clip, viewport, full_page, selector)
+    if save_baseline:
+        params["save_baseline"] = baseline_path(save_baseline)
+    result = browser_call(sbx, "screenshot", page=page, timeout=30, **params)
+    data = base64.b64decode(result["data"])
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "wb") as f:
+        f.write(data)
+    return {"path": output, "size": len(data), "format": result["format"]}
+
+
+def diff_screenshot(
+    sbx: SandboxInstance,
+    baseline: str,
+    output: str | None = "diff.png",
+    page: str = DEFAULT_PAGE,
+    threshold: float = 0.1,
+    update_baseline: bool = False,
+    clip: dict | None = None,
+    viewport: dict | None = None,
+    full_page: bool = True,
+    selector: str | None = None,
+) -> dict:
+    """Compare a new screenshot with a baseline, inside the sandbox.
+
+    Only the similarity score and, if anything changed, a diff image (red
+    for changed pixels over a faded copy of the page) cross the wire. A
+    pixel counts as changed when any channel differs by more than
+    `threshold` (0-1). With update_baseline the new capture replaces the
+    baseline.
+
+    Returns {"similarity", "diff_pixels", "total_pixels", "width",
+    "height", "identical", "output"} ("output" is None when identical).
+    """
+    if not 0 <= threshold <= 1:
+        raise ValueError("threshold must be between 0 and 1")
+    remote = baseline_path(baseline)
+    params = _capture_params("png", None, clip, viewport, full_page, selector)
+    params.update(diff_against=remote, threshold=threshold)
+    if update_baseline:
+        params["save_baseline"] = remote
+    result = browser_call(sbx, "screenshot", page=page, timeout=60, **params)
+    data = result.pop("data", None)
+    result["identical"] = data is None
+    result["output"] = None
+    if data and output:
+        directory = os.path.dirname(output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(output, "wb") as f:
+            f.write(base64.b64decode(data))
+        result["output"] = output
+    return result
+
+
+def get_accessibility_tree(sbx: SandboxInstance, page: str = DEFAULT_PAGE) -> str:
     """Get the accessibility tree of the current page."""
-    script = """
-cat > /tmp/a11y.js << 'SCRIPT'
-const { chromium } = require('playwright');
-(async () => {
-    const browser = await chromium.launch({ headless: true });
-    const page = await browser.newPage();
-    const snapshot = await page.accessibility.snapshot();
-    console.log(JSON.stringify(snapshot, null, 2));
-    await browser.close();
-})();
-SCRIPT
-node /tmp/a11y.js
-"""
-    result = sbx.commands.run(script, timeout=15)
-    return result.stdout
+    tree = browser_call(sbx, "a11y", page=page, timeout=15)
+    return tree if isinstance(tree, str) else json.dumps(tree, indent=2)
 
 
-def get_dom(sbx: SandboxInstance, selector: str | None = None) -> str:
+def get_dom(sbx: SandboxInstance, selector: str | None = None, page: str = DEFAULT_PAGE) -> str:
     """Get the DOM structure of the current page or a scoped element."""
-    sel = selector or "body"
-    script = f"""
-cat > /tmp/dom.js << 'SCRIPT'
-const {{ chromium }} = require('playwright');
-(async () => {{
-    const browser = await chromium.launch({{ headless: true }});
-    const page = await browser.newPage();
-    const html = await page.$eval('{sel}', el => el.innerHTML);
-    console.log(html);
-    await browser.close();
-}})();
-SCRIPT
-node /tmp/dom.js
-"""
-    result = sbx.commands.run(script, timeout=15)
-    return result.stdout
+    return browser_call(sbx, "dom", page=page, selector=selector or "body", timeout=15)
+
+
+SNAPSHOT_KINDS = ("dom", "a11y")
+
+
+def snapshot_page(
+    sbx: SandboxInstance,
+    kind: str = "dom",
+    page: str = DEFAULT_PAGE,
+    selector: str | None = None,
+    depth: int | None = None,
+    attributes: list[str] | None = None,
+    diff: bool = False,
+    max_bytes: int | None = 20_000,
+    text_limit: int = 80,
+) -> dict:
+    """Compact outline of the page's DOM or accessibility tree.
+
+    One line per node (`tag#id.class[attr=value] "text"` for the DOM,
+    `role "name" [states]` for a11y), indented by depth. Scripts, styles
+    and comments are dropped and whitespace collapsed; nodes below
+    `depth` are collapsed to a child count. `attributes` overrides the
+    DOM attributes that are kept (default: id, class, href, src, name,
+    type, role, aria-label, placeholder, alt, for).
+
+    The browser server keeps the last snapshot of each page (per kind,
+    selector and depth); with `diff` only the changed lines since then
+    are returned, as "@@ line N @@" hunks of "  ", "- " and "+ " lines.
+    The first diff of a page returns the full outline.
+
+    Output is cut at a line boundary to `max_bytes` (None = no limit).
+
+    Returns {"kind", "url", "nodes", "diff", "text", "bytes",
+    "truncated"}, plus {"changed", "added", "removed"} for diffs.
+    """
+    if kind not in SNAPSHOT_KINDS:
+        raise ValueError(f"Unknown snapshot kind: {kind!r} (use {' or '.join(SNAPSHOT_KINDS)})")
+    params: dict = {"kind": kind, "diff": diff, "max_bytes": max_bytes, "text_limit": text_limit}
+    if selector:
+        params["selector"] = selector
+    if depth is not None:
+        params["depth"] = depth
+    if attributes is not None:
+        params["attributes"] = attributes
+    return browser_call(sbx, "snapshot", page=page, timeout=30, **params)
+
+
+def run_steps(
+    sbx: SandboxInstance,
+    steps: list[dict],
+    page: str = DEFAULT_PAGE,
+    step_timeout: int = 30,
+    continue_on_error: bool = False,
+    artifacts_dir: str | None = None,
+) -> dict:
+    """Run a list of browser steps on one page in a single request.
+
+    Each step is {"action": ..., **params}: navigate (url), click
+    (selector), fill (selector, text), press (key), hover, select
+    (selector, value), wait (selector | url | load_state | ms), evaluate
+    (script), screenshot (path), dom (selector) or a11y.
+
+    Screenshot paths name files collected under the run's artifact
+    directory in the sandbox; with artifacts_dir they are downloaded there
+    (as "local_path"). The directory is removed when the run ends, so
+    without artifacts_dir screenshots are only listed by name.
+    Returns {"ok", "steps": [{"index", "action", "ok", "ms", "result" |
+    "error"}], "final": {"url", "title"}, "artifacts": [...], "ms"}.
+    """
+    run_dir = f"{STATE_DIR}/runs/{uuid.uuid4().hex[:12]}"
+    prepared = []
+    artifacts: list[dict] = []
+    for index, step in enumerate(steps):
+        if not isinstance(step, dict) or not step.get("action"):
+            raise ValueError(f"Step {index} must be an object with an 'action'")
+        step = dict(step)
+        if step["action"] == "screenshot":
+            name = posixpath.basename(step.get("path") or "") or f"step-{index}.png"
+            step["path"] = f"{run_dir}/{name}"
+            artifacts.append({"step": index, "name": name, "remote_path": step["path"]})
+        prepared.append(step)
+    started = time.monotonic()
+    try:
+        report = browser_call(
+            sbx,
+            "run",
+            page=page,
+            timeout=step_timeout * max(len(prepared), 1),
+            steps=prepared,
+            step_timeout=step_timeout * 1000,
+            continue_on_error=continue_on_error,
+        )
+        report["ms"] = int((time.monotonic() - started) * 1000)
+        done = {entry["index"] for entry in report["steps"] if entry.get("ok")}
+        report["artifacts"] = [a for a in artifacts if a["step"] in done]
+        if artifacts_dir:
+            os.makedirs(artifacts_dir, exist_ok=True)
+            for artifact in report["artifacts"]:
+                local = os.path.join(artifacts_dir, artifact["name"])
+                with open(local, "wb") as f:
+                    f.write(sbx.filesystem.read_bytes(artifact["remote_path"]))
+                artifact["local_path"] = local
+    finally:
+        if artifacts:
+            sbx.commands.run(f"rm -rf {run_dir}", timeout=15)
+    for artifact in report["artifacts"]:
+        del artifact["remote_path"]
+    return report
+
+
+def parse_viewport(spec: str) -> dict:
+    """A preset name (mobile, tablet, desktop, ...) or WIDTHxHEIGHT."""
+    spec = spec.strip().lower()
+    if spec in VIEWPORT_PRESETS:
+        width, height = VIEWPORT_PRESETS[spec]
+        return {"name": spec, "width": width, "height": height}
+    width, sep, height = spec.partition("x")
+    if not sep or not width.isdigit() or not height.isdigit():
+        raise ValueError(f"Invalid viewport {spec!r} (use WIDTHxHEIGHT or one of {', '.join(VIEWPORT_PRESETS)})")
+    return {"name": spec, "width": int(width), "height": int(height)}
+
+
+def _slug(url: str) -> str:
+    parsed = urllib.parse.urlsplit(url)
+    text = (parsed.path + ("-" + parsed.query if parsed.query else "")).strip("/") or "index"
+    return re.sub(r"[^A-Za-z0-9]+", "-", text).strip("-")[:60] or "index"
+
+
+def capture_matrix(
+    sbx: SandboxInstance,
+    urls: list[str],
+    viewports: list[str | dict],
+    concurrency: int = 4,
+    out_dir: str | None = ".",
+    image_format: str = "png",
+    quality: int | None = None,
+    full_page: bool = True,
+    wait_until: str = "load",
+    timeout: int = 30,
+) -> dict:
+    """Load every URL at every viewport in parallel contexts of the shared browser.
+
+    At most `concurrency` pages load at once. Each combination reports
+    its status, title, console and page errors and timing; screenshots
+    (unless out_dir is None) are written in the sandbox and downloaded
+    as one archive into out_dir.
+
+    Returns {"ms", "results": [{"url", "viewport", "width", "height",
+    "ok", "status", "title", "console_errors", "ms", "screenshot", ...}]}.
+    """
+    if not urls:
+        raise ValueError("No URLs to capture")
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    sizes = [parse_viewport(v) if isinstance(v, str) else v for v in viewports] or [parse_viewport("desktop")]
+    params = _capture_params(image_format, quality, None, None, full_page, None)
+    ext = "jpg" if image_format == "jpeg" else image_format
+    run_dir = f"{STATE_DIR}/captures/{uuid.uuid4().hex[:12]}"
+    jobs = []
+    for url_index, url in enumerate(urls):
+        for size in sizes:
+            job = {"url": url, "viewport": size}
+            if out_dir is not None:
+                job["file"] = f"{url_index:02d}-{_slug(url)}-{size['width']}x{size['height']}.{ext}"
+            jobs.append(job)
+    rounds = -(-len(jobs) // concurrency)
+    started = time.monotonic()
+    report = browser_call(
+        sbx,
+        "capture",
+        timeout=timeout * 2 * rounds + 30,
+        jobs=jobs,
+        concurrency=concurrency,
+        out_dir=run_dir,
+        wait_until=wait_until,
+        page_timeout=timeout * 1000,
+        **params,
+    )
+    report["ms"] = int((time.monotonic() - started) * 1000)
+    if out_dir is not None and any(r.get("screenshot") for r in report["results"]):
+        archive = f"{run_dir}.tar"
+        result = sbx.commands.run(f"tar -cf {archive} -C {run_dir} . && rm -rf {run_dir}", timeout=120)
+        if result.exit_code != 0:
+            raise RuntimeError(f"Cannot archive captures: {result.stderr.strip()}")
+        try:
+            data = sbx.filesystem.read_bytes(archive)
+        finally:
+            sbx.commands.run(f"rm -f {archive}", timeout=30)
+        os.makedirs(out_dir, exist_ok=True)
+        extract_archive(data, out_dir)
+        for entry in report["results"]:
+            if entry.get("screenshot"):
+                entry["screenshot"] = os.path.join(out_dir, entry["screenshot"])
+    return report
+
+
+# Budget keys (sbx browser perf --budget KEY=LIMIT) and where they live in the report
+PERF_METRICS = {
+    "ttfb": ("navigation", "ttfb"),
+    "dom_content_loaded": ("navigation", "dom_content_loaded"),
+    "load": ("navigation", "load"),
+    "fcp": ("paint", "first_contentful_paint"),
+    "lcp": ("vitals", "lcp"),
+    "cls": ("vitals", "cls"),
+    "tbt": ("vitals", "tbt"),
+    "long_tasks": ("long_tasks", "count"),
+    "requests": ("resources", "count"),
+    "transfer_bytes": ("resources", "transfer_bytes"),
+    "js_heap_bytes": ("runtime", "js_heap_used_bytes"),
+    "dom_nodes": ("runtime", "dom_nodes"),
+}
+
+
+def _download_artifact(sbx: SandboxInstance, remote: str, local: str) -> str:
+    try:
+        data = sbx.filesystem.read_bytes(remote)
+    finally:
+        sbx.commands.run(f"rm -f {shlex.quote(remote)}", timeout=30)
+    os.makedirs(os.path.dirname(os.path.abspath(local)), exist_ok=True)
+    with open(local, "wb") as f:
+        f.write(data)
+    return local
+
+
+def measure_performance(
+    sbx: SandboxInstance,
+    url: str,
+    viewport: str | dict | None = None,
+    wait_until: str = "load",
+    settle: float = 1.0,
+    cpu_throttle: float = 1.0,
+    cpu_profile: str | None = None,
+    trace: str | None = None,
+    timeout: int = 60,
+) -> dict:
+    """Load a URL in a fresh context of the shared browser and measure it.
+
+    Web-vitals observers are installed before the page's own scripts, and
+    the page is given `settle` seconds after `wait_until` for late LCP,
+    layout shifts and long tasks. TBT counts long tasks after first
+    contentful paint (there is no TTI in the lab, so the window ends when
+    the measurement does).
+
+    `cpu_profile` and `trace` are local paths: a V8 .cpuprofile and a
+    Chromium trace (both open in DevTools) are recorded during the load
+    and downloaded there.
+
+    Returns {"url", "status", "title", "wall_ms", "navigation", "paint",
+    "vitals", "long_tasks", "resources", "runtime", "artifacts"}; times
+    are milliseconds from navigation start.
+    """
+    run = f"{STATE_DIR}/perf/{uuid.uuid4().hex[:12]}"
+    params: dict = {"url": url, "wait_until": wait_until, "settle_ms": int(settle * 1000)}
+    if viewport:
+        params["viewport"] = parse_viewport(viewport) if isinstance(viewport, str) else viewport
+    if cpu_throttle > 1:
+        params["cpu_throttle"] = cpu_throttle
+    if cpu_profile:
+        params["cpu_profile"] = f"{run}.cpuprofile"
+    if trace:
+        params["trace"] = f"{run}.trace.json"
+    report = browser_call(
+        sbx, "perf", timeout=timeout + int(settle) + 30, page_timeout=timeout * 1000, **params
+    )
+    artifacts = report.get("artifacts", {})
+    if cpu_profile and artifacts.get("cpu_profile"):
+        artifacts["cpu_profile"] = _download_artifact(sbx, artifacts["cpu_profile"], cpu_profile)
+    if trace and artifacts.get("trace"):
+        artifacts["trace"] = _download_artifact(sbx, artifacts["trace"], trace)
+    return report
+
+
+def check_budgets(report: dict, budgets: dict[str, float]) -> list[dict]:
+    """Compare a measure_performance report against upper limits.
+
+    Returns one {"metric", "limit", "value", "ok"} per budget; a metric
+    the page did not produce (e.g. no LCP) fails its budget.
+    """
+    results = []
+    for metric, limit in budgets.items():
+        if metric not in PERF_METRICS:
+            raise ValueError(f"Unknown budget metric: {metric!r} (use {', '.join(PERF_METRICS)})")
+        section, key = PERF_METRICS[metric]
+        value = (report.get(section) or {}).get(key)
+        results.append({"metric": metric, "limit": limit, "value": value, "ok": value is not None and value <= limit})
+    return results
 
 
 def browser_status(sbx: SandboxInstance) -> dict:
-    """Check if browser is running in the sandbox."""
-    result = sbx.commands.run("pgrep -f 'chromium|browser-server' || echo 'not running'")
-    running = "not running" not in result.stdout
-    return {
-        "running": running,
-        "processes": result.stdout.strip(),
-    }
+    """Check if the browser server is running; includes its open pages."""
+    try:
+        info = browser_call(sbx, "status", start=False, timeout=10)
+    except RuntimeError:
+        return {"running": False}
+    return {"running": True, **info}
@@ -0,0 +1,1025 @@
+// Persistent Playwright browser server for sbx (runs inside the sandbox).
+//
+// Launches Chromium once as a Playwright browser server (a websocket
+// endpoint other Playwright clients can connect to) and keeps named pages,
+// each in its own browser context, alive between sbx commands. Commands
+// reach it through a small JSON-over-HTTP endpoint on 127.0.0.1:
+//
+//   POST /  {"action": "navigate", "page": "default", "params": {...}}
+//        -> {"ok": true, "result": ..., "ms": 12}
+//
+// Usage:
+//   node browser_server.js serve --port 9323 --state-dir /tmp/.sbx/browser [--headed]
+//   node browser_server.js call --port 9323 < request.json   (client without curl)
+
+'use strict';
+
+const fs = require('fs');
+const http = require('http');
+const path = require('path');
+
+function parseArgs(argv) {
+  const opts = { mode: argv[0] || 'serve', port: 9323, stateDir: '/tmp/.sbx/browser', headless: true };
+  for (let i = 1; i < argv.length; i++) {
+    const arg = argv[i];
+    if (arg === '--port') opts.port = Number(argv[++i]);
+    else if (arg === '--state-dir') opts.stateDir = argv[++i];
+    else if (arg === '--headed') opts.headless = false;
+  }
+  return opts;
+}
+
+function readStdin() {
+  return new Promise((resolve, reject) => {
+    const chunks = [];
+    process.stdin.on('data', (c) => chunks.push(c));
+    process.stdin.on('end', () => resolve(Buffer.concat(chunks).toString()));
+    process.stdin.on('error', reject);
+  });
+}
+
+async function call(opts) {
+  const body = await readStdin();
+  const req = http.request(
+    { host: '127.0.0.1', port: opts.port, method: 'POST', path: '/', headers: { 'Content-Type': 'application/json' } },
+    (res) => {
+      res.pipe(process.stdout);
+      res.on('end', () => process.exit(0));
+    },
+  );
+  req.on('error', (err) => {
+    process.stderr.write(`browser server not reachable: ${err.message}\n`);
+    process.exit(3);
+  });
+  req.end(body);
+}
+
+// --- server state ---------------------------------------------------------
+
+const state = {
+  browser: null,
+  server: null,
+  pages: new Map(), // name -> { context, page, queue }
+  defaultRoutes: null, // route config applied to every new context
+  profiles: new Map(), // name -> { context, dir } (persistent contexts)
+  defaultProfile: null, // profile new pages open in
+  startedAt: Date.now(),
+  opts: null,
+};
+
+// --- network routes -----------------------------------------------------------
+
+const LOCAL_HOSTS = new Set(['localhost', '127.0.0.1', '[::1]', '0.0.0.0']);
+const routeTables = new WeakMap(); // context -> [{ url, kind, hits }]
+
+function routePattern(url) {
+  return url.startsWith('re:') ? new RegExp(url.slice(3)) : url;
+}
+
+// Fulfill, abort or pass on one intercepted request according to a rule
+async function applyRule(rule, route) {
+  const request = route.request();
+  if (rule.method && request.method().toUpperCase() !== rule.method.toUpperCase()) return route.fallback();
+  if (rule.delay_ms) await new Promise((resolve) => setTimeout(resolve, rule.delay_ms));
+  if (rule.abort) return route.abort(typeof rule.abort === 'string' ? rule.abort : 'failed');
+  if (rule.continue) return route.continue(rule.headers ? { headers: Object.assign(request.headers(), rule.headers) } : {});
+  const response = { status: rule.status || 200, headers: rule.headers || {} };
+  if (rule.content_type) response.contentType = rule.content_type;
+  if (rule.file) response.path = rule.file;
+  else if (rule.json !== undefined) response.json = rule.json;
+  else response.body = rule.body === undefined ? '' : String(rule.body);
+  return route.fulfill(response);
+}
+
+function ruleKind(rule) {
+  if (rule.abort) return 'abort';
+  if (rule.continue) return 'continue';
+  if (rule.file) return `file ${rule.file}`;
+  return `${rule.status || 200} ${rule.json !== undefined ? 'json' : 'body'}`;
+}
+
+// Install a route config on a context. Later registrations take precedence
+// in Playwright, so the catch-all (block_external) goes first, then the HAR,
+// then the explicit rules.
+async function installRoutes(context, config) {
+  const table = routeTables.get(context) || [];
+  routeTables.set(context, table);
+  if (config.block_external) {
+    const entry = { url: '(external)', kind: 'abort', hits: 0 };
+    table.push(entry);
+    const allowed = new Set(config.allow_hosts || []);
+    const external = (url) => /^(https?|wss?):$/.test(url.protocol) && !LOCAL_HOSTS.has(url.hostname) && !allowed.has(url.hostname);
+    await context.route(external, (route) => {
+      entry.hits++;
+      return route.abort('internetdisconnected');
+    });
+  }
+  if (config.har) {
+    const options = { notFound: config.har_not_found || 'abort' };
+    if (config.har_url) options.url = routePattern(config.har_url);
+    if (config.har_record) Object.assign(options, { update: true, updateContent: 'embed', notFound: 'fallback' });
+    await context.routeFromHAR(config.har, options);
+    table.push({ url: config.har_url || '**', kind: `${config.har_record ? 'record' : 'replay'} ${config.har}`, hits: null });
+  }
+  for (const rule of config.rules || []) {
+    if (!rule.url) throw new Error('Every route rule needs a "url" (glob, or "re:" + regex)');
+    const entry = { url: rule.url, kind: ruleKind(rule), hits: 0 };
+    table.push(entry);
+    await context.route(routePattern(rule.url), (route) => {
+      entry.hits++;
+      return applyRule(rule, route);
+    });
+  }
+  return table;
+}
+
+function mergeRoutes(current, config) {
+  const merged = Object.assign({}, current || {}, config);
+  merged.rules = ((current && current.rules) || []).concat(config.rules || []);
+  if (!config.har && current) Object.assign(merged, { har: current.har, har_url: current.har_url, har_record: current.har_record });
+  merged.block_external = Boolean((current && current.block_external) || config.block_external);
+  return merged;
+}
+
+function describeRoutes(config) {
+  if (!config) return [];
+  const rows = [];
+  if (config.block_external) rows.push({ url: '(external)', kind: 'abort', hits: null });
+  if (config.har) rows.push({ url: config.har_url || '**', kind: `${config.har_record ? 'record' : 'replay'} ${config.har}`, hits: null });
+  for (const rule of config.rules || []) rows.push({ url: rule.url, kind: ruleKind(rule), hits: null });
+  return rows;
+}
+
+async function clearRoutes(context) {
+  if (context.unrouteAll) await context.unrouteAll({ behavior: 'ignoreErrors' });
+  routeTables.set(context, []);
+}
+
+// New browser context with the server-wide routes (if any) installed
+async function newContext(options = {}) {
+  const context = await state.browser.newContext(options);
+  if (state.defaultRoutes) await installRoutes(context, state.defaultRoutes);
+  return context;
+}
+
+// Close a page; its context too, unless it is a shared profile context
+async function closeEntry(entry) {
+  if (entry.profile) await entry.page.close().catch(() => {});
+  else await entry.context.close().catch(() => {});
+}
+
+async function getPage(name, create = true) {
+  let entry = state.pages.get(name);
+  if (entry && entry.page.isClosed()) {
+    await closeEntry(entry);
+    state.pages.delete(name);
+    entry = null;
+  }
+  if (!entry) {
+    if (!create) throw new Error(`No such page: ${name}`);
+    if (state.defaultProfile) return openInProfile(name, state.defaultProfile);
+    const context = await newContext();
+    const page = await context.newPage();
+    entry = { context, page, queue: Promise.resolve() };
+    state.pages.set(name, entry);
+  }
+  return entry;
+}
+
+// --- profiles -----------------------------------------------------------------
+
+// A profile is a persistent Chromium user-data directory (HTTP cache,
+// cookies, local storage, IndexedDB) shared by every page opened in it.
+// Chromium locks the directory, so each profile runs as its own persistent
+// context next to the shared browser.
+// Chromium cache directories, dropped when a profile outgrows its cap
+const PROFILE_CACHES = ['Default/Cache', 'Default/Code Cache', 'Default/GPUCache', 'Default/Service Worker/CacheStorage', 'GrShaderCache', 'ShaderCache'];
+
+function dirSize(dir) {
+  let total = 0;
+  for (const item of fs.readdirSync(dir, { withFileTypes: true })) {
+    const file = path.join(dir, item.name);
+    if (item.isDirectory()) total += dirSize(file);
+    else if (item.isFile()) total += fs.statSync(file).size;
+  }
+  return total;
+}
+
+async function getProfile(name, p = {}) {
+  let profile = state.profiles.get(name);
+  if (profile) return profile;
+  const { chromium } = require('playwright');
+  const dir = path.join(state.opts.stateDir, 'profiles', name);
+  fs.mkdirSync(dir, { recursive: true });
+  let trimmed = false;
+  if (p.max_bytes && dirSize(dir) > p.max_bytes) {
+    for (const cache of PROFILE_CACHES) fs.rmSync(path.join(dir, cache), { recursive: true, force: true });
+    trimmed = true;
+  }
+  // The HTTP cache gets half the cap; cookies and storage are kept whole
+  const args = p.max_bytes ? [`--disk-cache-size=${Math.floor(p.max_bytes / 2)}`] : [];
+  const context = await chromium.launchPersistentContext(dir, { headless: state.opts.headless, args });
+  if (state.defaultRoutes) await installRoutes(context, state.defaultRoutes);
+  profile = { context, dir, trimmed };
+  context.on('close', () => {
+    if (state.profiles.get(name) === profile) state.profiles.delete(name);
+  });
+  state.profiles.set(name, profile);
+  return profile;
+}
+
+async function openInProfile(pageName, profileName, p = {}) {
+  const old = state.pages.get(pageName);
+  if (old) {
+    state.pages.delete(pageName);
+    await closeEntry(old);
+  }
+  const { context } = await getProfile(profileName, p);
+  const page = await context.newPage();
+  const entry = { context, page, profile: profileName, queue: Promise.resolve() };
+  state.pages.set(pageName, entry);
+  return entry;
+}
+
+async function closeProfile(name) {
+  const profile = state.profiles.get(name);
+  if (!profile) return false;
+  for (const [pageName, entry] of state.pages) {
+    if (entry.profile === name) state.pages.delete(pageName);
+  }
+  if (state.defaultProfile === name) state.defaultProfile = null;
+  state.profiles.delete(name);
+  await profile.context.close().catch(() => {});
+  return true;
+}
+
+// Actions on one page are serialized; different pages run concurrently
+function onPage(name, fn, create = true) {
+  return getPage(name, create).then((entry) => {
+    const run = entry.queue.then(() => fn(entry.page, entry));
+    entry.queue = run.catch(() => {});
+    return run;
+  });
+}
+
+// --- images -----------------------------------------------------------------
+
+function writeFile(file, data) {
+  fs.mkdirSync(path.dirname(file), { recursive: true });
+  fs.writeFileSync(file, data);
+}
+
+// Scratch page used to re-encode and compare images with canvas
+async function toolsPage() {
+  if (!state.tools || state.tools.isClosed()) {
+    const context = await state.browser.newContext();
+    state.tools = await context.newPage();
+  }
+  return state.tools;
+}
+
+// Screenshot with optional viewport, clip region or element. Returns the
+// raw image; PNG unless JPEG was asked for and nothing needs the lossless copy.
+async function capture(page, p) {
+  const lossless = p.save_baseline || p.diff_against || p.format !== 'jpeg';
+  const options = { type: lossless ? 'png' : 'jpeg', timeout: p.timeout };
+  if (!lossless && p.quality) options.quality = Number(p.quality);
+  if (p.clip) options.clip = p.clip;
+  else if (!p.selector) options.fullPage = p.full_page !== false;
+  const previous = page.viewportSize();
+  if (p.viewport) await page.setViewportSize(p.viewport);
+  try {
+    const buffer = p.selector
+      ? await page.locator(p.selector).first().screenshot(options)
+      : await page.screenshot(options);
+    return { buffer, png: lossless ? buffer : null, type: options.type };
+  } finally {
+    if (p.viewport && previous) await page.setViewportSize(previous);
+  }
+}
+
+// Runs in the tools page: decode base64 images, draw them on canvases,
+// optionally diff two of them, and encode the result. Self-contained
+// because Playwright serializes it into the page.
+async function canvasJob({ images, type, quality, threshold }) {
+  const bitmaps = await Promise.all(
+    images.map((b64) => createImageBitmap(new Blob([Uint8Array.from(atob(b64), (c) => c.charCodeAt(0))]))),
+  );
+  const encode = async (canvas) => {
+    const blob = await canvas.convertToBlob({ type, quality });
+    const bytes = new Uint8Array(await blob.arrayBuffer());
+    let out = '';
+    for (let i = 0; i < bytes.length; i += 0x8000) out += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+    return btoa(out);
+  };
+  if (bitmaps.length === 1) {
+    const canvas = new OffscreenCanvas(bitmaps[0].width, bitmaps[0].height);
+    canvas.getContext('2d').drawImage(bitmaps[0], 0, 0);
+    return { data: await encode(canvas) };
+  }
+  const [a, b] = bitmaps;
+  const width = Math.max(a.width, b.width);
+  const height = Math.max(a.height, b.height);
+  const pixels = (bitmap) => {
+    const canvas = new OffscreenCanvas(width, height);
+    const ctx = canvas.getContext('2d');
+    ctx.drawImage(bitmap, 0, 0);
+    return ctx.getImageData(0, 0, width, height).data;
+  };
+  const pa = pixels(a);
+  const pb = pixels(b);
+  const out = new ImageData(width, height);
+  const limit = threshold * 255;
+  let changed = 0;
+  for (let y = 0; y < height; y++) {
+    for (let x = 0; x < width; x++) {
+      const i = (y * width + x) * 4;
+      const outside = x >= a.width || y >= a.height || x >= b.width || y >= b.height;
+      const delta = Math.max(
+        Math.abs(pa[i] - pb[i]), Math.abs(pa[i + 1] - pb[i + 1]),
+        Math.abs(pa[i + 2] - pb[i + 2]), Math.abs(pa[i + 3] - pb[i + 3]),
+      );
+      if (outside || delta > limit) {
+        changed++;
+        out.data.set([255, 0, 0, 255], i);
+      } else {
+        // Unchanged pixels as a faded grayscale of the new image
+        const gray = 0.3 * pb[i] + 0.59 * pb[i + 1] + 0.11 * pb[i + 2];
+        const faded = 255 - (255 - gray) * 0.1;
+        out.data.set([faded, faded, faded, 255], i);
+      }
+    }
+  }
+  const total = width * height;
+  const result = { width, height, diff_pixels: changed, total_pixels: total, similarity: total ? 1 - changed / total : 1 };
+  if (changed) {
+    const canvas = new OffscreenCanvas(width, height);
+    canvas.getContext('2d').putImageData(out, 0, 0);
+    result.data = await encode(canvas);
+  }
+  return result;
+}
+
+// Convert a captured image to the requested format (png, jpeg or webp)
+async function encode(shot, format, quality) {
+  const wanted = format || 'png';
+  if (wanted === shot.type) return shot.buffer;
+  const tools = await toolsPage();
+  const result = await tools.evaluate(canvasJob, {
+    images: [shot.buffer.toString('base64')],
+    type: `image/${wanted}`,
+    quality: quality ? Number(quality) / 100 : undefined,
+  });
+  return Buffer.from(result.data, 'base64');
+}
+
+// Compare a baseline with a new capture; only the diff image (if any) and
+// the counts are returned
+async function diffImages(baseline, current, threshold) {
+  const tools = await toolsPage();
+  return tools.evaluate(canvasJob, {
+    images: [baseline.toString('base64'), current.toString('base64')],
+    type: 'image/png',
+    threshold: threshold === undefined ? 0.1 : Number(threshold),
+  });
+}
+
+// --- snapshots ----------------------------------------------------------------
+
+// Runs in the page: an indented outline of the element's subtree, one node
+// per line ("tag#id.class[attr=value] \"text\""). Scripts, styles and
+// comments are dropped, whitespace collapsed, text cut to text_limit chars.
+function domOutline(root, { depth, attributes, textLimit }) {
+  const skip = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE', 'LINK', 'META']);
+  const keep = new Set(attributes);
+  const lines = [];
+  const clip = (text) => {
+    const t = text.replace(/\s+/g, ' ').trim();
+    return t.length > textLimit ? t.slice(0, textLimit) + '...' : t;
+  };
+  const label = (el) => {
+    let out = el.tagName.toLowerCase();
+    if (el.id && keep.has('id')) out += '#' + el.id;
+    if (keep.has('class') && typeof el.className === 'string') {
+      for (const c of el.className.split(/\s+/).filter(Boolean)) out += '.' + c;
+    }
+    for (const attr of el.attributes) {
+      if (attr.name !== 'id' && attr.name !== 'class' && keep.has(attr.name)) {
+        out += `[${attr.name}=${clip(attr.value)}]`;
+      }
+    }
+    return out;
+  };
+  const walk = (el, level) => {
+    const indent = '  '.repeat(level);
+    const children = Array.from(el.children).filter((c) => !skip.has(c.tagName));
+    const text = clip(Array.from(el.childNodes).filter((n) => n.nodeType === 3).map((n) => n.textContent).join(' '));
+    let line = indent + label(el) + (text ? ` "${text}"` : '');
+    if (el.tagName === 'SVG' || el.tagName === 'svg') {
+      lines.push(line);
+      return;
+    }
+    if (depth >= 0 && level >= depth && children.length) {
+      lines.push(`${line} (${children.length} children)`);
+      return;
+    }
+    lines.push(line);
+    for (const child of children) walk(child, level + 1);
+  };
+  walk(root, 0);
+  return lines;
+}
+
+// Accessibility snapshot (object tree or aria YAML) as outline lines
+function a11yOutline(node, depth) {
+  const lines = [];
+  const props = ['value', 'description', 'checked', 'pressed', 'selected', 'expanded', 'disabled', 'focused', 'level'];
+  const walk = (n, level) => {
+    let line = '  '.repeat(level) + n.role + (n.name ? ` "${n.name.replace(/\s+/g, ' ')}"` : '');
+    const flags = props.filter((k) => n[k] !== undefined && n[k] !== false).map((k) => (n[k] === true ? k : `${k}=${n[k]}`));
+    if (flags.length) line += ` [${flags.join(', ')}]`;
+    const children = n.children || [];
+    if (depth >= 0 && level >= depth && children.length) {
+      lines.push(`${line} (${children.length} children)`);
+      return;
+    }
+    lines.push(line);
+    for (const child of children) walk(child, level + 1);
+  };
+  if (node) walk(node, 0);
+  return lines;
+}
+
+function pruneYaml(text, depth) {
+  if (depth < 0) return text.split('\n');
+  return text.split('\n').filter((line) => (line.length - line.trimStart().length) / 2 <= depth);
+}
+
+// Line diff: trims the common prefix/suffix, then LCS on what is left (or a
+// plain replace when that would be too large). Returns hunks with one line
+// of context, prefixed "  ", "- " and "+ ".
+function diffLines(before, after) {
+  let start = 0;
+  while (start < before.length && start < after.length && before[start] === after[start]) start++;
+  let endA = before.length;
+  let endB = after.length;
+  while (endA > start && endB > start && before[endA - 1] === after[endB - 1]) {
+    endA--;
+    endB--;
+  }
+  const a = before.slice(start, endA);
+  const b = after.slice(start, endB);
+  const ops = [];
+  if (a.length * b.length <= 4e6) {
+    const table = Array.from({ length: a.length + 1 }, () => new Uint32Array(b.length + 1));
+    for (let i = a.length - 1; i >= 0; i--) {
+      for (let j = b.length - 1; j >= 0; j--) {
+        table[i][j] = a[i] === b[j] ? table[i + 1][j + 1] + 1 : Math.max(table[i + 1][j], table[i][j + 1]);
+      }
+    }
+    let i = 0;
+    let j = 0;
+    while (i < a.length || j < b.length) {
+      if (i < a.length && j < b.length && a[i] === b[j]) {
+        ops.push(['  ', a[i++]]);
+        j++;
+      } else if (i < a.length && (j >= b.length || table[i + 1][j] >= table[i][j + 1])) {
+        ops.push(['- ', a[i++]]);
+      } else {
+        ops.push(['+ ', b[j++]]);
+      }
+    }
+  } else {
+    a.forEach((line) => ops.push(['- ', line]));
+    b.forEach((line) => ops.push(['+ ', line]));
+  }
+  if (!ops.length) return { added: 0, removed: 0, lines: [] };
+  if (start > 0) ops.unshift(['  ', before[start - 1]]);
+  if (endA < before.length) ops.push(['  ', before[endA]]);
+  const changed = (k) => ops[k] !== undefined && ops[k][0] !== '  ';
+  const out = [];
+  let added = 0;
+  let removed = 0;
+  let lineNo = Math.max(start - 1, 0); // lines of the new snapshot before this op
+  ops.forEach(([mark, line], k) => {
+    if (mark === '+ ') added++;
+    if (mark === '- ') removed++;
+    if (changed(k) || changed(k - 1) || changed(k + 1)) {
+      const shown = k > 0 && (changed(k - 1) || changed(k - 2) || changed(k));
+      if (!out.length || !shown) out.push(`@@ line ${lineNo + 1} @@`);
+      out.push(mark + line);
+    }
+    if (mark !== '- ') lineNo++;
+  });
+  return { added, removed, lines: out };
+}
+
+// Cut lines to a byte budget at a line boundary
+function budget(lines, maxBytes) {
+  const total = lines.reduce((sum, line) => sum + Buffer.byteLength(line) + 1, 0);
+  if (!maxBytes || total <= maxBytes) return { text: lines.join('\n'), bytes: total, truncated: false };
+  const kept = [];
+  let used = 0;
+  for (const line of lines) {
+    const size = Buffer.byteLength(line) + 1;
+    if (used + size > maxBytes) break;
+    kept.push(line);
+    used += size;
+  }
+  kept.push(`... truncated: ${lines.length - kept.length} more lines (${total} bytes in full)`);
+  return { text: kept.join('\n'), bytes: total, truncated: true };
+}
+
+// Previous snapshot lines per page, keyed by kind and selector
+const snapshots = new WeakMap();
+
+async function snapshot(page, p) {
+  const kind = p.kind || 'dom';
+  const selector = p.selector || 'body';
+  const depth = p.depth === undefined || p.depth === null ? -1 : Number(p.depth);
+  let lines;
+  if (kind === 'dom') {
+    lines = await page.locator(selector).first().evaluate(domOutline, {
+      depth,
+      attributes: p.attributes || ['id', 'class', 'href', 'src', 'name', 'type', 'role', 'aria-label', 'placeholder', 'alt', 'for'],
+      textLimit: p.text_limit || 80,
+    }, { timeout: p.timeout });
+  } else if (kind === 'a11y') {
+    if (page.accessibility && page.accessibility.snapshot) {
+      const root = p.selector ? await page.$(p.selector) : undefined;
+      lines = a11yOutline(await page.accessibility.snapshot(root ? { root } : {}), depth);
+    } else {
+      lines = pruneYaml(await page.locator(selector).ariaSnapshot({ timeout: p.timeout }), depth);
+    }
+  } else {
+    throw new Error(`Unknown snapshot kind: ${kind} (use dom or a11y)`);
+  }
+  if (!snapshots.has(page)) snapshots.set(page, new Map());
+  const store = snapshots.get(page);
+  const key = `${kind} ${selector} ${depth}`;
+  const previous = store.get(key);
+  store.set(key, lines);
+  const result = { kind, url: page.url(), nodes: lines.length };
+  if (p.diff && previous) {
+    const diff = diffLines(previous, lines);
+    Object.assign(result, { diff: true, changed: diff.lines.length > 0, added: diff.added, removed: diff.removed });
+    lines = diff.lines;
+  } else {
+    result.diff = false;
+  }
+  return Object.assign(result, budget(lines, p.max_bytes));
+}
+
+// Actions on a page: (page, params) -> JSON-serializable result
+const PAGE_ACTIONS = {
+  async navigate(page, p) {
+    const response = await page.goto(p.url, { waitUntil: p.wait_until || 'load', timeout: p.timeout });
+    return { url: page.url(), title: await page.title(), status: response ? response.status() : null };
+  },
+
+  async click(page, p) {
+    await page.click(p.selector, { timeout: p.timeout });
+    return { url: page.url() };
+  },
+
+  async fill(page, p) {
+    await page.fill(p.selector, String(p.text), { timeout: p.timeout });
+    return null;
+  },
+
+  async press(page, p) {
+    await page.press(p.selector || 'body', p.key, { timeout: p.timeout });
+    return null;
+  },
+
+  async hover(page, p) {
+    await page.hover(p.selector, { timeout: p.timeout });
+    return null;
+  },
+
+  async select(page, p) {
+    return page.selectOption(p.selector, p.value, { timeout: p.timeout });
+  },
+
+  async wait(page, p) {
+    if (p.selector) await page.waitForSelector(p.selector, { state: p.state || 'visible', timeout: p.timeout });
+    else if (p.url) await page.waitForURL(p.url, { timeout: p.timeout });
+    else if (p.load_state) await page.waitForLoadState(p.load_state, { timeout: p.timeout });
+    else await page.waitForTimeout(Number(p.ms || 0));
+    return { url: page.url() };
+  },
+
+  async evaluate(page, p) {
+    // The script is a function body, as in `sbx browser eval "return document.title"`
+    return page.evaluate(`(async () => { ${p.script}\n})()`);
+  },
+
+  async screenshot(page, p) {
+    const shot = await capture(page, p);
+    if (p.diff_against) {
+      if (!fs.existsSync(p.diff_against)) throw new Error(`No such baseline: ${p.diff_against}`);
+      const baseline = fs.readFileSync(p.diff_against);
+      const diff = await diffImages(baseline, shot.png, p.threshold);
+      if (p.save_baseline) writeFile(p.save_baseline, shot.png);
+      return diff;
+    }
+    if (p.save_baseline) writeFile(p.save_baseline, shot.png);
+    const data = await encode(shot, p.format, p.quality);
+    if (p.path) {
+      writeFile(p.path, data);
+      return { path: p.path, size: data.length, format: p.format || 'png' };
+    }
+    return { data: data.toString('base64'), size: data.length, format: p.format || 'png' };
+  },
+
+  async dom(page, p) {
+    // $eval has no timeout option: its third argument goes to the page function
+    return page.locator(p.selector || 'body').first().evaluate((el) => el.innerHTML, undefined, { timeout: p.timeout });
+  },
+
+  async a11y(page, p) {
+    if (page.accessibility && page.accessibility.snapshot) return page.accessibility.snapshot();
+    return page.locator('body').ariaSnapshot({ timeout: p.timeout });
+  },
+
+  async snapshot(page, p) {
+    return snapshot(page, p);
+  },
+};
+
+const ALIASES = { goto: 'navigate', nav: 'navigate', type: 'fill', eval: 'evaluate', wait_for: 'wait' };
+
+function pageAction(name) {
+  const action = PAGE_ACTIONS[ALIASES[name] || name];
+  if (!action) throw new Error(`Unknown browser action: ${name}`);
+  return action;
+}
+
+// Runs a list of steps on one page in order, timing each. Stops at the
+// first failure unless continue_on_error is set.
+async function runSteps(page, p) {
+  const results = [];
+  let ok = true;
+  for (let i = 0; i < (p.steps || []).length; i++) {
+    const step = p.steps[i] || {};
+    const started = Date.now();
+    const entry = { index: i, action: step.action };
+    try {
+      const params = Object.assign({ timeout: p.step_timeout }, step);
+      entry.result = await pageAction(step.action)(page, params);
+      entry.ok = true;
+    } catch (err) {
+      entry.ok = false;
+      entry.error = String((err && err.message) || err).split('\n')[0];
+      ok = false;
+    }
+    entry.ms = Date.now() - started;
+    results.push(entry);
+    if (!entry.ok && !p.continue_on_error) break;
+  }
+  let final = { url: page.url() };
+  try {
+    final.title = await page.title();
+  } catch (err) {
+    // page may be mid-navigation
+  }
+  return { ok, steps: results, final };
+}
+
+// Loads one URL at one viewport in a fresh context and records the
+// outcome: title, status, console and page errors, and a screenshot.
+async function captureOne(job, p) {
+  const started = Date.now();
+  const timeout = p.page_timeout || p.timeout;
+  const result = { url: job.url, viewport: job.viewport.name, width: job.viewport.width, height: job.viewport.height };
+  const context = await newContext({ viewport: { width: job.viewport.width, height: job.viewport.height } });
+  const consoleErrors = [];
+  try {
+    const page = await context.newPage();
+    page.on('console', (msg) => {
+      if (msg.type() === 'error') consoleErrors.push(msg.text());
+    });
+    page.on('pageerror', (err) => consoleErrors.push(String((err && err.message) || err)));
+    const response = await page.goto(job.url, { waitUntil: p.wait_until || 'load', timeout });
+    result.status = response ? response.status() : null;
+    result.title = await page.title();
+    if (job.file) {
+      const shot = await capture(page, { format: p.format, quality: p.quality, full_page: p.full_page, timeout });
+      const data = await encode(shot, p.format, p.quality);
+      writeFile(path.join(p.out_dir, job.file), data);
+      result.screenshot = job.file;
+      result.size = data.length;
+    }
+    result.ok = true;
+  } catch (err) {
+    result.ok = false;
+    result.error = String((err && err.message) || err).split('\n')[0];
+  } finally {
+    await context.close().catch(() => {});
+  }
+  result.console_errors = consoleErrors;
+  result.ms = Date.now() - started;
+  return result;
+}
+
+// Every URL x viewport combination, at most `concurrency` at a time
+async function captureMatrix(p) {
+  const jobs = p.jobs || [];
+  const results = new Array(jobs.length);
+  let next = 0;
+  const worker = async () => {
+    while (next < jobs.length) {
+      const index = next++;
+      results[index] = await captureOne(jobs[index], p);
+    }
+  };
+  const workers = Math.max(1, Math.min(Number(p.concurrency) || 4, jobs.length));
+  await Promise.all(Array.from({ length: workers }, worker));
+  return { results };
+}
+
+// Installed before any page script runs: buffers LCP, layout shifts and
+// long tasks, which are not all retrievable after the fact
+function perfObservers() {
+  const store = { lcp: null, shifts: [], longTasks: [] };
+  window.__sbxPerf = store;
+  const observe = (type, fn) => {
+    try {
+      new PerformanceObserver((list) => list.getEntries().forEach(fn)).observe({ type, buffered: true });
+    } catch (err) {
+      // entry type not supported
+    }
+  };
+  observe('largest-contentful-paint', (e) => {
+    store.lcp = { time: e.startTime, size: e.size, element: e.element ? e.element.tagName.toLowerCase() : null, url: e.url || null };
+  });
+  observe('layout-shift', (e) => {
+    if (!e.hadRecentInput) store.shifts.push({ time: e.startTime, value: e.value });
+  });
+  observe('longtask', (e) => store.longTasks.push({ time: e.startTime, duration: e.duration }));
+}
+
+// Runs in the page after load: timing, vitals and resource summary
+function perfSummary() {
+  const store = window.__sbxPerf || { lcp: null, shifts: [], longTasks: [] };
+  const nav = performance.getEntriesByType('navigation')[0];
+  const paint = Object.fromEntries(performance.getEntriesByType('paint').map((e) => [e.name, e.startTime]));
+  const fcp = paint['first-contentful-paint'] ?? null;
+
+  // CLS: largest session window (gaps < 1s, windows <= 5s), as in web-vitals
+  let cls = 0;
+  let windowValue = 0;
+  let windowStart = 0;
+  let last = -Infinity;
+  for (const shift of store.shifts) {
+    if (shift.time - last > 1000 || shift.time - windowStart > 5000) {
+      windowValue = 0;
+      windowStart = shift.time;
+    }
+    windowValue += shift.value;
+    last = shift.time;
+    cls = Math.max(cls, windowValue);
+  }
+
+  // TBT: blocking part (> 50ms) of long tasks after first contentful paint
+  const after = store.longTasks.filter((t) => fcp === null || t.time >= fcp);
+  const tbt = after.reduce((sum, t) => sum + Math.max(0, t.duration - 50), 0);
+
+  const resources = performance.getEntriesByType('resource');
+  const byType = {};
+  for (const r of resources) {
+    const entry = (byType[r.initiatorType] = byType[r.initiatorType] || { count: 0, transfer_bytes: 0, decoded_bytes: 0 });
+    entry.count += 1;
+    entry.transfer_bytes += r.transferSize || 0;
+    entry.decoded_bytes += r.decodedBodySize || 0;
+  }
+  const largest = resources
+    .map((r) => ({ url: r.name, type: r.initiatorType, transfer_bytes: r.transferSize || 0, duration: Math.round(r.duration) }))
+    .sort((a, b) => b.transfer_bytes - a.transfer_bytes)
+    .slice(0, 5);
+  const round = (v) => (v === null || v === undefined ? null : Math.round(v * 10) / 10);
+  return {
+    navigation: nav
+      ? {
+          ttfb: round(nav.responseStart - nav.startTime),
+          dom_interactive: round(nav.domInteractive),
+          dom_content_loaded: round(nav.domContentLoadedEventEnd),
+          load: round(nav.loadEventEnd),
+          transfer_bytes: nav.transferSize || 0,
+          decoded_bytes: nav.decodedBodySize || 0,
+        }
+      : null,
+    paint: { first_paint: round(paint['first-paint'] ?? null), first_contentful_paint: round(fcp) },
+    vitals: {
+      lcp: store.lcp ? round(store.lcp.time) : null,
+      lcp_element: store.lcp ? store.lcp.element : null,
+      cls: Math.round(cls * 10000) / 10000,
+      tbt: round(tbt),
+    },
+    long_tasks: {
+      count: store.longTasks.length,
+      total_ms: round(store.longTasks.reduce((sum, t) => sum + t.duration, 0)),
+      longest_ms: round(store.longTasks.reduce((max, t) => Math.max(max, t.duration), 0)),
+    },
+    resources: {
+      count: resources.length,
+      transfer_bytes: resources.reduce((sum, r) => sum + (r.transferSize || 0), 0),
+      by_type: byType,
+      largest,
+    },
+  };
+}
+
+// Load a URL in a fresh context and measure it, optionally recording a
+// CPU profile (.cpuprofile) and/or a Chromium trace (DevTools format)
+async function measure(p) {
+  const context = await newContext(p.viewport ? { viewport: p.viewport } : {});
+  await context.addInitScript(perfObservers);
+  const page = await context.newPage();
+  const timeout = p.page_timeout || p.timeout;
+  const cdp = await context.newCDPSession(page);
+  try {
+    await cdp.send('Performance.enable');
+    if (p.cpu_throttle && p.cpu_throttle > 1) await cdp.send('Emulation.setCPUThrottlingRate', { rate: p.cpu_throttle });
+    if (p.cpu_profile) {
+      await cdp.send('Profiler.enable');
+      await cdp.send('Profiler.start');
+    }
+    if (p.trace) await state.browser.startTracing(page, { path: p.trace, screenshots: true });
+    const started = Date.now();
+    const response = await page.goto(p.url, { waitUntil: p.wait_until || 'load', timeout });
+    await page.waitForTimeout(p.settle_ms === undefined ? 1000 : p.settle_ms);
+    const wall = Date.now() - started;
+    const summary = await page.evaluate(perfSummary);
+    const { metrics } = await cdp.send('Performance.getMetrics');
+    const m = Object.fromEntries(metrics.map((x) => [x.name, x.value]));
+    const artifacts = {};
+    if (p.cpu_profile) {
+      const { profile } = await cdp.send('Profiler.stop');
+      writeFile(p.cpu_profile, JSON.stringify(profile));
+      artifacts.cpu_profile = p.cpu_profile;
+    }
+    if (p.trace) {
+      await state.browser.stopTracing();
+      artifacts.trace = p.trace;
+    }
+    return Object.assign(
+      { url: page.url(), status: response ? response.status() : null, title: await page.title(), wall_ms: wall },
+      summary,
+      {
+        runtime: {
+          js_heap_used_bytes: m.JSHeapUsedSize,
+          js_heap_total_bytes: m.JSHeapTotalSize,
+          dom_nodes: m.Nodes,
+          script_ms: Math.round((m.ScriptDuration || 0) * 1000),
+          task_ms: Math.round((m.TaskDuration || 0) * 1000),
+          layout_count: m.LayoutCount,
+          style_recalc_count: m.RecalcStyleCount,
+        },
+        artifacts,
+      },
+    );
+  } finally {
+    await context.close().catch(() => {});
+  }
+}
+
+const SERVER_ACTIONS = {
+  async perf(p) {
+    return measure(p);
+  },
+
+  async run(p) {
+    return onPage(p.page, (page) => runSteps(page, p));
+  },
+
+  async capture(p) {
+    return captureMatrix(p);
+  },
+
+  // Route config for one page's context, or (all) for every open page and
+  // every context created from now on, capture and perf included
+  async route(p) {
+    const config = { rules: p.rules, block_external: p.block_external, allow_hosts: p.allow_hosts };
+    Object.assign(config, { har: p.har, har_url: p.har_url, har_record: p.har_record, har_not_found: p.har_not_found });
+    if (p.all && p.har_record) throw new Error('HAR recording is per page; pass a page instead of all');
+    const contexts = p.all ? Array.from(state.pages.values(), (entry) => entry.context) : [(await getPage(p.page)).context];
+    if (p.all) state.defaultRoutes = p.clear ? config : mergeRoutes(state.defaultRoutes, config);
+    for (const context of contexts) {
+      if (p.clear) await clearRoutes(context);
+      await installRoutes(context, config);
+    }
+    if (p.all) return { pages: contexts.length, routes: describeRoutes(state.defaultRoutes) };
+    return { page: p.page, routes: routeTables.get(contexts[0]) };
+  },
+
+  async 'close-page'(p) {
+    const entry = state.pages.get(p.page);
+    if (!entry) return { closed: false };
+    state.pages.delete(p.page);
+    await closeEntry(entry);
+    return { closed: true };
+  },
+
+  // Open a page in a persistent profile (replacing the page if it exists);
+  // with default, pages opened later use the profile too
+  async profile(p) {
+    await openInProfile(p.page, p.profile, p);
+    if (p.default) state.defaultProfile = p.profile;
+    const { dir, trimmed } = state.profiles.get(p.profile);
+    return { profile: p.profile, page: p.page, dir, trimmed, size_bytes: dirSize(dir), default: state.defaultProfile === p.profile };
+  },
+
+  // Close a profile's context (flushing cache and cookies to disk) and the
+  // pages in it
+  async 'close-profile'(p) {
+    return { closed: await closeProfile(p.profile) };
+  },
+
+  async status() {
+    const pages = [];
+    for (const [name, entry] of state.pages) {
+      if (!entry.page.isClosed()) pages.push(Object.assign({ name, url: entry.page.url() }, entry.profile ? { profile: entry.profile } : {}));
+    }
+    return {
+      pid: process.pid,
+      port: state.opts.port,
+      ws_endpoint: state.server.wsEndpoint(),
+      headless: state.opts.headless,
+      uptime: Math.round((Date.now() - state.startedAt) / 1000),
+      pages,
+      profiles: Array.from(state.profiles.keys()),
+      default_profile: state.defaultProfile,
+    };
+  },
+
+  async shutdown() {
+    setTimeout(() => shutdown(0), 10);
+    return { stopping: true };
+  },
+};
+
+async function handle(request) {
+  const params = Object.assign({}, request.params || {}, { page: request.page || 'default' });
+  const serverAction = SERVER_ACTIONS[request.action];
+  if (serverAction) return serverAction(params);
+  const action = pageAction(request.action);
+  return onPage(params.page, (page) => action(page, params));
+}
+
+async function shutdown(code) {
+  try {
+    fs.rmSync(path.join(state.opts.stateDir, 'state.json'), { force: true });
+    for (const name of Array.from(state.profiles.keys())) await closeProfile(name);
+    if (state.browser) await state.browser.close().catch(() => {});
+    if (state.server) await state.server.close().catch(() => {});
+  } finally {
+    process.exit(code);
+  }
+}
+
+async function serve(opts) {
+  const { chromium } = require('playwright');
+  state.opts = opts;
+  state.server = await chromium.launchServer({ headless: opts.headless });
+  state.browser = await chromium.connect(state.server.wsEndpoint());
+  state.browser.on('disconnected', () => shutdown(1));
+
+  const httpServer = http.createServer((req, res) => {
+    const chunks = [];
+    req.on('data', (c) => chunks.push(c));
+    req.on('end', async () => {
+      const started = Date.now();
+      let reply;
+      try {
+        const result = await handle(JSON.parse(Buffer.concat(chunks).toString() || '{}'));
+        reply = { ok: true, result: result === undefined ? null : result };
+      } catch (err) {
+        reply = { ok: false, error: String((err && err.message) || err).split('\n')[0] };
+      }
+      reply.ms = Date.now() - started;
+      res.writeHead(200, { 'Content-Type': 'application/json' });
+      res.end(JSON.stringify(reply));
+    });
+  });
+  httpServer.listen(opts.port, '127.0.0.1', () => {
+    fs.mkdirSync(opts.stateDir, { recursive: true });
+    const info = { pid: process.pid, port: opts.port, ws_endpoint: state.server.wsEndpoint(), headless: opts.headless };
+    const file = path.join(opts.stateDir, 'state.json');
+    fs.writeFileSync(file + '.tmp', JSON.stringify(info));
+    fs.renameSync(file + '.tmp', file);
+    console.log('BROWSER_READY ' + JSON.stringify(info));
+  });
+  httpServer.on('error', (err) => {
+    console.error(`cannot listen on port ${opts.port}: ${err.message}`);
+    shutdown(1);
+  });
+  process.on('SIGTERM', () => shutdown(0));
+  process.on('SIGINT', () => shutdown(0));
+}
+
+const opts = parseArgs(process.argv.slice(2));
+(opts.mode === 'call' ? call(opts) : serve(opts)).catch((err) => {
+  console.error(String((err && err.stack) || err));
+  process.exit(1);
+});
@@ -0,0 +1,189 @@
+"""Checkpoints of a sandbox directory and changed-since queries.
+
+A checkpoint is a sorted manifest (path, size, mtime) recorded inside the
+sandbox under /tmp/.sbx/checkpoints, together with the exact `find`
+command that produced it. `changed_since` re-runs that command and diffs
+the two manifests with awk in the same exec, so only the list of changed
+paths crosses the wire; `download_changed` then pulls exactly those files
+as one archive.
+
+This works the same on every backend. (`docker diff` and the overlay upper
+layer only report changes since the container started, not since an
+arbitrary point in time.)
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import re
+import shlex
+import tarfile
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from sbx.modules.ignore import IgnoreSpec
+from sbx.provider import SandboxInstance
+
+CHECKPOINT_DIR = "/tmp/.sbx/checkpoints"
+
+_NAME = re.compile(r"^[A-Za-z0-9._-]+$")
+
+# Diff old manifest (file arg) against the new one (stdin), both "path\tsize\tmtime"
+_DIFF_AWK = (
+    "awk -F '\\t' 'NR == FNR { old[$1] = $2 FS $3; next } "
+    "{ if (!($1 in old)) print \"A\\t\" $1; else if (old[$1] != $2 FS $3) print \"M\\t\" $1; "
+    "delete old[$1] } END { for (p in old) print \"D\\t\" p }'"
+)
+
+
+@dataclass
+class ChangeSet:
+    """Paths (relative to the checkpoint root) changed since a checkpoint."""
+
+    checkpoint: str
+    root: str
+    added: list[str] = field(default_factory=list)
+    modified: list[str] = field(default_factory=list)
+    deleted: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "checkpoint": self.checkpoint,
+            "root": self.root,
+            "added": self.added,
+            "modified": self.modified,
+            "deleted": self.deleted,
+        }
+
+
+def _user(sbx: SandboxInstance) -> str:
+    """Run checkpoint execs as the filesystem API's user (root on Docker).
+
+    /tmp/.sbx is shared with root-side state (sessions, the browser), so
+    this keeps checkpoints working when another feature created it.
+    """
+    return getattr(sbx.filesystem, "user", "user")
+
+
+def _paths(name: str) -> tuple[str, str, str]:
+    if not _NAME.match(name):
+        raise ValueError(f"Invalid checkpoint name: {name!r} (use letters, digits, '.', '_', '-')")
+    base = f"{CHECKPOINT_DIR}/{name}"
+    return base + ".tsv", base + ".cmd", base + ".root"
+
+
+def _manifest_command(root: str, prune: list[str]) -> str:
+    prune_expr = ""
+    if prune:
+        names = " -o ".join(f"-name {shlex.quote(n)}" for n in prune)
+        prune_expr = f"-mindepth 1 -type d \\( {names} \\) -prune -o "
+    return (
+        f"cd {shlex.quote(root)} && find . {prune_expr}-type f "
+        "-printf '%P\\t%s\\t%T@\\n' | LC_ALL=C sort"
+    )
+
+
+def create_checkpoint(
+    sbx: SandboxInstance,
+    path: str = "/workspace",
+    name: str | None = None,
+    use_ignore: bool = True,
+) -> dict:
+    """Record the current state of a sandbox directory. One exec.
+
+    Returns {"name", "root", "files", "created_at"}.
+    """
+    name = name or time.strftime("cp-%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:4]
+    manifest, cmd_file, root_file = _paths(name)
+    root = path.rstrip("/") or "/"
+    prune = IgnoreSpec().prunable_dir_names() if use_ignore else []
+    command = _manifest_command(root, prune)
+    script = (
+        f"install -d -m 1777 /tmp/.sbx 2>/dev/null; "
+        f"mkdir -p {CHECKPOINT_DIR} && [ -d {shlex.quote(root)} ] || "
+        f"{{ echo 'No such directory: '{shlex.quote(root)} >&2; exit 2; }}; "
+        f"printf '%s\\n' {shlex.quote(command)} > {cmd_file} && "
+        f"printf '%s\\n' {shlex.quote(root)} > {root_file} && "
+        f"{{ {command}; }} > {manifest} && wc -l < {manifest}"
+    )
+    result = sbx.commands.run(script, user=_user(sbx), timeout=300)
+    if result.exit_code != 0:
+        raise RuntimeError(f"Checkpoint failed: {result.stderr.strip()}")
+    return {
+        "name": name,
+        "root": root,
+        "files": int(result.stdout.strip() or 0),
+        "created_at": int(time.time()),
+    }
+
+
+def changed_since(sbx: SandboxInstance, name: str) -> ChangeSet:
+    """Added, modified and deleted files since a checkpoint. One exec."""
+    manifest, cmd_file, root_file = _paths(name)
+    script = (
+        f"[ -f {manifest} ] || {{ echo 'No such checkpoint: {name}' >&2; exit 2; }}; "
+        f"head -n 1 {root_file}; "
+        f"eval \"$(cat {cmd_file})\" | {_DIFF_AWK} {manifest} -"
+    )
+    result = sbx.commands.run(script, user=_user(sbx), timeout=300)
+    if result.exit_code != 0:
+        raise RuntimeError(f"Cannot diff checkpoint {name}: {result.stderr.strip()}")
+    lines = result.stdout.split("\n")
+    changes = ChangeSet(checkpoint=name, root=lines[0])
+    buckets = {"A": changes.added, "M": changes.modified, "D": changes.deleted}
+    for line in lines[1:]:
+        status, sep, rel = line.partition("\t")
+        if sep and status in buckets:
+            buckets[status].append(rel)
+    for bucket in buckets.values():
+        bucket.sort()
+    return changes
+
+
+def extract_archive(archive: bytes, local_dir: str) -> int:
+    """Extract regular files from a tar, refusing anything outside local_dir."""
+    count = 0
+    target = os.path.realpath(local_dir)
+    with tarfile.open(fileobj=io.BytesIO(archive), mode="r:") as tar:
+        for member in tar.getmembers():
+            if not member.isfile():
+                continue
+            dest = os.path.realpath(os.path.join(target, member.name))
+            if not dest.startswith(target + os.sep):
+                continue
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            with tar.extractfile(member) as src, open(dest, "wb") as out:
+                out.write(src.read())
+            os.utime(dest, (member.mtime, member.mtime))
+            count += 1
+    return count
+
+
+def download_changed(sbx: SandboxInstance, changes: ChangeSet, local_dir: str) -> int:
+    """Download the added and modified files of a ChangeSet as one archive.
+
+    Returns the number of files written under local_dir.
+    """
+    paths = changes.added + changes.modified
+    if not paths:
+        return 0
+    if any("\n" in p for p in paths):
+        paths = [p for p in paths if "\n" not in p]
+    archive = f"/tmp/.sbx/changed-{uuid.uuid4().hex}.tar"
+    marker = f"SBX_EOF_{uuid.uuid4().hex}"
+    listing = "\n".join(f"./{p}" for p in paths)
+    script = (
+        f"cd {shlex.quote(changes.root)} && "
+        f"tar -cf {archive} --ignore-failed-read -T - <<'{marker}'\n{listing}\n{marker}\n"
+    )
+    result = sbx.commands.run(script, user=_user(sbx), timeout=600)
+    if result.exit_code not in (0, 1):
+        sbx.commands.run(f"rm -f {archive}", user=_user(sbx), timeout=30)
+        raise RuntimeError(f"Cannot archive changed files: {result.stderr.strip()}")
+    try:
+        data = sbx.filesystem.read_bytes(archive)
+    finally:
+        sbx.commands.run(f"rm -f {archive}", user=_user(sbx), timeout=30)
+    return extract_archive(data, local_dir)
@@ -1,7 +1,11 @@
 """Command execution helpers for sandboxes."""
 
+from sbx.output import max_output_bytes
 from sbx.provider import SandboxInstance
 
+# Marks "use the SBX_MAX_OUTPUT_MB default" apart from None (no cap)
+_DEFAULT = object()
+
 
 def run_command(
     sbx: SandboxInstance,
@@ -10,14 +14,24 @@ def run_command(
     env_vars: dict | None = None,
     user: str = "user",
     timeout: int = 60,
+    max_output: int | None = _DEFAULT,
+    spill: bool = True,
 ):
-    """Run a command synchronously inside the sandbox."""
+    """Run a command synchronously inside the sandbox.
+
+    Each output stream is capped at `max_output` bytes (default from
+    SBX_MAX_OUTPUT_MB; None = no cap). Over the cap the result keeps the
+    head and tail and is marked truncated; with `spill` the full output
+    stays in the sandbox at `result.spill_path`.
+    """
     return sbx.commands.run(
         command,
         cwd=cwd,
         envs=env_vars or {},
         user=user,
         timeout=timeout,
+        max_output=max_output_bytes() if max_output is _DEFAULT else max_output,
+        spill=spill,
     )
 
 
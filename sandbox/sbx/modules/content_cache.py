@@ -0,0 +1,264 @@
+"""Host-side cache of file content downloaded from sandboxes.
+
+Entries are keyed by (sandbox ID, path) and validated against the file's
+size and mtime, fetched for many paths at once with a single `find` exec.
+An unchanged file is served from disk instead of being transferred again.
+
+Writes made through sbx (write, edit, patch, upload, sync, rm, mv, cp)
+invalidate the matching entries; killing a sandbox drops all of its
+entries. The cache is LRU-evicted to stay under SBX_CACHE_MAX_MB
+(default 256); set it to 0 to disable caching.
+
+Blobs and their SQLite index live next to the sandbox registry
+(`sandbox/.sandbox-cache/`).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import posixpath
+import shlex
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from sbx.modules.registry import REGISTRY_FILE
+from sbx.provider import SandboxInstance
+
+CACHE_DIR = REGISTRY_FILE.with_name(".sandbox-cache")
+
+_DEFAULT_MAX_MB = 256
+
+# Relative sandbox paths resolve against the default working directory
+_WORKDIR = "/workspace"
+
+# Keep single stat commands well below the per-argument exec limit
+_STAT_CHUNK_BYTES = 64 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    sandbox_id  TEXT NOT NULL,
+    path        TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    mtime       REAL NOT NULL,
+    blob        TEXT NOT NULL,
+    last_used   REAL NOT NULL,
+    PRIMARY KEY (sandbox_id, path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used);
+"""
+
+
+def _max_bytes() -> int:
+    try:
+        return int(float(os.environ.get("SBX_CACHE_MAX_MB", _DEFAULT_MAX_MB)) * 1024 * 1024)
+    except ValueError:
+        return _DEFAULT_MAX_MB * 1024 * 1024
+
+
+def normalize(path: str) -> str:
+    """Absolute, normalized sandbox path used as the cache key."""
+    return posixpath.normpath(posixpath.join(_WORKDIR, path))
+
+
+def _mtime(value: float) -> float:
+    # Backends report mtimes with different precision; compare at microseconds
+    return round(float(value), 6)
+
+
+class ContentCache:
+    """Size-bounded LRU cache of sandbox file content."""
+
+    def __init__(self, directory: Path = CACHE_DIR) -> None:
+        self._dir = directory
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return _max_bytes() > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                str(self._dir / "index.db"), timeout=30, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA busy_timeout = 30000")
+            try:
+                conn.execute("PRAGMA journal_mode = WAL")
+            except sqlite3.OperationalError:
+                pass
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _blob_path(self, sandbox_id: str, path: str) -> Path:
+        return self._dir / hashlib.sha256(f"{sandbox_id}\0{path}".encode()).hexdigest()
+
+    def get(self, sandbox_id: str, path: str, size: int, mtime: float) -> bytes | None:
+        """Cached content if the entry matches this size and mtime."""
+        if not self.enabled:
+            return None
+        path = normalize(path)
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT size, mtime, blob FROM entries WHERE sandbox_id = ? AND path = ?",
+                (sandbox_id, path),
+            ).fetchone()
+            if row is None or row[0] != size or row[1] != _mtime(mtime):
+                return None
+            try:
+                data = (self._dir / row[2]).read_bytes()
+            except OSError:
+                conn.execute("DELETE FROM entries WHERE sandbox_id = ? AND path = ?", (sandbox_id, path))
+                return None
+            if len(data) != size:
+                return None
+            conn.execute(
+                "UPDATE entries SET last_used = ? WHERE sandbox_id = ? AND path = ?",
+                (time.time(), sandbox_id, path),
+            )
+            return data
+
+    def put(self, sandbox_id: str, path: str, size: int, mtime: float, data: bytes) -> None:
+        """Store content fetched for a file with the given size and mtime."""
+        limit = _max_bytes()
+        if limit <= 0 or len(data) != size or size > limit // 4:
+            return
+        path = normalize(path)
+        blob = self._blob_path(sandbox_id, path)
+        with self._lock:
+            conn = self._connect()
+            tmp = blob.with_name(f"{blob.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, blob)
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (sandbox_id, path, size, _mtime(mtime), blob.name, time.time()),
+            )
+            self._evict(conn, limit)
+
+    def _evict(self, conn: sqlite3.Connection, limit: int) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= limit:
+            return
+        doomed = []
+        for sandbox_id, path, size, blob in conn.execute(
+            "SELECT sandbox_id, path, size, blob FROM entries ORDER BY last_used"
+        ):
+            if total <= limit:
+                break
+            doomed.append((sandbox_id, path, blob))
+            total -= size
+        self._delete(conn, doomed)
+
+    def _delete(self, conn: sqlite3.Connection, rows: list[tuple[str, str, str]]) -> None:
+        conn.executemany(
+            "DELETE FROM entries WHERE sandbox_id = ? AND path = ?", [r[:2] for r in rows]
+        )
+        for *_key, blob in rows:
+            try:
+                (self._dir / blob).unlink()
+            except OSError:
+                pass
+
+    def invalidate(self, sandbox_id: str, path: str, recursive: bool = True) -> None:
+        """Drop the entry for a path (and, if recursive, everything below it)."""
+        if not self._dir.exists():
+            return
+        path = normalize(path)
+        with self._lock:
+            conn = self._connect()
+            if recursive:
+                prefix = path.rstrip("/") + "/"
+                rows = conn.execute(
+                    "SELECT sandbox_id, path, blob FROM entries WHERE sandbox_id = ? "
+                    "AND (path = ? OR substr(path, 1, ?) = ?)",
+                    (sandbox_id, path, len(prefix), prefix),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT sandbox_id, path, blob FROM entries WHERE sandbox_id = ? AND path = ?",
+                    (sandbox_id, path),
+                ).fetchall()
+            self._delete(conn, rows)
+
+    def drop_sandbox(self, sandbox_id: str) -> None:
+        """Forget everything cached for a sandbox."""
+        if not self._dir.exists():
+            return
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT sandbox_id, path, blob FROM entries WHERE sandbox_id = ?", (sandbox_id,)
+            ).fetchall()
+            self._delete(conn, rows)
+
+
+_default_cache: ContentCache | None = None
+
+
+def get_cache() -> ContentCache:
+    """Process-wide ContentCache instance."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ContentCache()
+    return _default_cache
+
+
+def stat_many(sbx: SandboxInstance, paths: list[str]) -> dict[str, tuple[int, float]]:
+    """(size, mtime) of regular files, for many paths in as few execs as possible.
+
+    Missing paths and non-files are left out of the result.
+    """
+    chunks: list[list[str]] = []
+    current: list[str] = []
+    current_bytes = 0
+    for path in paths:
+        quoted = shlex.quote(path)
+        if current and current_bytes + len(quoted) > _STAT_CHUNK_BYTES:
+            chunks.append(current)
+            current, current_bytes = [], 0
+        current.append(quoted)
+        current_bytes += len(quoted) + 1
+    if current:
+        chunks.append(current)
+
+    found: dict[str, tuple[int, float]] = {}
+    for chunk in chunks:
+        result = sbx.commands.run(
+            f"find -H {' '.join(chunk)} -maxdepth 0 -type f -printf '%s %T@ %p\\0' 2>/dev/null; true",
+            timeout=60,
+        )
+        for record in result.stdout.split("\0"):
+            if record:
+                size, mtime, name = record.split(" ", 2)
+                found[name] = (int(size), float(mtime))
+    return found
+
+
+def read_bytes_cached(sbx: SandboxInstance, path: str) -> bytes:
+    """Read a sandbox file, serving it from the host cache when unchanged."""
+    cache = get_cache()
+    if not cache.enabled:
+        return sbx.filesystem.read_bytes(path)
+    sig = stat_many(sbx, [path]).get(path)
+    if sig is not None:
+        data = cache.get(sbx.sandbox_id, path, *sig)
+        if data is not None:
+            return data
+    data = sbx.filesystem.read_bytes(path)
+    if sig is not None:
+        cache.put(sbx.sandbox_id, path, sig[0], sig[1], data)
+    return data
+
+
+def invalidate(sbx: SandboxInstance, *paths: str) -> None:
+    """Drop cache entries for paths (recursively) written through sbx."""
+    cache = get_cache()
+    for path in paths:
+        cache.invalidate(sbx.sandbox_id, path)
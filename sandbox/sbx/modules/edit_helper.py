@@ -0,0 +1,199 @@
+"""Apply text replacements and diff hunks to files (runs inside the sandbox).
+
+This module is self-contained on purpose: `sbx.modules.remote_edit` sends
+its source to the sandbox and runs it with `python3 -c`, feeding the edit
+spec as JSON on stdin. Only the edits cross the wire, never the files.
+When the sandbox has no python3 the host imports this module and applies
+the same logic to files it reads and writes through the backend.
+
+Spec::
+
+    {"dry_run": false,
+     "files": [
+       {"path": "/abs/file", "edits": [{"old_text": "...", "new_text": "...",
+                                        "replace_all": false}]},
+       {"path": "/abs/other", "create": false, "delete": false,
+        "hunks": [{"old_start": 10, "lines": [[" ", "ctx"], ["-", "old"], ["+", "new"]],
+                   "old_eof_newline": null, "new_eof_newline": null}]}
+     ]}
+
+Every file is planned in memory first. Nothing is written unless every
+edit and hunk in every file applies; then each file is replaced atomically
+(temp file in the same directory + rename, keeping its mode).
+"""
+
+import json
+import os
+import sys
+
+
+def _decode(data):
+    return data.decode("utf-8", "surrogateescape")
+
+
+def _encode(text):
+    return text.encode("utf-8", "surrogateescape")
+
+
+def _apply_replacements(text, edits):
+    results = []
+    for i, edit in enumerate(edits):
+        old, new = edit.get("old_text", ""), edit.get("new_text", "")
+        count = text.count(old) if old else 0
+        if not count:
+            results.append({"edit": i, "ok": False, "error": "old_text not found"})
+            continue
+        if edit.get("replace_all"):
+            text = text.replace(old, new)
+        else:
+            text = text.replace(old, new, 1)
+            count = 1
+        results.append({"edit": i, "ok": True, "replaced": count})
+    return text, results
+
+
+def _find_block(lines, block, expected):
+    """Index where `block` occurs in `lines`, searching outward from `expected`."""
+    n, size = len(lines), len(block)
+    if size == 0:
+        return max(0, min(expected, n))
+    for start in sorted(range(n - size + 1), key=lambda s: abs(s - expected)):
+        if lines[start:start + size] == block:
+            return start
+    return -1
+
+
+def _apply_hunks(text, hunks):
+    if text is None:
+        lines, eol = [], True
+    else:
+        lines = text.split("\n")
+        eol = lines[-1] == ""
+        if eol:
+            lines.pop()
+    results = []
+    delta = 0
+    for i, hunk in enumerate(hunks):
+        old = [t for tag, t in hunk["lines"] if tag in (" ", "-")]
+        new = [t for tag, t in hunk["lines"] if tag in (" ", "+")]
+        expected = max(0, hunk.get("old_start", 1) - 1) + delta
+        if not old and hunk.get("old_start", 1) == 0:
+            expected = 0
+        start = _find_block(lines, old, expected)
+        if start < 0:
+            results.append({"hunk": i, "ok": False, "error": "context does not match"})
+            continue
+        lines[start:start + len(old)] = new
+        delta += len(new) - len(old)
+        results.append({"hunk": i, "ok": True, "line": start + 1, "offset": start - expected})
+        if hunk.get("new_eof_newline") is not None:
+            eol = hunk["new_eof_newline"]
+        elif hunk.get("old_eof_newline") is False:
+            eol = True
+    out = "\n".join(lines)
+    if eol and lines:
+        out += "\n"
+    return out, results
+
+
+def plan(spec, read):
+    """Compute new contents for every file in the spec.
+
+    `read(path)` returns bytes or None if the file does not exist. Returns
+    (report, outputs) where outputs maps path -> bytes, or None to delete.
+    """
+    report = {"ok": True, "dry_run": bool(spec.get("dry_run")), "files": []}
+    outputs = {}
+    for entry in spec.get("files", []):
+        path = entry["path"]
+        file_report = {"path": path, "ok": True}
+        report["files"].append(file_report)
+        try:
+            data = read(path)
+        except Exception as exc:  # permission errors and the like
+            file_report.update(ok=False, error=str(exc))
+            report["ok"] = False
+            continue
+        if data is None and not entry.get("create"):
+            file_report.update(ok=False, error="file not found")
+            report["ok"] = False
+            continue
+        if data is not None and entry.get("create"):
+            file_report.update(ok=False, error="file already exists")
+            report["ok"] = False
+            continue
+        text = None if data is None else _decode(data)
+        if "hunks" in entry:
+            new_text, results = _apply_hunks(text, entry["hunks"])
+        else:
+            new_text, results = _apply_replacements(text or "", entry.get("edits", []))
+        file_report["results"] = results
+        file_report["applied"] = sum(1 for r in results if r["ok"])
+        if file_report["applied"] != len(results):
+            file_report["ok"] = False
+            report["ok"] = False
+            continue
+        if entry.get("delete"):
+            if new_text.strip("\n"):
+                file_report.update(ok=False, error="file to delete has unexpected content")
+                report["ok"] = False
+                continue
+            outputs[path] = None
+            file_report["deleted"] = True
+        else:
+            outputs[path] = _encode(new_text)
+            file_report["changed"] = new_text != text
+    return report, outputs
+
+
+def _read_local(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _commit_local(outputs):
+    """Write every output to a temp file, then rename them all into place."""
+    staged = []
+    try:
+        for path, data in outputs.items():
+            if data is None:
+                continue
+            parent = os.path.dirname(path) or "."
+            os.makedirs(parent, exist_ok=True)
+            tmp = os.path.join(parent, ".%s.sbx-edit-%d" % (os.path.basename(path), os.getpid()))
+            with open(tmp, "wb") as f:
+                f.write(data)
+            try:
+                os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+            except FileNotFoundError:
+                pass
+            staged.append((tmp, path))
+    except BaseException:
+        for tmp, _ in staged:
+            os.unlink(tmp)
+        raise
+    for tmp, path in staged:
+        os.replace(tmp, path)
+    for path, data in outputs.items():
+        if data is None:
+            os.unlink(path)
+
+
+def main():
+    spec = json.load(sys.stdin)
+    report, outputs = plan(spec, _read_local)
+    if report["ok"] and not report["dry_run"]:
+        try:
+            _commit_local(outputs)
+        except OSError as exc:
+            report.update(ok=False, error=str(exc))
+    # Always exit 0: the outcome is "ok" in the report, and some backends
+    # (E2B) raise on a non-zero exit instead of returning the output
+    sys.stdout.write(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Persistent host-side file index for cheap rescans.
+
+Caches the SHA-256 of every scanned file in SQLite, keyed by its stat
+signature (inode, size, mtime_ns). A rescan still stats every file but only
+re-hashes files whose signature changed, so repeated syncs of a large tree
+cost O(changed) reads. When many files need hashing they are spread over a
+process pool.
+
+The index lives next to the sandbox registry (`sandbox/.sandbox-index.db`).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from sbx.modules.registry import REGISTRY_FILE
+
+INDEX_FILE = REGISTRY_FILE.with_name(".sandbox-index.db")
+
+_HASH_CHUNK = 1024 * 1024
+
+# Below these thresholds a process pool costs more than it saves
+_POOL_MIN_FILES = 64
+_POOL_MIN_BYTES = 16 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    root      TEXT NOT NULL,
+    path      TEXT NOT NULL,
+    inode     INTEGER NOT NULL,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    hash      TEXT NOT NULL,
+    PRIMARY KEY (root, path)
+) WITHOUT ROWID;
+"""
+
+
+@dataclass
+class ManifestEntry:
+    """One file in a manifest (relative POSIX path)."""
+
+    path: str
+    size: int
+    mtime: int
+    hash: str | None = None
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a local file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hash_many(paths: list[str], total_bytes: int) -> list[str]:
+    """Hash files, using a process pool when the batch is large enough."""
+    if len(paths) < _POOL_MIN_FILES and total_bytes < _POOL_MIN_BYTES:
+        return [hash_file(p) for p in paths]
+    workers = min(os.cpu_count() or 1, 8)
+    if workers <= 1:
+        return [hash_file(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hash_file, paths, chunksize=max(1, len(paths) // (workers * 4))))
+
+
+class FileIndex:
+    """SQLite-backed cache of file hashes keyed by stat signature."""
+
+    def __init__(self, path: Path = INDEX_FILE) -> None:
+        self._path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                str(self._path), timeout=30, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA busy_timeout = 30000")
+            try:
+                conn.execute("PRAGMA journal_mode = WAL")
+            except sqlite3.OperationalError:
+                pass
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def scan(
+        self,
+        local_dir: str,
+        files: list[tuple[str, str]] | None = None,
+    ) -> dict[str, ManifestEntry]:
+        """Build a manifest for local_dir, re-hashing only files whose stat changed.
+
+        Args:
+            local_dir: Host directory to scan.
+            files: Optional pre-walked (relative_path, full_path) pairs; by
+                default the whole directory is walked.
+        """
+        root = os.path.realpath(local_dir)
+        if files is None:
+            files = []
+            for dirpath, _dirs, filenames in os.walk(local_dir):
+                for fname in filenames:
+                    full = os.path.join(dirpath, fname)
+                    files.append((os.path.relpath(full, local_dir).replace("\\", "/"), full))
+
+        with self._lock:
+            conn = self._connect()
+            cached = {
+                row[0]: row[1:]
+                for row in conn.execute(
+                    "SELECT path, inode, size, mtime_ns, hash FROM files WHERE root = ?", (root,)
+                )
+            }
+
+            manifest: dict[str, ManifestEntry] = {}
+            stale: list[tuple[str, str, os.stat_result]] = []
+            for rel, full in files:
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                hit = cached.get(rel)
+                if hit and hit[:3] == (st.st_ino, st.st_size, st.st_mtime_ns):
+                    manifest[rel] = ManifestEntry(rel, st.st_size, int(st.st_mtime), hit[3])
+                else:
+                    stale.append((rel, full, st))
+
+            hashes = _hash_many([full for _, full, _ in stale], sum(st.st_size for *_, st in stale))
+            rows = []
+            for (rel, _full, st), digest in zip(stale, hashes):
+                manifest[rel] = ManifestEntry(rel, st.st_size, int(st.st_mtime), digest)
+                rows.append((root, rel, st.st_ino, st.st_size, st.st_mtime_ns, digest))
+
+            vanished = [(root, p) for p in cached if p not in manifest]
+            if rows or vanished:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", rows)
+                    conn.executemany("DELETE FROM files WHERE root = ? AND path = ?", vanished)
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+        return manifest
+
+    def forget(self, local_dir: str) -> None:
+        """Drop all cached entries for a directory."""
+        with self._lock:
+            self._connect().execute(
+                "DELETE FROM files WHERE root = ?", (os.path.realpath(local_dir),)
+            )
+
+
+_default_index: FileIndex | None = None
+
+
+def get_index() -> FileIndex:
+    """Process-wide FileIndex instance."""
+    global _default_index
+    if _default_index is None:
+        _default_index = FileIndex()
+    return _default_index
@@ -1,8 +1,13 @@
 """File operation helpers for sandboxes."""
 
 import os
+import stat
 from pathlib import Path
+from typing import Iterator
 
+from sbx.modules.content_cache import get_cache, invalidate, read_bytes_cached
+from sbx.modules.ignore import IGNORE_FILES, IgnoreSpec, walk_files
+from sbx.modules.remote_edit import apply_edits
 from sbx.provider import SandboxInstance
 
 
@@ -12,80 +17,187 @@ def list_files(sbx: SandboxInstance, path: str) -> list:
 
 
 def read_file(sbx: SandboxInstance, path: str) -> str:
-    """Read a file's content from the sandbox."""
-    return sbx.filesystem.read(path)
+    """Read a file's content from the sandbox (served from the host cache if unchanged)."""
+    return read_bytes_cached(sbx, path).decode(errors="replace")
+
+
+def read_range(sbx: SandboxInstance, path: str, offset: int, length: int) -> bytes:
+    """Read `length` bytes of a sandbox file starting at `offset`."""
+    if offset < 0 or length < 0:
+        raise ValueError("offset and length must be non-negative")
+    return sbx.filesystem.read_range(path, offset, length)
+
+
+def read_lines(sbx: SandboxInstance, path: str, start: int, end: int | None = None) -> str:
+    """Read lines start..end (1-based, inclusive) of a sandbox file."""
+    if start < 1 or (end is not None and end < start):
+        raise ValueError(f"Invalid line range: {start}:{end if end is not None else ''}")
+    return sbx.filesystem.read_lines(path, start, end)
+
+
+def tail_file(sbx: SandboxInstance, path: str, lines: int = 10, follow: bool = False) -> Iterator[str]:
+    """Last lines of a sandbox file; with follow, keep yielding appended lines."""
+    if lines < 0:
+        raise ValueError("lines must be non-negative")
+    return sbx.filesystem.tail(path, lines, follow)
 
 
 def write_file(sbx: SandboxInstance, path: str, content: str) -> None:
     """Write content to a file in the sandbox."""
     sbx.filesystem.write(path, content)
+    invalidate(sbx, path)
+
+
+def edit_file(sbx: SandboxInstance, path: str, old_text: str, new_text: str) -> bool:
+    """Replace the first occurrence of old_text in a sandbox file.
+
+    The replacement is applied inside the sandbox (see sbx.modules.remote_edit),
+    so the file itself is not transferred. Returns False (and leaves the file
+    untouched) if old_text is not present.
+    """
+    edits = [{"old_text": old_text, "new_text": new_text, "replace_all": False}]
+    report = apply_edits(sbx, [{"path": path, "edits": edits}])
+    for file_report in report["files"]:
+        if file_report.get("error") == "file not found":
+            raise FileNotFoundError(f"No such file in sandbox: {path}")
+    return report["ok"]
 
 
 def upload_file(sbx: SandboxInstance, local_path: str, remote_path: str) -> None:
     """Upload a local file to the sandbox."""
     with open(local_path, "rb") as f:
         sbx.filesystem.write_bytes(remote_path, f.read())
+    invalidate(sbx, remote_path)
 
 
 def download_file(sbx: SandboxInstance, remote_path: str, local_path: str) -> None:
     """Download a file from the sandbox to local filesystem."""
-    content = sbx.filesystem.read_bytes(remote_path)
+    _save(read_bytes_cached(sbx, remote_path), local_path)
+
+
+def _save(content: bytes, local_path: str) -> None:
     Path(local_path).parent.mkdir(parents=True, exist_ok=True)
     with open(local_path, "wb") as f:
         f.write(content)
 
 
-def upload_dir(sbx: SandboxInstance, local_dir: str, remote_dir: str) -> int:
-    """Recursively upload a local directory to the sandbox. Returns file count."""
+def upload_dir(
+    sbx: SandboxInstance,
+    local_dir: str,
+    remote_dir: str,
+    use_ignore: bool = True,
+) -> int:
+    """Recursively upload a local directory to the sandbox. Returns file count.
+
+    Honours .gitignore/.sbxignore and the built-in ignore patterns unless
+    use_ignore is False.
+    """
     count = 0
-    for root, _dirs, filenames in os.walk(local_dir):
-        for fname in filenames:
-            local_path = os.path.join(root, fname)
-            rel_path = os.path.relpath(local_path, local_dir).replace("\\", "/")
-            remote_path = f"{remote_dir}/{rel_path}"
-            upload_file(sbx, local_path, remote_path)
-            count += 1
+    for rel_path, local_path in walk_files(local_dir, use_ignore=use_ignore):
+        with open(local_path, "rb") as f:
+            sbx.filesystem.write_bytes(f"{remote_dir}/{rel_path}", f.read())
+        count += 1
+    invalidate(sbx, remote_dir)
     return count
 
 
-def download_dir(sbx: SandboxInstance, remote_dir: str, local_dir: str) -> int:
-    """Recursively download a sandbox directory to local. Returns file count."""
+def download_dir(
+    sbx: SandboxInstance,
+    remote_dir: str,
+    local_dir: str,
+    use_ignore: bool = True,
+    skipped: list[str] | None = None,
+) -> int:
+    """Recursively download a sandbox directory to local. Returns file count.
+
+    The tree is listed with a single `walk`. Ignore files found in the
+    sandbox tree are honoured the same way as for uploads. Entries that
+    cannot be read (dangling symlinks, permission errors) are left out and,
+    if `skipped` is given, appended to it as warning messages.
+    """
+    remote_dir = remote_dir.rstrip("/") or "/"
+    spec = IgnoreSpec()
+    entries = sbx.filesystem.walk(
+        remote_dir, prune=spec.prunable_dir_names() if use_ignore else None
+    )
+    prefix = "" if remote_dir == "/" else remote_dir
+    files = [(e.path[len(prefix):].lstrip("/"), e) for e in entries if not e.is_dir]
+    if use_ignore:
+        # Shallow ignore files first, so deeper ones can override them
+        for rel, entry in sorted(files, key=lambda item: item[0].count("/")):
+            if entry.name in IGNORE_FILES and not spec.is_excluded(rel):
+                try:
+                    base = rel.rpartition("/")[0]
+                    spec.add(base, sbx.filesystem.read(entry.path).splitlines())
+                except FileNotFoundError:
+                    pass
+    # The walk already has every file's size and mtime, so unchanged files
+    # are served from the host cache without another stat
+    cache = get_cache()
     count = 0
-    entries = sbx.filesystem.list(remote_dir)
-    for entry in entries:
-        remote_path = f"{remote_dir}/{entry.name}"
-        local_path = os.path.join(local_dir, entry.name)
-        if getattr(entry, "is_dir", False):
-            count += download_dir(sbx, remote_path, local_path)
-        else:
-            download_file(sbx, remote_path, local_path)
-            count += 1
+    for rel, entry in files:
+        if use_ignore and spec.is_excluded(rel):
+            continue
+        local_path = os.path.join(local_dir, *rel.split("/"))
+        cacheable = entry.symlink_target is None
+        data = cache.get(sbx.sandbox_id, entry.path, entry.size, entry.mtime) if cacheable else None
+        if data is None:
+            try:
+                data = sbx.filesystem.read_bytes(entry.path)
+            except FileNotFoundError as exc:
+                if skipped is not None:
+                    skipped.append(str(exc).strip())
+                continue
+            if cacheable:
+                cache.put(sbx.sandbox_id, entry.path, entry.size, entry.mtime, data)
+        _save(data, local_path)
+        count += 1
     return count
 
 
+def walk_files_remote(
+    sbx: SandboxInstance,
+    path: str,
+    max_depth: int | None = None,
+    pattern: str | None = None,
+) -> list:
+    """Recursively list a sandbox directory in one call."""
+    return sbx.filesystem.walk(path, max_depth=max_depth, pattern=pattern)
+
+
 def file_exists(sbx: SandboxInstance, path: str) -> bool:
     """Check if a file exists in the sandbox."""
-    try:
-        sbx.filesystem.read(path)
-        return True
-    except Exception:
-        return False
+    return sbx.filesystem.exists(path)
 
 
 def file_info(sbx: SandboxInstance, path: str) -> dict:
     """Get metadata about a file in the sandbox."""
-    result = sbx.commands.run(f"stat --format='%s %Y %A %U' {path}")
-    if result.exit_code != 0:
+    try:
+        entry = sbx.filesystem.stat(path)
+    except FileNotFoundError:
         return {"error": "File not found or not accessible"}
-    parts = result.stdout.strip().split()
-    if len(parts) >= 4:
-        return {
-            "size": parts[0],
-            "modified": parts[1],
-            "permissions": parts[2],
-            "owner": parts[3],
-        }
-    return {"raw": result.stdout.strip()}
+    return entry_to_dict(entry, with_name=False)
+
+
+def entry_to_dict(entry, with_name: bool = True) -> dict:
+    """JSON-friendly view of a FileEntry."""
+    if entry.is_dir:
+        kind = "dir"
+    elif entry.symlink_target is not None or stat.S_ISLNK(entry.mode):
+        kind = "symlink"
+    else:
+        kind = "file"
+    data = {"name": entry.name, "path": entry.path} if with_name else {}
+    data.update({
+        "size": entry.size,
+        "modified": int(entry.mtime),
+        "permissions": stat.filemode(entry.mode) if entry.mode else "unknown",
+        "owner": entry.owner,
+        "type": kind,
+    })
+    if entry.symlink_target:
+        data["symlink_target"] = entry.symlink_target
+    return data
 
 
 def mkdir_in_sandbox(sbx: SandboxInstance, path: str) -> None:
@@ -96,10 +208,16 @@ def mkdir_in_sandbox(sbx: SandboxInstance, path: str) -> None:
 def remove_in_sandbox(sbx: SandboxInstance, path: str) -> None:
     """Remove a file or directory in the sandbox."""
     sbx.filesystem.remove(path)
+    invalidate(sbx, path)
 
 
 def move_in_sandbox(sbx: SandboxInstance, src: str, dst: str) -> None:
-    """Move/rename a file in the sandbox."""
-    content = sbx.filesystem.read(src)
-    sbx.filesystem.write(dst, content)
-    sbx.filesystem.remove(src)
+    """Move/rename a file or directory in the sandbox."""
+    sbx.filesystem.move(src, dst)
+    invalidate(sbx, src, dst)
+
+
+def copy_in_sandbox(sbx: SandboxInstance, src: str, dst: str) -> None:
+    """Copy a file or directory (recursively) in the sandbox."""
+    sbx.filesystem.copy(src, dst)
+    invalidate(sbx, dst)
@@ -0,0 +1,247 @@
+"""Ignore-aware filtering for directory transfers.
+
+Honours `.gitignore` and `.sbxignore` files (at any depth) plus a small set
+of built-in patterns for directories that never belong in a transfer.
+Patterns follow gitignore syntax: `*`, `?`, `[...]`, `**`, leading `/`
+anchors, trailing `/` for directories and `!` negation.
+
+Each ignore file is compiled once into an `IgnoreMatcher`. A matcher without
+negations answers with a single combined regex; with negations it falls back
+to last-match-wins evaluation. Walks prune ignored directories in place so
+their contents are never visited.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+IGNORE_FILES = (".gitignore", ".sbxignore")
+
+# Applied to every directory transfer unless ignoring is disabled
+DEFAULT_PATTERNS = [
+    ".git/",
+    "node_modules/",
+    ".venv/",
+    "venv/",
+    "__pycache__/",
+    ".pytest_cache/",
+    ".mypy_cache/",
+    ".ruff_cache/",
+    ".tox/",
+    ".next/",
+    ".turbo/",
+    ".DS_Store",
+]
+
+
+@dataclass
+class _Rule:
+    regex: str
+    negate: bool
+    dir_only: bool
+    literal_name: str | None = None
+
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob (without !, leading / or trailing /) to regex."""
+    out: list[str] = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern[i:i + 2] == "**":
+                at_start = i == 0 or pattern[i - 1] == "/"
+                at_end = i + 2 == n or pattern[i + 2] == "/"
+                if at_start and at_end:
+                    if i + 2 == n:
+                        out.append(".*")
+                        i += 2
+                    else:
+                        out.append("(?:.*/)?")
+                        i += 3
+                    continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = pattern.find("]", i + 2 if pattern[i + 1:i + 2] in ("!", "^") else i + 1)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                out.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def _parse_line(line: str) -> _Rule | None:
+    line = line.rstrip("\n").rstrip("\r")
+    if not line.strip() or line.startswith("#"):
+        return None
+    # Trailing spaces are ignored unless escaped
+    stripped = line.rstrip(" ")
+    if stripped.endswith("\\") and len(stripped) < len(line):
+        stripped += " "
+    line = stripped
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+    elif line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    anchored = "/" in line
+    line = line.lstrip("/")
+    body = _translate(line)
+    regex = body if anchored else f"(?:.*/)?{body}"
+    literal = None
+    if not anchored and not negate and not re.search(r"[*?\[\\]", line):
+        literal = line
+    return _Rule(regex=regex, negate=negate, dir_only=dir_only, literal_name=literal)
+
+
+class IgnoreMatcher:
+    """Compiled rules from one ignore source, relative to its directory."""
+
+    def __init__(self, lines: Iterable[str]) -> None:
+        self.rules = [r for r in (_parse_line(line) for line in lines) if r]
+        self.has_negation = any(r.negate for r in self.rules)
+        self._compiled = [(re.compile(r.regex + r"\Z"), r) for r in self.rules]
+        all_rules = "|".join(f"(?:{r.regex})" for r in self.rules)
+        file_rules = "|".join(f"(?:{r.regex})" for r in self.rules if not r.dir_only)
+        self._any_dir = re.compile(rf"(?:{all_rules})\Z") if all_rules else None
+        self._any_file = re.compile(rf"(?:{file_rules})\Z") if file_rules else None
+
+    def match(self, rel: str, is_dir: bool) -> bool | None:
+        """True if ignored, False if explicitly re-included, None if no rule applies."""
+        combined = self._any_dir if is_dir else self._any_file
+        if combined is None or not combined.match(rel):
+            return None
+        if not self.has_negation:
+            return True
+        for regex, rule in reversed(self._compiled):
+            if rule.dir_only and not is_dir:
+                continue
+            if regex.match(rel):
+                return not rule.negate
+        return None
+
+class IgnoreSpec:
+    """Ignore rules for a whole tree: built-ins plus per-directory ignore files."""
+
+    def __init__(self, default_patterns: Iterable[str] | None = None) -> None:
+        self._defaults = IgnoreMatcher(DEFAULT_PATTERNS if default_patterns is None else default_patterns)
+        self._lines: dict[str, list[str]] = {}
+        self._matchers: dict[str, IgnoreMatcher] = {}
+        self._dir_cache: dict[str, bool] = {}
+
+    def add(self, base: str, lines: Iterable[str]) -> None:
+        """Add rules read from an ignore file in directory `base` ("" = root)."""
+        base = base.strip("/")
+        merged = self._lines.setdefault(base, [])
+        merged.extend(lines)
+        matcher = IgnoreMatcher(merged)
+        if matcher.rules:
+            self._matchers[base] = matcher
+            self._dir_cache.clear()
+
+    def is_ignored(self, rel: str, is_dir: bool) -> bool:
+        """Whether this path itself is ignored (ancestors are not checked)."""
+        rel = rel.strip("/")
+        parts = rel.split("/")
+        # Deepest ignore file wins, then shallower ones, then built-ins
+        for depth in range(len(parts) - 1, -1, -1):
+            base = "/".join(parts[:depth])
+            matcher = self._matchers.get(base)
+            if matcher is None:
+                continue
+            decision = matcher.match("/".join(parts[depth:]), is_dir)
+            if decision is not None:
+                return decision
+        return bool(self._defaults.match(rel, is_dir))
+
+    def is_excluded(self, rel: str, is_dir: bool = False) -> bool:
+        """Whether a path is ignored itself or sits under an ignored directory."""
+        parts = rel.strip("/").split("/")
+        for i in range(1, len(parts)):
+            parent = "/".join(parts[:i])
+            cached = self._dir_cache.get(parent)
+            if cached is None:
+                cached = self._dir_cache[parent] = self.is_ignored(parent, True)
+            if cached:
+                return True
+        return self.is_ignored(rel, is_dir)
+
+    def prunable_dir_names(self) -> list[str]:
+        """Directory names that can be pruned anywhere in the tree."""
+        names = {r.literal_name for r in self._defaults.rules if r.literal_name and r.dir_only}
+        root = self._matchers.get("")
+        if root is not None:
+            names.update(r.literal_name for r in root.rules if r.literal_name and r.dir_only)
+        # A negation that re-includes the directory itself makes pruning unsafe
+        negations = [
+            regex
+            for m in self._matchers.values() if m.has_negation
+            for regex, rule in m._compiled if rule.negate
+        ]
+        return sorted(
+            n for n in names
+            if not any(regex.match(n) or regex.match(f"x/{n}") for regex in negations)
+        )
+
+
+def read_ignore_files(local_dir: str) -> list[str]:
+    """Concatenated ignore-file lines in one host directory."""
+    lines: list[str] = []
+    for name in IGNORE_FILES:
+        path = os.path.join(local_dir, name)
+        if os.path.isfile(path):
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    lines.extend(f.read().splitlines())
+            except OSError:
+                continue
+    return lines
+
+
+def walk_files(
+    local_dir: str,
+    spec: IgnoreSpec | None = None,
+    use_ignore: bool = True,
+) -> Iterator[tuple[str, str]]:
+    """Walk a host directory yielding (relative_posix_path, full_path) for kept files.
+
+    Ignore files are loaded as their directory is entered; ignored
+    directories are pruned before descending. Pass `spec` to collect the
+    loaded rules (e.g. to filter a remote listing the same way).
+    """
+    if spec is None:
+        spec = IgnoreSpec()
+    for root, dirs, filenames in os.walk(local_dir):
+        rel_root = os.path.relpath(root, local_dir).replace("\\", "/")
+        rel_root = "" if rel_root == "." else rel_root
+        prefix = f"{rel_root}/" if rel_root else ""
+        if use_ignore:
+            lines = read_ignore_files(root)
+            if lines:
+                spec.add(rel_root, lines)
+            dirs[:] = [d for d in dirs if not spec.is_ignored(prefix + d, True)]
+        dirs.sort()
+        for fname in sorted(filenames):
+            rel = prefix + fname
+            if use_ignore and spec.is_ignored(rel, False):
+                continue
+            yield rel, os.path.join(root, fname)
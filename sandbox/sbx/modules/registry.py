@@ -0,0 +1,266 @@
+"""Multi-sandbox state registry backed by SQLite.
+
+Replaces the single-entry `.sandbox-state.json` file. Every sandbox created
+through sbx gets a row keyed by its ID, so parallel agents (and dozens of
+concurrent CLI processes) can create, look up and kill sandboxes without
+racing on one JSON document. SQLite in WAL mode gives atomic, lock-protected
+updates and indexed lookups without re-parsing the whole state per command.
+
+`.sandbox-state.json` is still written, as a read-only pointer to the most
+recently used sandbox, for the session hooks that read it with jq. It is
+replaced atomically when sandboxes are added or removed, or when another
+sandbox becomes the most recently used one.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+_SANDBOX_DIR = Path(__file__).resolve().parent.parent.parent
+REGISTRY_FILE = _SANDBOX_DIR / ".sandbox-state.db"
+LEGACY_STATE_FILE = _SANDBOX_DIR / ".sandbox-state.json"
+
+# Marks a state file written by the registry, so it is not imported again
+_POINTER_SOURCE = "registry"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sandboxes (
+    sandbox_id  TEXT PRIMARY KEY,
+    provider    TEXT,
+    template    TEXT,
+    ports       TEXT NOT NULL DEFAULT '{}',
+    timeout     INTEGER,
+    deadline    INTEGER,
+    created_at  REAL NOT NULL,
+    last_used   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sandboxes_provider ON sandboxes(provider);
+CREATE INDEX IF NOT EXISTS idx_sandboxes_last_used ON sandboxes(last_used);
+CREATE INDEX IF NOT EXISTS idx_sandboxes_deadline ON sandboxes(deadline);
+"""
+
+_COLUMNS = ("sandbox_id", "provider", "template", "ports", "timeout", "deadline", "created_at", "last_used")
+
+_conn: sqlite3.Connection | None = None
+_conn_path: Path | None = None
+_lock = threading.Lock()
+
+
+@dataclass
+class SandboxRecord:
+    """Registry entry for one sandbox."""
+
+    sandbox_id: str
+    provider: str | None = None
+    template: str | None = None
+    ports: dict[int, int] = field(default_factory=dict)
+    timeout: int | None = None
+    deadline: int | None = None
+    created_at: float = 0.0
+    last_used: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "sandbox_id": self.sandbox_id,
+            "provider": self.provider,
+            "template": self.template,
+            "ports": {str(k): v for k, v in self.ports.items()},
+            "timeout": self.timeout,
+            "deadline": self.deadline,
+            "created_at": self.created_at,
+            "last_used": self.last_used,
+        }
+
+
+def _row_to_record(row: tuple) -> SandboxRecord:
+    data = dict(zip(_COLUMNS, row))
+    try:
+        ports = {int(k): int(v) for k, v in json.loads(data["ports"] or "{}").items()}
+    except (json.JSONDecodeError, ValueError, AttributeError):
+        ports = {}
+    data["ports"] = ports
+    return SandboxRecord(**data)
+
+
+def _connect() -> sqlite3.Connection:
+    """Open (once per process) the registry database."""
+    global _conn, _conn_path
+    if _conn is not None and _conn_path == REGISTRY_FILE:
+        return _conn
+    REGISTRY_FILE.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(
+        str(REGISTRY_FILE),
+        timeout=30,
+        isolation_level=None,
+        check_same_thread=False,
+    )
+    conn.execute("PRAGMA busy_timeout = 30000")
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+    except sqlite3.OperationalError:
+        pass  # e.g. network filesystems; default rollback journal still locks correctly
+    conn.executescript(_SCHEMA)
+    _migrate_legacy_state(conn)
+    _conn, _conn_path = conn, REGISTRY_FILE
+    return conn
+
+
+def _migrate_legacy_state(conn: sqlite3.Connection) -> None:
+    """Import the old single-sandbox JSON state file, then rewrite it as a pointer."""
+    if not LEGACY_STATE_FILE.exists():
+        return
+    try:
+        state = json.loads(LEGACY_STATE_FILE.read_text())
+    except (json.JSONDecodeError, OSError):
+        return
+    if not isinstance(state, dict) or state.get("source") == _POINTER_SOURCE:
+        return
+    sandbox_id = state.get("sandbox_id")
+    if sandbox_id:
+        now = time.time()
+        conn.execute(
+            "INSERT OR IGNORE INTO sandboxes "
+            "(sandbox_id, provider, template, timeout, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (sandbox_id, state.get("provider"), state.get("template"),
+             state.get("timeout"), now, now),
+        )
+    _write_pointer(conn)
+
+
+def _pointer_id() -> str | None:
+    """The sandbox the pointer file currently names."""
+    try:
+        return json.loads(LEGACY_STATE_FILE.read_text()).get("sandbox_id")
+    except (json.JSONDecodeError, OSError, AttributeError):
+        return None
+
+
+def _write_pointer(conn: sqlite3.Connection) -> None:
+    """Rewrite `.sandbox-state.json` from the registry (callers hold `_lock`)."""
+    rows = conn.execute(
+        f"SELECT {', '.join(_COLUMNS)} FROM sandboxes ORDER BY last_used DESC"
+    ).fetchall()
+    records = [_row_to_record(r) for r in rows]
+    latest = records[0] if records else None
+    pointer = {
+        "source": _POINTER_SOURCE,
+        "sandbox_id": latest.sandbox_id if latest else None,
+        "provider": latest.provider if latest else None,
+        "template": latest.template if latest else None,
+        "timeout": latest.timeout if latest else None,
+        "created_at": latest.created_at if latest else None,
+        "sandboxes": [r.sandbox_id for r in records],
+    }
+    tmp = LEGACY_STATE_FILE.with_name(f"{LEGACY_STATE_FILE.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_text(json.dumps(pointer, indent=2))
+        os.replace(tmp, LEGACY_STATE_FILE)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+def register_sandbox(
+    sandbox_id: str,
+    provider: str | None = None,
+    template: str | None = None,
+    ports: dict[int, int] | None = None,
+    timeout: int | None = None,
+) -> SandboxRecord:
+    """Insert or replace the registry entry for a sandbox."""
+    now = time.time()
+    record = SandboxRecord(
+        sandbox_id=sandbox_id,
+        provider=provider,
+        template=template,
+        ports=dict(ports or {}),
+        timeout=timeout,
+        deadline=int(now) + timeout if timeout else None,
+        created_at=now,
+        last_used=now,
+    )
+    with _lock:
+        conn = _connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO sandboxes "
+            "(sandbox_id, provider, template, ports, timeout, deadline, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (record.sandbox_id, record.provider, record.template,
+             json.dumps(record.to_dict()["ports"]), record.timeout,
+             record.deadline, record.created_at, record.last_used),
+        )
+        _write_pointer(conn)
+    return record
+
+
+def get_record(sandbox_id: str) -> SandboxRecord | None:
+    """Look up a sandbox by ID."""
+    with _lock:
+        row = _connect().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM sandboxes WHERE sandbox_id = ?",
+            (sandbox_id,),
+        ).fetchone()
+    return _row_to_record(row) if row else None
+
+
+def touch(sandbox_id: str) -> None:
+    """Record that a sandbox was just used.
+
+    Runs on every command, so the pointer file is only rewritten when this
+    sandbox was not already the one it names.
+    """
+    with _lock:
+        conn = _connect()
+        if conn.execute(
+            "UPDATE sandboxes SET last_used = ? WHERE sandbox_id = ?",
+            (time.time(), sandbox_id),
+        ).rowcount and _pointer_id() != sandbox_id:
+            _write_pointer(conn)
+
+
+def set_deadline(sandbox_id: str, timeout: int) -> None:
+    """Move a sandbox's deadline to `timeout` seconds from now."""
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        if conn.execute(
+            "UPDATE sandboxes SET timeout = ?, deadline = ?, last_used = ? WHERE sandbox_id = ?",
+            (timeout, int(now) + timeout, now, sandbox_id),
+        ).rowcount:
+            _write_pointer(conn)
+
+
+def remove_record(sandbox_id: str) -> None:
+    """Drop a sandbox from the registry."""
+    with _lock:
+        conn = _connect()
+        conn.execute("DELETE FROM sandboxes WHERE sandbox_id = ?", (sandbox_id,))
+        _write_pointer(conn)
+
+
+def list_records(provider: str | None = None) -> list[SandboxRecord]:
+    """All registered sandboxes, most recently used first."""
+    query = f"SELECT {', '.join(_COLUMNS)} FROM sandboxes"
+    params: tuple = ()
+    if provider:
+        query += " WHERE provider = ?"
+        params = (provider,)
+    query += " ORDER BY last_used DESC"
+    with _lock:
+        rows = _connect().execute(query, params).fetchall()
+    return [_row_to_record(r) for r in rows]
+
+
+def latest_record() -> SandboxRecord | None:
+    """The most recently used sandbox, if any."""
+    with _lock:
+        row = _connect().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM sandboxes ORDER BY last_used DESC LIMIT 1"
+        ).fetchone()
+    return _row_to_record(row) if row else None
@@ -0,0 +1,227 @@
+"""Apply edits and unified diffs inside a sandbox without transferring files.
+
+Edits are described as a spec (see `sbx.modules.edit_helper`) and applied
+by running the helper with the sandbox's `python3` in a single exec; only
+the spec and a JSON report cross the wire. All files are changed or none
+are, and every replacement/hunk gets its own result.
+
+If the sandbox has no python3, the same helper runs on the host against
+files read and written through the backend (correct, but it transfers the
+touched files).
+"""
+
+from __future__ import annotations
+
+import json
+import posixpath
+import re
+import shlex
+import uuid
+from pathlib import Path
+
+from sbx.modules import edit_helper
+from sbx.modules.content_cache import invalidate
+from sbx.provider import SandboxInstance
+
+_HELPER_SOURCE = Path(edit_helper.__file__).read_text(encoding="utf-8")
+
+# Specs larger than this are staged as a file instead of inlined in the
+# command (a single exec argument is capped at 128KB on Linux)
+_INLINE_SPEC_BYTES = 96 * 1024
+
+# Printed instead of a report when the sandbox has no python3
+_NO_PYTHON = "__SBX_NO_PYTHON3__"
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def _strip_path(path: str, strip: int) -> str:
+    path = path.split("\t", 1)[0].strip()
+    if path == "/dev/null":
+        return path
+    parts = path.split("/")
+    return "/".join(parts[strip:]) if len(parts) > strip else parts[-1]
+
+
+def parse_unified_diff(text: str, root: str = "/workspace", strip: int = 1) -> list[dict]:
+    """Parse a unified diff into per-file hunk specs.
+
+    Args:
+        text: Diff text (`diff -u` or `git diff` output; several files allowed).
+        root: Sandbox directory that relative diff paths are resolved against.
+        strip: Leading path components to remove, like `patch -p` (default 1
+            drops git's a/ and b/ prefixes).
+    """
+    files: list[dict] = []
+    current: dict | None = None
+    old_path: str | None = None
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            old_path = _strip_path(line[4:], strip)
+            new_path = _strip_path(lines[i + 1][4:], strip)
+            target = old_path if new_path == "/dev/null" else new_path
+            current = {
+                "path": posixpath.join(root, target),
+                "hunks": [],
+                "create": old_path == "/dev/null",
+                "delete": new_path == "/dev/null",
+            }
+            files.append(current)
+            i += 2
+            continue
+        match = _HUNK_HEADER.match(line)
+        if match and current is not None:
+            old_count = int(match.group(2) if match.group(2) is not None else 1)
+            new_count = int(match.group(4) if match.group(4) is not None else 1)
+            hunk = {
+                "old_start": int(match.group(1)),
+                "lines": [],
+                "old_eof_newline": None,
+                "new_eof_newline": None,
+            }
+            i += 1
+            last_tag = None
+            while i < len(lines) and (old_count > 0 or new_count > 0 or lines[i].startswith("\\")):
+                body = lines[i]
+                if body.startswith("\\"):
+                    if last_tag in (" ", "-"):
+                        hunk["old_eof_newline"] = False
+                    if last_tag in (" ", "+"):
+                        hunk["new_eof_newline"] = False
+                    i += 1
+                    continue
+                tag, content = (body[0], body[1:]) if body else (" ", "")
+                if tag not in (" ", "-", "+"):
+                    break
+                if tag in (" ", "-"):
+                    old_count -= 1
+                if tag in (" ", "+"):
+                    new_count -= 1
+                hunk["lines"].append([tag, content])
+                last_tag = tag
+                i += 1
+            current["hunks"].append(hunk)
+            continue
+        i += 1
+    return [f for f in files if f["hunks"]]
+
+
+def replacement_spec(edits: list[dict], root: str = "/workspace") -> list[dict]:
+    """Group flat {path, old_text, new_text, replace_all} edits by file."""
+    by_path: dict[str, dict] = {}
+    for edit in edits:
+        if "path" not in edit or "old_text" not in edit or "new_text" not in edit:
+            raise ValueError("Each edit needs 'path', 'old_text' and 'new_text'")
+        path = posixpath.join(root, edit["path"])
+        entry = by_path.setdefault(path, {"path": path, "edits": []})
+        entry["edits"].append({
+            "old_text": edit["old_text"],
+            "new_text": edit["new_text"],
+            "replace_all": bool(edit.get("replace_all", False)),
+        })
+    return list(by_path.values())
+
+
+def _run_remote(sbx: SandboxInstance, spec: dict) -> dict | None:
+    """Run the helper in the sandbox. Returns None if python3 is unavailable."""
+    payload = json.dumps(spec)
+    helper = f"python3 -c {shlex.quote(_HELPER_SOURCE)}"
+    if len(payload) <= _INLINE_SPEC_BYTES:
+        marker = f"SBX_EOF_{uuid.uuid4().hex}"
+        script = (
+            f"command -v python3 >/dev/null 2>&1 || {{ echo {_NO_PYTHON}; exit 0; }}\n"
+            f"{helper} <<'{marker}'\n{payload}\n{marker}\n"
+        )
+    else:
+        staged = f"/tmp/.sbx-edit-{uuid.uuid4().hex}.json"
+        sbx.filesystem.write_bytes(staged, payload.encode())
+        q_staged = shlex.quote(staged)
+        script = (
+            f"command -v python3 >/dev/null 2>&1 || {{ rm -f {q_staged}; echo {_NO_PYTHON}; exit 0; }}\n"
+            f"{helper} < {q_staged}; rc=$?; rm -f {q_staged}; exit $rc"
+        )
+    # Run as the user the filesystem API writes as (root on Docker), so the
+    # same-directory temp file and os.replace work wherever `files write` does
+    result = sbx.commands.run(script, user=getattr(sbx.filesystem, "user", "user"), timeout=120)
+    if result.stdout.strip() == _NO_PYTHON:
+        return None
+    try:
+        return json.loads(result.stdout)
+    except json.JSONDecodeError:
+        raise RuntimeError(f"Remote edit failed: {result.stderr.strip() or result.stdout.strip()}")
+
+
+def _run_on_host(sbx: SandboxInstance, spec: dict) -> dict:
+    """Fallback: apply the helper on the host, moving files through the backend."""
+    def read(path: str) -> bytes | None:
+        try:
+            return sbx.filesystem.read_bytes(path)
+        except FileNotFoundError:
+            return None
+
+    report, outputs = edit_helper.plan(spec, read)
+    if report["ok"] and not report["dry_run"]:
+        for path, data in outputs.items():
+            if data is None:
+                sbx.filesystem.remove(path)
+            else:
+                sbx.filesystem.write_bytes(path, data)
+    report["fallback"] = True
+    return report
+
+
+def apply_edits(sbx: SandboxInstance, files: list[dict], dry_run: bool = False) -> dict:
+    """Apply per-file edits/hunks atomically inside the sandbox.
+
+    Args:
+        files: File specs from `replacement_spec` or `parse_unified_diff`.
+        dry_run: Report what would apply without writing anything.
+
+    Returns:
+        A report: {"ok", "dry_run", "files": [{"path", "ok", "applied",
+        "results": [...]}]}. When "ok" is False nothing was written.
+    """
+    spec = {"dry_run": dry_run, "files": files}
+    if not files:
+        return {"ok": True, "dry_run": dry_run, "files": []}
+    report = _run_remote(sbx, spec)
+    if report is None:
+        report = _run_on_host(sbx, spec)
+    if not dry_run:
+        invalidate(sbx, *(f["path"] for f in files))
+    return report
+
+
+def describe_failures(report: dict) -> str:
+    """One-line summary of what failed in an apply_edits report."""
+    problems = []
+    for file_report in report.get("files", []):
+        if file_report.get("ok"):
+            continue
+        failed = [r for r in file_report.get("results", []) if not r["ok"]]
+        if failed:
+            kind = "hunk" if "hunk" in failed[0] else "edit"
+            numbers = ", ".join(str(r[kind]) for r in failed)
+            problems.append(f"{file_report['path']}: {kind} {numbers} ({failed[0]['error']})")
+        else:
+            problems.append(f"{file_report['path']}: {file_report.get('error', 'failed')}")
+    if report.get("error"):
+        problems.append(report["error"])
+    return "; ".join(problems) + " - nothing was written"
+
+
+def apply_patch(
+    sbx: SandboxInstance,
+    diff_text: str,
+    root: str = "/workspace",
+    strip: int = 1,
+    dry_run: bool = False,
+) -> dict:
+    """Apply a unified diff (one or many files) inside the sandbox."""
+    files = parse_unified_diff(diff_text, root=root, strip=strip)
+    if not files:
+        raise ValueError("No hunks found in patch")
+    return apply_edits(sbx, files, dry_run=dry_run)
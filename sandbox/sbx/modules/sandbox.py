@@ -1,74 +1,64 @@
 """Sandbox lifecycle helpers — create, connect, kill, state persistence.
 
 Provider-agnostic: uses the backend factory to select E2B or Docker.
+Sandbox state lives in the SQLite registry (see sbx.modules.registry).
 """
 
-import json
-from pathlib import Path
-
 import click
 
 from sbx.backends import get_backend
+from sbx.modules import registry
+from sbx.modules.content_cache import get_cache
 from sbx.provider import SandboxInstance
 
-STATE_FILE = Path(__file__).resolve().parent.parent.parent / ".sandbox-state.json"
-
-
-def load_state() -> dict:
-    """Load persisted sandbox state."""
-    if STATE_FILE.exists():
-        return json.loads(STATE_FILE.read_text())
-    return {}
-
-
-def save_state(state: dict) -> None:
-    """Persist sandbox state to disk."""
-    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    STATE_FILE.write_text(json.dumps(state, indent=2))
-
 
 def create_sandbox(
     template: str = "base",
     timeout: int = 600,
     provider: str | None = None,
 ) -> SandboxInstance:
-    """Create a new sandbox and persist its ID."""
+    """Create a new sandbox and register it."""
     backend = get_backend(provider)
     sbx = backend.create(template=template, timeout=timeout)
-    state = load_state()
-    state["sandbox_id"] = sbx.sandbox_id
-    state["template"] = template
-    state["timeout"] = timeout
-    state["provider"] = provider or _resolve_provider_from_backend(backend)
-    save_state(state)
+    registry.register_sandbox(
+        sbx.sandbox_id,
+        provider=provider or _resolve_provider_from_backend(backend),
+        template=template,
+        ports=getattr(sbx, "port_map", None),
+        timeout=timeout,
+    )
     return sbx
 
 
 def get_sandbox(sandbox_id: str, provider: str | None = None) -> SandboxInstance:
     """Connect to an existing sandbox by ID."""
-    # Auto-detect provider from saved state if not specified
-    if not provider:
-        state = load_state()
-        if state.get("sandbox_id") == sandbox_id:
-            provider = state.get("provider")
+    record = registry.get_record(sandbox_id)
+    # Auto-detect provider from the registry if not specified
+    if not provider and record:
+        provider = record.provider
     backend = get_backend(provider)
-    return backend.connect(sandbox_id)
+    sbx = backend.connect(sandbox_id)
+    if record:
+        registry.touch(sandbox_id)
+    return sbx
 
 
 def kill_sandbox(sandbox_id: str, provider: str | None = None) -> None:
-    """Kill a sandbox and clear persisted state."""
-    # Auto-detect provider from saved state if not specified
+    """Kill a sandbox and drop it from the registry."""
     if not provider:
-        state = load_state()
-        if state.get("sandbox_id") == sandbox_id:
-            provider = state.get("provider")
+        record = registry.get_record(sandbox_id)
+        if record:
+            provider = record.provider
     backend = get_backend(provider)
     backend.kill(sandbox_id)
-    state = load_state()
-    if state.get("sandbox_id") == sandbox_id:
-        state.pop("sandbox_id", None)
-        state.pop("provider", None)
-        save_state(state)
+    registry.remove_record(sandbox_id)
+    get_cache().drop_sandbox(sandbox_id)
+
+
+def extend_sandbox(sbx: SandboxInstance, timeout: int) -> None:
+    """Extend a sandbox's lifetime and record the new deadline."""
+    sbx.set_timeout(timeout)
+    registry.set_deadline(sbx.sandbox_id, timeout)
 
 
 def list_sandboxes(provider: str | None = None) -> list:
@@ -0,0 +1,229 @@
+"""Content search across sandbox files.
+
+The search runs inside the sandbox as one streaming exec, so only matching
+lines cross the wire:
+
+- ripgrep (`rg --json`) when it is installed (the Docker templates include
+  it). Respects .gitignore, skips hidden and binary files.
+- grep (`grep -rnHIZ`) otherwise, which every image has. The built-in
+  ignored directories (node_modules, .git, ...) are excluded.
+
+Matches are yielded as they arrive. Closing the iterator, or reaching
+`max_results`, stops the search process in the sandbox.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import shlex
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Iterator
+
+from sbx.modules.ignore import IgnoreSpec
+from sbx.provider import SandboxInstance
+
+# Printed after the search command so its exit status survives the stream
+_EXIT_MARK = "sbx-search-exit:"
+
+# Longer matched lines (minified bundles, ...) are cut on the host
+_MAX_LINE_CHARS = 500
+
+
+@dataclass
+class SearchMatch:
+    """One matching line, with optional context lines around it."""
+
+    path: str
+    line: int
+    text: str
+    before: list[str] = field(default_factory=list)
+    after: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _clip(text: str) -> str:
+    text = text.rstrip("\r\n")
+    if len(text) > _MAX_LINE_CHARS:
+        return text[:_MAX_LINE_CHARS] + "..."
+    return text
+
+
+def has_ripgrep(sbx: SandboxInstance) -> bool:
+    """Whether rg is available in the sandbox."""
+    # `|| true`: a missing rg must not be a failed command (E2B raises on those)
+    result = sbx.commands.run("command -v rg || true", timeout=10)
+    return bool(result.stdout.strip())
+
+
+def _rg_command(
+    pattern: str, root: str, globs: list[str], context: int, ignore_case: bool, fixed: bool, use_ignore: bool
+) -> str:
+    args = ["rg", "--json", "--no-config"]
+    if context:
+        args += ["-C", str(context)]
+    if ignore_case:
+        args.append("-i")
+    if fixed:
+        args.append("-F")
+    if not use_ignore:
+        args.append("-uu")
+    for glob in globs:
+        args += ["-g", glob]
+    args += ["-e", pattern, "--", root]
+    return " ".join(shlex.quote(a) for a in args)
+
+
+def _grep_command(
+    pattern: str, root: str, globs: list[str], context: int, ignore_case: bool, fixed: bool, use_ignore: bool
+) -> str:
+    args = ["grep", "-rnHIZ", "-F" if fixed else "-E"]
+    if context:
+        args += ["-C", str(context)]
+    if ignore_case:
+        args.append("-i")
+    if use_ignore:
+        args += [f"--exclude-dir={name}" for name in IgnoreSpec().prunable_dir_names()]
+    for glob in globs:
+        if glob.startswith("!"):
+            args.append(f"--exclude={glob[1:]}")
+        else:
+            args.append(f"--include={glob}")
+    args += ["-e", pattern, "--", root]
+    return " ".join(shlex.quote(a) for a in args)
+
+
+def _rg_text(data: dict) -> str:
+    if "text" in data:
+        return data["text"]
+    return base64.b64decode(data.get("bytes", "")).decode(errors="replace")
+
+
+class _Assembler:
+    """Attaches context lines to the match before/after them."""
+
+    def __init__(self, context: int) -> None:
+        self._context = context
+        self._path: str | None = None
+        self._pending: SearchMatch | None = None
+        self._recent: deque[tuple[int, str]] = deque(maxlen=context or 1)
+
+    def _enter(self, path: str) -> list[SearchMatch]:
+        if path == self._path:
+            return []
+        self._path = path
+        self._recent.clear()
+        return self.flush()
+
+    def match(self, path: str, line: int, text: str) -> list[SearchMatch]:
+        ready = self._enter(path) or self.flush()
+        before = [t for n, t in self._recent if line - self._context <= n < line] if self._context else []
+        self._pending = SearchMatch(path, line, _clip(text), before=before)
+        self._recent.clear()
+        return ready
+
+    def context(self, path: str, line: int, text: str) -> list[SearchMatch]:
+        ready = self._enter(path)
+        text = _clip(text)
+        if self._pending and line - self._pending.line <= self._context:
+            self._pending.after.append(text)
+        self._recent.append((line, text))
+        return ready
+
+    def flush(self) -> list[SearchMatch]:
+        ready, self._pending = self._pending, None
+        return [ready] if ready else []
+
+
+def _parse_rg(line: str, assembler: _Assembler) -> tuple[list[SearchMatch], str | None]:
+    """Matches completed by one rg --json line, or the line itself if it is a message."""
+    if not line.startswith("{"):
+        return [], line
+    record = json.loads(line)
+    kind, data = record.get("type"), record.get("data", {})
+    if kind in ("match", "context"):
+        add = assembler.match if kind == "match" else assembler.context
+        return add(_rg_text(data["path"]), data["line_number"], _rg_text(data["lines"])), None
+    if kind == "end":
+        return assembler.flush(), None
+    return [], None
+
+
+def _parse_grep(line: str, assembler: _Assembler) -> tuple[list[SearchMatch], str | None]:
+    """Matches completed by one grep -nHZ line ("path\\0NUM:text" or "path\\0NUM-text")."""
+    if line == "--":
+        return [], None
+    path, sep, rest = line.partition("\0")
+    if not sep:
+        return [], line
+    digits = len(rest) - len(rest.lstrip("0123456789"))
+    if not digits or len(rest) == digits:
+        return [], None
+    number, kind, text = int(rest[:digits]), rest[digits], rest[digits + 1:]
+    add = assembler.match if kind == ":" else assembler.context
+    return add(path, number, text), None
+
+
+def search(
+    sbx: SandboxInstance,
+    pattern: str,
+    path: str = "/workspace",
+    globs: list[str] | None = None,
+    max_results: int = 200,
+    context: int = 0,
+    ignore_case: bool = False,
+    fixed_strings: bool = False,
+    use_ignore: bool = True,
+    method: str = "auto",
+) -> Iterator[SearchMatch]:
+    """Yield matches of `pattern` in files under `path`.
+
+    Args:
+        globs: File globs to include (prefix with "!" to exclude).
+        max_results: Stop after this many matches (0 = no limit).
+        context: Lines of context before and after each match.
+        fixed_strings: Treat the pattern as a literal string.
+        use_ignore: Skip ignored files (.gitignore with rg, built-in
+            ignored directories with grep).
+        method: "rg", "grep" or "auto" (rg when available).
+
+    Raises RuntimeError if the search fails (bad pattern, missing path).
+    """
+    if method == "auto":
+        method = "rg" if has_ripgrep(sbx) else "grep"
+    if method not in ("rg", "grep"):
+        raise ValueError(f"Unknown search method: {method!r}")
+    build, parse = (_rg_command, _parse_rg) if method == "rg" else (_grep_command, _parse_grep)
+    command = build(pattern, path, globs or [], context, ignore_case, fixed_strings, use_ignore)
+    lines = sbx.commands.stream(f"{command} 2>&1; printf '\\n{_EXIT_MARK}%s\\n' $?")
+    return _collect(lines, parse, _Assembler(context), max_results)
+
+
+def _collect(lines, parse, assembler: _Assembler, max_results: int) -> Iterator[SearchMatch]:
+    count = 0
+    messages: list[str] = []
+    try:
+        for line in lines:
+            if line.startswith(_EXIT_MARK):
+                for match in assembler.flush():
+                    yield match
+                    count += 1
+                status = line[len(_EXIT_MARK):].strip()
+                if status not in ("0", "1") and not count:
+                    raise RuntimeError("Search failed: " + ("; ".join(messages[:5]) or f"exit {status}"))
+                return
+            if not line:
+                continue
+            ready, message = parse(line, assembler)
+            if message is not None:
+                messages.append(message.strip())
+            for match in ready:
+                yield match
+                count += 1
+                if max_results and count >= max_results:
+                    return
+    finally:
+        lines.close()
@@ -0,0 +1,201 @@
+"""Persistent shell sessions inside a sandbox.
+
+Every `sbx exec run` is a fresh `sh -c`, so cwd, exported variables and
+shell functions are lost between calls. A session is one long-lived bash
+that keeps them:
+
+    tail -f <dir>/in | bash
+
+running in its own process group under /tmp/.sbx/sessions/<name>. `run`
+appends the command to the queue file, framed so that the shell writes
+its stdout, stderr and exit status to files named by a per-command token,
+then waits for the status file in the same exec and prints the output
+followed by a sentinel line carrying the token and the exit status. One
+exec per command, no shell startup, and the output is parsed by the
+sentinel rather than by guessing where it ends.
+
+Commands run one at a time in queue order; a command's timeout includes
+any time spent waiting behind another one.
+"""
+
+from __future__ import annotations
+
+import re
+import shlex
+import uuid
+
+from sbx.provider import CommandResult, SandboxInstance
+
+SESSION_DIR = "/tmp/.sbx/sessions"
+
+_NAME = re.compile(r"^[A-Za-z0-9._-]+$")
+
+# Seconds to wait for a command to finish after its children were sent SIGTERM
+_KILL_GRACE = 5
+
+# SIGTERM the children of the shell whose pid is in $1 (pkill, or /proc
+# where procps is not installed)
+_KILL_CHILDREN = (
+    'pkill -TERM -P "$1" 2>/dev/null || for s in /proc/[0-9]*/stat; do '
+    '[ "$(cut -d" " -f4 "$s" 2>/dev/null)" = "$1" ] && kill -TERM "$(cut -d" " -f1 "$s")" 2>/dev/null; done'
+)
+
+# Statuses the wait script reports instead of an exit code
+_TIMEOUT = "timeout"
+_BUSY = "busy"
+_DEAD = "dead"
+
+
+def _dir(name: str) -> str:
+    if not _NAME.match(name):
+        raise ValueError(f"Invalid session name: {name!r} (use letters, digits, '.', '_', '-')")
+    return f"{SESSION_DIR}/{name}"
+
+
+def _alive(d: str) -> str:
+    """Shell test: the session's bash is running."""
+    return f'{{ [ -s {d}/shell_pid ] && kill -0 "$(cat {d}/shell_pid)" 2>/dev/null; }}'
+
+
+def open_session(
+    sbx: SandboxInstance,
+    name: str | None = None,
+    cwd: str = "/workspace",
+    env_vars: dict | None = None,
+    user: str = "user",
+    login: bool = False,
+) -> dict:
+    """Start a persistent bash session in the sandbox.
+
+    `login` sources /etc/profile and ~/.profile once, at open. Returns
+    {"name", "cwd", "pid"}; raises RuntimeError if the name is taken or
+    the shell does not come up.
+    """
+    name = name or "s-" + uuid.uuid4().hex[:6]
+    d = _dir(name)
+    check = sbx.commands.run(
+        f"if {_alive(d)}; then echo 'Session {name} is already open' >&2; exit 2; fi; "
+        # /tmp/.sbx is shared with features that run as the exec user
+        # (checkpoints, the browser server): create it sticky, world-writable
+        f"install -d -m 1777 /tmp/.sbx && rm -rf {d} && mkdir -p {d} && chmod 777 {d}",
+        user="root",
+        timeout=15,
+    )
+    if check.exit_code != 0:
+        raise RuntimeError(check.stderr.strip() or f"Cannot create session {name}")
+    setup = [f"echo $$ > {d}/shell_pid.tmp && mv {d}/shell_pid.tmp {d}/shell_pid", f"pwd > {d}/cwd"]
+    if login:
+        setup.insert(0, ". /etc/profile >/dev/null 2>&1; . ~/.profile >/dev/null 2>&1")
+    launch = (
+        f"printf '%s\\n' {' '.join(shlex.quote(line) for line in setup)} > {d}/in && "
+        f"exec setsid sh -c 'echo $$ > {d}/pgid; tail -n +1 -f {d}/in | bash --noprofile --norc > {d}/log 2>&1'"
+    )
+    sbx.commands.run(launch, cwd=cwd, envs=env_vars or {}, user=user, background=True)
+    wait = (
+        f"i=0; while [ $i -lt 100 ]; do [ -s {d}/shell_pid ] && cat {d}/shell_pid && exit 0; "
+        f"i=$((i+1)); sleep 0.1; done; cat {d}/log >&2; exit 1"
+    )
+    result = sbx.commands.run(wait, user="root", timeout=20)
+    if result.exit_code != 0:
+        close_session(sbx, name)
+        raise RuntimeError(f"Session {name} did not start: {result.stderr.strip() or 'no output'}")
+    return {"name": name, "cwd": cwd, "pid": int(result.stdout.strip() or 0)}
+
+
+def _run_script(d: str, command: str, token: str, timeout: int) -> str:
+    out, err, rc = (f"{d}/{token}.{ext}" for ext in ("out", "err", "rc"))
+    marker = f"SBX_EOF_{token}"
+    # Runs in the session shell: { } keeps cd/export/functions in that shell,
+    # </dev/null keeps the command from reading the queue
+    block = (
+        f"{{ {command}\n}} < /dev/null > {out} 2> {err}; "
+        f"echo $? > {rc}.tmp; pwd > {d}/cwd; mv {rc}.tmp {rc}"
+    )
+    sentinel = f"__SBX_SESSION_{token}__"
+    return (
+        f"{_alive(d)} || {{ printf '\\n{sentinel} {_DEAD}\\n'; exit 0; }}\n"
+        # A syntax error would swallow the commands queued after it
+        f"bash -n <<'{marker}' || exit 2\n{command}\n{marker}\n"
+        f"cat >> {d}/in <<'{marker}'\n{block}\n{marker}\n"
+        f"status=''; end=$(( $(date +%s) + {int(timeout)} ))\n"
+        f"while [ ! -f {rc} ]; do\n"
+        f"  if ! {_alive(d)}; then status={_DEAD}; break; fi\n"
+        f"  if [ \"$(date +%s)\" -ge \"$end\" ]; then\n"
+        f"    if [ -n \"$status\" ]; then status={_BUSY}; break; fi\n"
+        f"    status={_TIMEOUT}; end=$(( end + {_KILL_GRACE} ))\n"
+        f"    sh -c {shlex.quote(_KILL_CHILDREN)} sh \"$(cat {d}/shell_pid)\"\n"
+        f"  fi\n"
+        f"  sleep 0.05\n"
+        f"done\n"
+        f"[ -f {rc} ] && [ -z \"$status\" ] && status=$(cat {rc})\n"
+        f"[ -f {out} ] && cat {out}; [ -f {err} ] && cat {err} >&2\n"
+        f"printf '\\n{sentinel} %s\\n' \"$status\"\n"
+        f"[ \"$status\" = {_BUSY} ] || rm -f {out} {err} {rc}\n"
+    )
+
+
+def run_in_session(sbx: SandboxInstance, name: str, command: str, timeout: int = 60) -> CommandResult:
+    """Run a command in an open session and return its output and exit code.
+
+    The command runs in the session's current directory and environment,
+    and whatever it changes (cd, export, functions, aliases) stays for the
+    next one. On timeout its child processes are terminated and the exit
+    code is 124. Raises RuntimeError if the session is not running.
+    """
+    d = _dir(name)
+    token = uuid.uuid4().hex
+    result = sbx.commands.run(_run_script(d, command, token, timeout), user="root", timeout=timeout + _KILL_GRACE + 15)
+    sentinel = f"\n__SBX_SESSION_{token}__ "
+    stdout, sep, trailer = result.stdout.rpartition(sentinel)
+    if not sep:
+        if result.exit_code == 2:
+            return CommandResult(stdout="", stderr=result.stderr, exit_code=2)
+        raise RuntimeError(f"Session {name} failed: {result.stderr.strip() or result.stdout.strip()[:200]}")
+    status = trailer.strip()
+    stderr = result.stderr
+    if status == _DEAD:
+        raise RuntimeError(f"Session {name} is not running (closed, or a command called exit)")
+    if status == _TIMEOUT:
+        stderr += f"\nsbx: command timed out after {timeout}s and was interrupted\n"
+        return CommandResult(stdout=stdout, stderr=stderr, exit_code=124)
+    if status == _BUSY:
+        stderr += f"\nsbx: command timed out after {timeout}s and is still running; close the session to stop it\n"
+        return CommandResult(stdout=stdout, stderr=stderr, exit_code=124)
+    return CommandResult(stdout=stdout, stderr=stderr, exit_code=int(status))
+
+
+def close_session(sbx: SandboxInstance, name: str) -> bool:
+    """Stop a session and everything running in it; False if it was not open."""
+    d = _dir(name)
+    result = sbx.commands.run(
+        f"[ -d {d} ] || exit 3; "
+        f"if [ -s {d}/pgid ]; then pgid=$(cat {d}/pgid); kill -TERM -\"$pgid\" 2>/dev/null || kill -TERM \"$pgid\" 2>/dev/null; fi; "
+        f"rm -rf {d}",
+        user="root",
+        timeout=15,
+    )
+    return result.exit_code == 0
+
+
+def list_sessions(sbx: SandboxInstance) -> list[dict]:
+    """Sessions in the sandbox: [{"name", "alive", "cwd", "opened_at"}]."""
+    result = sbx.commands.run(
+        f"for d in {SESSION_DIR}/*/; do [ -d \"$d\" ] || continue; d=${{d%/}}; "
+        f"if [ -s \"$d/shell_pid\" ] && kill -0 \"$(cat \"$d/shell_pid\")\" 2>/dev/null; then a=1; else a=0; fi; "
+        f"printf '%s\\t%s\\t%s\\t%s\\n' \"${{d##*/}}\" \"$a\" \"$(stat -c %Y \"$d/pgid\" 2>/dev/null)\" \"$(cat \"$d/cwd\" 2>/dev/null)\"; "
+        f"done; true",
+        user="root",
+        timeout=15,
+    )
+    sessions = []
+    for line in result.stdout.splitlines():
+        parts = line.split("\t", 3)
+        if len(parts) == 4:
+            name, alive, opened, cwd = parts
+            sessions.append({
+                "name": name,
+                "alive": alive == "1",
+                "cwd": cwd,
+                "opened_at": int(opened) if opened.isdigit() else None,
+            })
+    return sessions
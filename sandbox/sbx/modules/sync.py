@@ -0,0 +1,300 @@
+"""Incremental workspace sync based on content manifests.
+
+A sync compares a host manifest (path, size, mtime, sha256) with the
+sandbox's manifest (path, size, mtime — fetched with a single `find`) and
+then transfers only what differs:
+
+1. Files missing remotely or with a different size are sent.
+2. Files with the same size but a different mtime are verified remotely
+   against the host hash in one exec; matches only get their mtime fixed.
+3. All files to send go in one tar archive (compressed on the wire),
+   extracted in one exec that also deletes files that no longer exist on
+   the host.
+
+Extracted files keep the host mtime, so an unchanged tree needs no transfer
+on the next sync. Host hashes come from the persistent file index, so only
+files whose stat changed since the last scan are re-read.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import shlex
+import tarfile
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from sbx.modules.content_cache import invalidate
+from sbx.modules.file_index import ManifestEntry, get_index
+from sbx.modules.ignore import IgnoreSpec, walk_files
+from sbx.provider import SandboxInstance
+
+
+@dataclass
+class SyncPlan:
+    """Files to add, change and delete to make the sandbox match the host."""
+
+    added: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    deleted: list[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def to_send(self) -> list[str]:
+        return self.added + self.changed
+
+
+@dataclass
+class SyncResult:
+    """Outcome of a sync run."""
+
+    added: int = 0
+    changed: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    bytes_sent: int = 0
+    bytes_raw: int = 0
+    seconds: float = 0.0
+    dry_run: bool = False
+    plan: SyncPlan | None = None
+
+    def to_dict(self) -> dict:
+        data = {
+            "added": self.added,
+            "changed": self.changed,
+            "deleted": self.deleted,
+            "unchanged": self.unchanged,
+            "bytes_sent": self.bytes_sent,
+            "bytes_raw": self.bytes_raw,
+            "seconds": round(self.seconds, 3),
+            "throughput_mb_s": round(self.bytes_raw / (self.seconds or 1e-9) / 1_000_000, 2),
+            "dry_run": self.dry_run,
+        }
+        if self.plan is not None:
+            data["files"] = {
+                "added": self.plan.added,
+                "changed": self.plan.changed,
+                "deleted": self.plan.deleted,
+            }
+        return data
+
+
+def _fs_user(sbx: SandboxInstance) -> str:
+    """The user the sandbox's filesystem API writes as.
+
+    Sync execs run as this user so the files they replace, delete or touch
+    have the same owner as ones written through `files write`.
+    """
+    return getattr(sbx.filesystem, "user", "user")
+
+
+def local_manifest(
+    local_dir: str,
+    spec: IgnoreSpec | None = None,
+    use_ignore: bool = True,
+) -> dict[str, ManifestEntry]:
+    """Build the host manifest, reusing cached hashes from the file index."""
+    files = list(walk_files(local_dir, spec, use_ignore=use_ignore))
+    return get_index().scan(local_dir, files=files)
+
+
+def remote_manifest(
+    sbx: SandboxInstance,
+    remote_dir: str,
+    prune: list[str] | None = None,
+) -> dict[str, ManifestEntry]:
+    """Fetch the sandbox-side manifest for a directory in a single exec.
+
+    Directories named in `prune` are skipped by `find` itself, so large
+    ignored trees (node_modules, .venv) never cross the wire.
+    """
+    q = shlex.quote(remote_dir)
+    prune_expr = ""
+    if prune:
+        names = " -o ".join(f"-name {shlex.quote(n)}" for n in prune)
+        prune_expr = f"-mindepth 1 -type d \\( {names} \\) -prune -o "
+    result = sbx.commands.run(
+        f"[ -d {q} ] || exit 0; cd {q} && find . {prune_expr}-type f -printf '%s %T@ %P\\0'",
+        user=_fs_user(sbx),
+        timeout=120,
+    )
+    if result.exit_code != 0:
+        raise RuntimeError(f"Cannot list {remote_dir} in sandbox: {result.stderr.strip()}")
+    manifest: dict[str, ManifestEntry] = {}
+    for record in result.stdout.split("\0"):
+        if not record:
+            continue
+        size, mtime, path = record.split(" ", 2)
+        manifest[path] = ManifestEntry(path, int(size), int(float(mtime)))
+    return manifest
+
+
+def plan_sync(
+    local: dict[str, ManifestEntry],
+    remote: dict[str, ManifestEntry],
+    delete: bool = True,
+) -> tuple[SyncPlan, list[ManifestEntry]]:
+    """Diff two manifests.
+
+    Returns the plan plus entries whose content is ambiguous (same size,
+    different mtime) and must be verified by hash in the sandbox.
+    """
+    plan = SyncPlan()
+    ambiguous: list[ManifestEntry] = []
+    for path, entry in local.items():
+        other = remote.get(path)
+        if other is None:
+            plan.added.append(path)
+        elif other.size != entry.size:
+            plan.changed.append(path)
+        elif other.mtime != entry.mtime:
+            ambiguous.append(entry)
+        else:
+            plan.unchanged += 1
+    if delete:
+        plan.deleted = [p for p in remote if p not in local]
+    return plan, ambiguous
+
+
+def _verify_remote(
+    sbx: SandboxInstance, remote_dir: str, entries: list[ManifestEntry]
+) -> list[str]:
+    """Hash-check ambiguous files in the sandbox; return those that differ.
+
+    Files whose content matches get the host mtime so later syncs skip them.
+    """
+    checkable = [e for e in entries if "\n" not in e.path and e.hash]
+    mismatched = [e.path for e in entries if "\n" in e.path or not e.hash]
+    if not checkable:
+        return mismatched
+    listing = "\n".join(f"{e.hash} {e.mtime} {e.path}" for e in checkable)
+    marker = f"SBX_EOF_{uuid.uuid4().hex}"
+    script = (
+        f"cd {shlex.quote(remote_dir)} && while IFS= read -r line; do "
+        'h=${line%% *}; rest=${line#* }; m=${rest%% *}; p=${rest#* }; '
+        'if [ "$(sha256sum -- "$p" 2>/dev/null | cut -d" " -f1)" = "$h" ]; '
+        'then touch -m -d "@$m" -- "$p"; else printf "%s\\0" "$p"; fi; '
+        f"done <<'{marker}'\n{listing}\n{marker}\n"
+    )
+    result = sbx.commands.run(script, user=_fs_user(sbx), timeout=300)
+    if result.exit_code != 0:
+        return mismatched + [e.path for e in checkable]
+    return mismatched + [p for p in result.stdout.split("\0") if p]
+
+
+def build_archive(
+    local_dir: str,
+    paths: list[str],
+    extra: dict[str, bytes] | None = None,
+) -> bytes:
+    """Pack host files (relative to local_dir) into an in-memory tar.
+
+    The archive is left uncompressed: the backend compresses it on the wire
+    with whatever method the sandbox supports (see sbx.compression).
+    """
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        for rel in paths:
+            full = os.path.join(local_dir, rel)
+            info = tar.gettarinfo(full, arcname=rel)
+            info.mtime = int(info.mtime)
+            info.uid = info.gid = 0
+            info.uname = info.gname = ""
+            with open(full, "rb") as f:
+                tar.addfile(info, f)
+        for name, data in (extra or {}).items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def push_files(
+    sbx: SandboxInstance,
+    local_dir: str,
+    paths: list[str],
+    remote_dir: str,
+    deletions: list[str] | None = None,
+) -> int:
+    """Send host files as one archive and extract it (plus apply deletions) in one exec.
+
+    Deletions travel inside the archive as a NUL-separated list so large
+    delete sets don't hit the command-line length limit. Returns the bytes
+    that crossed the wire (after compression).
+    """
+    token = uuid.uuid4().hex
+    listing = f".sbx-sync-delete-{token}"
+    extra = {listing: "\0".join(deletions).encode() + b"\0"} if deletions else None
+    archive = build_archive(local_dir, paths, extra)
+
+    remote_archive = f"/tmp/sbx-sync-{token}.tar"
+    stats = getattr(sbx.filesystem, "stats", None)
+    wire_before = stats.wire_bytes if stats else 0
+    sbx.filesystem.write_bytes(remote_archive, archive)
+    wire = stats.wire_bytes - wire_before if stats else len(archive)
+    q_dir, q_archive = shlex.quote(remote_dir), shlex.quote(remote_archive)
+    script = f"mkdir -p {q_dir} && tar -xf {q_archive} -C {q_dir} --no-same-owner"
+    if deletions:
+        q_listing = shlex.quote(listing)
+        script += (
+            f" && cd {q_dir} && xargs -0 rm -f -- < {q_listing}; "
+            f"rc=$?; rm -f {q_listing}; [ $rc -eq 0 ]"
+        )
+    script = f"{script}; rc=$?; rm -f {q_archive}; exit $rc"
+    result = sbx.commands.run(script, user=_fs_user(sbx), timeout=600)
+    if result.exit_code != 0:
+        raise RuntimeError(f"Sync failed in sandbox: {result.stderr.strip()}")
+    return wire
+
+
+def sync_dir(
+    sbx: SandboxInstance,
+    local_dir: str,
+    remote_dir: str,
+    delete: bool = True,
+    dry_run: bool = False,
+    use_ignore: bool = True,
+) -> SyncResult:
+    """Make remote_dir match local_dir, transferring only what changed.
+
+    Ignored paths (see sbx.modules.ignore) are neither sent nor deleted, so
+    e.g. a node_modules installed inside the sandbox survives a sync.
+    """
+    started = time.monotonic()
+    if not os.path.isdir(local_dir):
+        raise FileNotFoundError(f"Local directory not found: {local_dir}")
+    remote_dir = remote_dir.rstrip("/") or "/"
+
+    spec = IgnoreSpec()
+    local = local_manifest(local_dir, spec, use_ignore=use_ignore)
+    if use_ignore:
+        remote = remote_manifest(sbx, remote_dir, prune=spec.prunable_dir_names())
+        remote = {p: e for p, e in remote.items() if not spec.is_excluded(p)}
+    else:
+        remote = remote_manifest(sbx, remote_dir)
+    plan, ambiguous = plan_sync(local, remote, delete=delete)
+
+    if ambiguous and not dry_run:
+        differing = set(_verify_remote(sbx, remote_dir, ambiguous))
+        plan.changed.extend(e.path for e in ambiguous if e.path in differing)
+        plan.unchanged += len(ambiguous) - len(differing)
+    else:
+        plan.changed.extend(e.path for e in ambiguous)
+
+    result = SyncResult(
+        added=len(plan.added),
+        changed=len(plan.changed),
+        deleted=len(plan.deleted),
+        unchanged=plan.unchanged,
+        dry_run=dry_run,
+        plan=plan,
+    )
+    if not dry_run and (plan.to_send or plan.deleted):
+        result.bytes_sent = push_files(sbx, local_dir, plan.to_send, remote_dir, plan.deleted)
+        invalidate(sbx, remote_dir)
+        result.bytes_raw = sum(local[p].size for p in plan.to_send)
+    result.seconds = time.monotonic() - started
+    return result
@@ -0,0 +1,249 @@
+"""Watch a sandbox directory for created, modified and deleted files.
+
+Two event sources:
+
+- inotify: a single streaming `inotifywait -m -r` exec (needs inotify-tools
+  in the sandbox; the Docker templates include it). Ignored directories
+  such as node_modules are excluded from the watch itself.
+- poll: a manifest (`find -printf`, one exec) fetched every few seconds and
+  diffed on the host. Reports files only.
+
+Raw events are debounced and coalesced before they are yielded: events
+are collected until the tree has been quiet for `debounce` seconds (or
+`max_delay` has passed), repeated events on a path collapse into one
+(create + modify = create, create + delete = nothing, ...) and everything
+under a newly created or deleted directory is folded into that
+directory's event, so an `npm install` shows up as a handful of events.
+"""
+
+from __future__ import annotations
+
+import queue
+import re
+import shlex
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Iterator
+
+from sbx.modules.ignore import IGNORE_FILES, IgnoreSpec
+from sbx.modules.sync import remote_manifest
+from sbx.provider import SandboxInstance
+
+CREATED = "created"
+MODIFIED = "modified"
+DELETED = "deleted"
+
+_INOTIFY_KINDS = {
+    "CREATE": CREATED,
+    "MOVED_TO": CREATED,
+    "CLOSE_WRITE": MODIFIED,
+    "DELETE": DELETED,
+    "MOVED_FROM": DELETED,
+}
+
+_DONE = object()
+
+
+@dataclass
+class WatchEvent:
+    """One coalesced change, with a path relative to the watched directory."""
+
+    kind: str
+    path: str
+    is_dir: bool = False
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class _Coalescer:
+    """Merges raw events per path until drained."""
+
+    def __init__(self) -> None:
+        self._events: dict[str, WatchEvent] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._events)
+
+    def add(self, kind: str, path: str, is_dir: bool) -> None:
+        prior = self._events.get(path)
+        if prior is None:
+            self._events[path] = WatchEvent(kind, path, is_dir)
+        elif prior.kind == CREATED and kind == DELETED:
+            del self._events[path]
+        elif prior.kind == DELETED and kind == CREATED:
+            self._events[path] = WatchEvent(MODIFIED, path, is_dir)
+        elif prior.kind == CREATED:
+            prior.is_dir = prior.is_dir or is_dir
+        else:
+            self._events[path] = WatchEvent(kind, path, is_dir)
+
+    def drain(self) -> list[WatchEvent]:
+        """Coalesced events, with changes inside new/deleted directories folded in."""
+        folded: list[WatchEvent] = []
+        covering: list[WatchEvent] = []
+        for path in sorted(self._events):
+            event = self._events[path]
+            while covering and not path.startswith(covering[-1].path + "/"):
+                covering.pop()
+            if covering:
+                continue
+            folded.append(event)
+            if event.is_dir and event.kind in (CREATED, DELETED):
+                covering.append(event)
+        self._events.clear()
+        return folded
+
+
+def _load_spec(sbx: SandboxInstance, root: str) -> IgnoreSpec:
+    """Built-in ignores plus the watched directory's own ignore files."""
+    spec = IgnoreSpec()
+    for name in IGNORE_FILES:
+        try:
+            spec.add("", sbx.filesystem.read(f"{root}/{name}").splitlines())
+        except (FileNotFoundError, RuntimeError):
+            continue
+    return spec
+
+
+def has_inotify(sbx: SandboxInstance) -> bool:
+    """Whether inotifywait is available in the sandbox."""
+    # `|| true`: a missing inotifywait must not be a failed command (E2B raises on those)
+    result = sbx.commands.run("command -v inotifywait || true", timeout=10)
+    return bool(result.stdout.strip())
+
+
+def _inotify_source(
+    sbx: SandboxInstance, root: str, prune: list[str], stop: threading.Event
+) -> Iterator[tuple[str, str, bool]]:
+    exclude = ""
+    if prune:
+        names = "|".join(re.escape(n) for n in prune)
+        exclude = f"--exclude {shlex.quote(f'(^|/)({names})(/|$)')} "
+    # The heartbeat lets the reader notice a stop request while the tree is idle
+    command = (
+        f"inotifywait -m -r -q -e create,close_write,delete,moved_to,moved_from "
+        f"{exclude}--format '%e|%w%f' {shlex.quote(root)} & w=$!; "
+        f"while kill -0 $w 2>/dev/null && sleep 1; do echo; done"
+    )
+    prefix = root.rstrip("/") + "/"
+    lines = sbx.commands.stream(command)
+    try:
+        for line in lines:
+            if stop.is_set():
+                return
+            flags, sep, full = line.partition("|")
+            if not sep or not full.startswith(prefix):
+                continue
+            flags = flags.split(",")
+            kind = next((_INOTIFY_KINDS[f] for f in flags if f in _INOTIFY_KINDS), None)
+            if kind:
+                yield kind, full[len(prefix):], "ISDIR" in flags
+    finally:
+        lines.close()
+
+
+def _poll_source(
+    sbx: SandboxInstance,
+    root: str,
+    prune: list[str],
+    interval: float,
+    stop: threading.Event,
+) -> Iterator[tuple[str, str, bool]]:
+    previous = {p: (e.size, e.mtime) for p, e in remote_manifest(sbx, root, prune).items()}
+    while not stop.wait(interval):
+        current = {p: (e.size, e.mtime) for p, e in remote_manifest(sbx, root, prune).items()}
+        for path, sig in current.items():
+            old = previous.get(path)
+            if old is None:
+                yield CREATED, path, False
+            elif old != sig:
+                yield MODIFIED, path, False
+        for path in previous.keys() - current.keys():
+            yield DELETED, path, False
+        previous = current
+
+
+def watch(
+    sbx: SandboxInstance,
+    path: str = "/workspace",
+    debounce: float = 0.5,
+    max_delay: float = 5.0,
+    method: str = "auto",
+    poll_interval: float = 2.0,
+    use_ignore: bool = True,
+    timeout: float | None = None,
+) -> Iterator[list[WatchEvent]]:
+    """Yield batches of coalesced change events under `path`.
+
+    Args:
+        debounce: Quiet period (seconds) that ends a batch.
+        max_delay: Longest time a batch is held back during continuous activity.
+        method: "inotify", "poll" or "auto" (inotify when available).
+        poll_interval: Seconds between manifests in poll mode.
+        use_ignore: Skip paths matched by the built-in ignores and the
+            directory's .gitignore/.sbxignore.
+        timeout: Stop after this many seconds (None = until closed).
+
+    Closing the iterator stops the watcher in the sandbox.
+    """
+    root = path.rstrip("/") or "/"
+    if not sbx.filesystem.exists(root):
+        raise FileNotFoundError(f"No such directory in sandbox: {root}")
+    spec = _load_spec(sbx, root) if use_ignore else None
+    prune = spec.prunable_dir_names() if spec else []
+    if method == "auto":
+        method = "inotify" if has_inotify(sbx) else "poll"
+    if method not in ("inotify", "poll"):
+        raise ValueError(f"Unknown watch method: {method!r}")
+
+    stop = threading.Event()
+    raw: queue.Queue = queue.Queue()
+
+    def pump() -> None:
+        try:
+            if method == "inotify":
+                source = _inotify_source(sbx, root, prune, stop)
+            else:
+                source = _poll_source(sbx, root, prune, poll_interval, stop)
+            for item in source:
+                if stop.is_set():
+                    break
+                raw.put(item)
+        finally:
+            raw.put(_DONE)
+
+    threading.Thread(target=pump, name="sbx-watch", daemon=True).start()
+    deadline = time.monotonic() + timeout if timeout else None
+    pending = _Coalescer()
+    first_at = last_at = 0.0
+    try:
+        while True:
+            now = time.monotonic()
+            waits = []
+            if pending:
+                waits.append(min(last_at + debounce, first_at + max_delay) - now)
+            if deadline is not None:
+                waits.append(deadline - now)
+            try:
+                item = raw.get(timeout=max(0.0, min(waits)) if waits else None)
+            except queue.Empty:
+                if pending:
+                    yield pending.drain()
+                if deadline is not None and time.monotonic() >= deadline:
+                    return
+                continue
+            if item is _DONE:
+                if pending:
+                    yield pending.drain()
+                return
+            kind, rel, is_dir = item
+            if spec is not None and spec.is_excluded(rel, is_dir):
+                continue
+            if not pending:
+                first_at = time.monotonic()
+            last_at = time.monotonic()
+            pending.add(kind, rel, is_dir)
+    finally:
+        stop.set()
@@ -0,0 +1,157 @@
+"""Bounded command output.
+
+A command that prints gigabytes would otherwise be held in host memory
+in full, once as bytes and again as decoded text. With a cap, each stream
+keeps only its first and last `cap // 2` bytes:
+
+- spill (default): the command writes its streams to files under
+  /tmp/.sbx-output/<token> in the sandbox; only the head and tail of a
+  stream over the cap cross the wire, and the files are kept so the full
+  output can be read later (`sbx files read --tail`, ...). Streams within
+  the cap are returned whole and the files removed. The spill directory
+  is sticky and world-writable, outside /tmp/.sbx (which root-side
+  commands may create 755), so every exec user can spill; if it still
+  cannot be created the command runs unwrapped.
+- no spill: the host reads the streams into CappedBuffer ring buffers and
+  the overflow is dropped. (E2B's SDK buffers whole streams, so there the
+  cap is still applied in the sandbox and the files dropped afterwards.)
+
+Set SBX_MAX_OUTPUT_MB to change the default cap (0 = no cap).
+"""
+
+from __future__ import annotations
+
+import os
+import shlex
+import uuid
+from collections import deque
+
+from sbx.provider import CommandResult
+
+SPILL_DIR = "/tmp/.sbx-output"
+
+DEFAULT_MAX_OUTPUT_MB = 16
+
+# Spill directories older than this (minutes) are removed by later commands
+_SPILL_TTL_MINUTES = 120
+
+_TRAILER = "__SBX_OUTPUT_{}__ "
+
+# Room for the trailer line on top of a capped stream
+TRAILER_BYTES = 256
+
+
+def max_output_bytes() -> int | None:
+    """Per-stream output cap from SBX_MAX_OUTPUT_MB, or None for no cap.
+
+    An unparsable value falls back to the default cap.
+    """
+    try:
+        value = float(os.environ.get("SBX_MAX_OUTPUT_MB", DEFAULT_MAX_OUTPUT_MB))
+        return int(value * 1024 * 1024) if value > 0 else None
+    except (ValueError, OverflowError):
+        return DEFAULT_MAX_OUTPUT_MB * 1024 * 1024
+
+
+class CappedBuffer:
+    """Keeps the first and last `limit // 2` bytes written and counts the rest."""
+
+    __slots__ = ("_half", "_head", "_tail", "_tail_size", "size")
+
+    def __init__(self, limit: int) -> None:
+        self._half = max(limit // 2, 1)
+        self._head = bytearray()
+        self._tail: deque[bytes] = deque()
+        self._tail_size = 0
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        room = self._half - len(self._head)
+        if room > 0:
+            self._head += chunk[:room]
+            chunk = chunk[room:]
+        if not chunk:
+            return
+        self._tail.append(chunk)
+        self._tail_size += len(chunk)
+        while self._tail_size - len(self._tail[0]) >= self._half:
+            self._tail_size -= len(self._tail.popleft())
+
+    @property
+    def truncated(self) -> bool:
+        return self.size > 2 * self._half
+
+    def value(self, spill_path: str | None = None) -> bytes:
+        """The kept bytes, with a marker where the middle was dropped."""
+        tail = b"".join(self._tail)
+        if not self.truncated:
+            return bytes(self._head) + tail
+        return join_truncated(bytes(self._head), tail[-self._half:], self.size, spill_path)
+
+
+def join_truncated(head: bytes, tail: bytes, size: int, spill_path: str | None = None) -> bytes:
+    omitted = size - len(head) - len(tail)
+    where = f", full output in {spill_path}" if spill_path else ""
+    return head + f"\n... [{omitted} bytes truncated{where}] ...\n".encode() + tail
+
+
+def spill_command(command: str, limit: int, keep: bool = True, shell: str = "sh") -> tuple[str, str]:
+    """Wrap a command so its output spills to files in the sandbox.
+
+    Returns (script, token). The script prints each stream whole if it is
+    within `limit`, else its first and last `limit // 2` bytes, then a
+    trailer line on stderr with both sizes and the spill directory (empty
+    when nothing was truncated, or always without `keep`); its exit status
+    is the command's. If the spill directory cannot be created, the
+    command runs unwrapped and there is no trailer.
+    """
+    token = uuid.uuid4().hex
+    d = f"{SPILL_DIR}/{token}"
+    half = max(limit // 2, 1)
+    within = f'[ "$so" -le {limit} ] && [ "$se" -le {limit} ]' if keep else "true"
+    emit = (
+        'if [ "$n" -le {limit} ]; then cat "$f"; '
+        'else head -c {half} "$f"; tail -c {half} "$f"; fi'
+    ).format(limit=limit, half=half)
+    script = (
+        f"find {SPILL_DIR} -mindepth 1 -maxdepth 1 -mmin +{_SPILL_TTL_MINUTES} -exec rm -rf {{}} + 2>/dev/null; "
+        f"mkdir -p -m 1777 {SPILL_DIR} 2>/dev/null; "
+        f"mkdir {d} 2>/dev/null || exec {shell} -c {shlex.quote(command)}; "
+        f"{shell} -c {shlex.quote(command)} > {d}/stdout 2> {d}/stderr; rc=$?; "
+        f'so=$(wc -c < {d}/stdout); se=$(wc -c < {d}/stderr); '
+        f"f={d}/stdout; n=$so; {emit}; "
+        f"f={d}/stderr; n=$se; {{ {emit}; }} >&2; "
+        f"if {within}; then rm -rf {d}; keep=; else keep={d}; fi; "
+        f"printf '\\n{_TRAILER.format(token)}%s %s %s\\n' \"$so\" \"$se\" \"$keep\" >&2; "
+        f"exit $rc"
+    )
+    return script, token
+
+
+def parse_spilled(stdout: bytes, stderr: bytes, exit_code: int, token: str, limit: int) -> CommandResult | None:
+    """Build the result of a spill_command run from its raw output.
+
+    None if there is no trailer: the command ran unwrapped, or the wrapper
+    was killed, and the output is whatever the command printed.
+    """
+    body, sep, trailer = stderr.rpartition(b"\n" + _TRAILER.format(token).encode())
+    if not sep:
+        return None
+    so, se, keep = (trailer.decode().rstrip("\n").split(" ", 2) + ["", ""])[:3]
+    stdout_size, stderr_size = int(so or 0), int(se or 0)
+    spill_path = keep or None
+    half = max(limit // 2, 1)
+    if stdout_size > limit:
+        stdout = join_truncated(stdout[:half], stdout[half:], stdout_size, spill_path and f"{spill_path}/stdout")
+    if stderr_size > limit:
+        body = join_truncated(body[:half], body[half:], stderr_size, spill_path and f"{spill_path}/stderr")
+    return CommandResult(
+        stdout=stdout,
+        stderr=body,
+        exit_code=exit_code,
+        truncated=stdout_size > limit or stderr_size > limit,
+        stdout_size=stdout_size,
+        stderr_size=stderr_size,
+        spill_path=spill_path,
+    )
@@ -7,16 +7,68 @@ Uses typing.Protocol for structural subtyping — backends don't need inheritanc
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Protocol, runtime_checkable
+from typing import Iterator, Protocol, runtime_checkable
 
 
-@dataclass
 class CommandResult:
-    """Result of a command execution inside a sandbox."""
+    """Result of a command execution inside a sandbox.
+
+    stdout and stderr may be given as bytes; they are decoded (invalid
+    UTF-8 replaced) on first access, so output nobody reads is never
+    decoded. When the output was capped, `truncated` is set,
+    `stdout_size`/`stderr_size` are the full sizes in bytes and
+    `spill_path` is the sandbox directory holding the complete `stdout`
+    and `stderr` files (None if they were not kept).
+    """
+
+    __slots__ = ("_stdout", "_stderr", "exit_code", "truncated", "stdout_size", "stderr_size", "spill_path")
+
+    def __init__(
+        self,
+        stdout: str | bytes = "",
+        stderr: str | bytes = "",
+        exit_code: int = 0,
+        truncated: bool = False,
+        stdout_size: int | None = None,
+        stderr_size: int | None = None,
+        spill_path: str | None = None,
+    ) -> None:
+        self._stdout = stdout
+        self._stderr = stderr
+        self.exit_code = exit_code
+        self.truncated = truncated
+        self.stdout_size = len(stdout) if stdout_size is None else stdout_size
+        self.stderr_size = len(stderr) if stderr_size is None else stderr_size
+        self.spill_path = spill_path
+
+    @property
+    def stdout(self) -> str:
+        if isinstance(self._stdout, bytes):
+            self._stdout = self._stdout.decode(errors="replace")
+        return self._stdout
 
-    stdout: str = ""
-    stderr: str = ""
-    exit_code: int = 0
+    @stdout.setter
+    def stdout(self, value: str | bytes) -> None:
+        self._stdout = value
+
+    @property
+    def stderr(self) -> str:
+        if isinstance(self._stderr, bytes):
+            self._stderr = self._stderr.decode(errors="replace")
+        return self._stderr
+
+    @stderr.setter
+    def stderr(self, value: str | bytes) -> None:
+        self._stderr = value
+
+    def __repr__(self) -> str:
+        extra = f", truncated=True, spill_path={self.spill_path!r}" if self.truncated else ""
+        return f"CommandResult(exit_code={self.exit_code}, stdout={self.stdout_size}B, stderr={self.stderr_size}B{extra})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CommandResult):
+            return NotImplemented
+        return (self.stdout, self.stderr, self.exit_code) == (other.stdout, other.stderr, other.exit_code)
 
 
 @dataclass
@@ -28,10 +80,16 @@ class BackgroundProcess:
 
 @dataclass
 class FileEntry:
-    """Entry in a sandbox filesystem listing."""
+    """Entry in a sandbox filesystem listing (or a stat result)."""
 
     name: str = ""
     is_dir: bool = False
+    path: str = ""
+    size: int = 0
+    mtime: float = 0.0
+    mode: int = 0
+    owner: str = ""
+    symlink_target: str | None = None
 
 
 @runtime_checkable
@@ -46,7 +104,28 @@ class CommandsAPI(Protocol):
         user: str = "user",
         timeout: int = 60,
         background: bool = False,
-    ) -> CommandResult | BackgroundProcess: ...
+        max_output: int | None = None,
+        spill: bool = True,
+    ) -> CommandResult | BackgroundProcess:
+        """Run a command; with max_output, keep at most that many bytes per stream.
+
+        Over the cap a stream keeps its head and tail. With spill, the
+        complete streams stay in the sandbox (CommandResult.spill_path).
+        """
+        ...
+
+    def stream(
+        self,
+        command: str,
+        cwd: str = "/workspace",
+        envs: dict | None = None,
+        user: str = "user",
+    ) -> Iterator[str]:
+        """Run a command and yield its stdout line by line as it is produced.
+
+        Closing the iterator stops the command in the sandbox.
+        """
+        ...
 
 
 @runtime_checkable
@@ -55,18 +134,46 @@ class FilesystemAPI(Protocol):
 
     def list(self, path: str) -> list[FileEntry]: ...
 
+    def walk(
+        self,
+        path: str,
+        max_depth: int | None = None,
+        pattern: str | None = None,
+        prune: list[str] | None = None,
+    ) -> list[FileEntry]: ...
+
     def read(self, path: str) -> str: ...
 
     def write(self, path: str, content: str) -> None: ...
 
     def read_bytes(self, path: str) -> bytes: ...
 
+    def read_range(self, path: str, offset: int, length: int) -> bytes:
+        """Read `length` bytes from `offset`; only that slice crosses the wire."""
+        ...
+
+    def read_lines(self, path: str, start: int, end: int | None = None) -> str:
+        """Read lines start..end (1-based, inclusive; end=None reads to EOF)."""
+        ...
+
+    def tail(self, path: str, lines: int = 10, follow: bool = False) -> Iterator[str]:
+        """Yield the last `lines` lines; with follow, keep yielding appended lines."""
+        ...
+
     def write_bytes(self, path: str, data: bytes) -> None: ...
 
     def make_dir(self, path: str) -> None: ...
 
     def remove(self, path: str) -> None: ...
 
+    def exists(self, path: str) -> bool: ...
+
+    def stat(self, path: str) -> FileEntry: ...
+
+    def move(self, src: str, dst: str) -> None: ...
+
+    def copy(self, src: str, dst: str) -> None: ...
+
 
 @runtime_checkable
 class SandboxInstance(Protocol):